@@ -0,0 +1,79 @@
+"""
+Training step memory benchmark
+
+Runs CPU training steps on a fixed-size brain and reports, per window length, the
+throughput, the workspace arena size and how many times it had to (re)allocate, and the
+transient memory each step allocates on top of it (tracemalloc peak above the steady state).
+After the first step at a given length, the arena should not allocate again, and with an
+activation budget it stops growing once windows are longer than one tile.
+
+    python benchmarks/bench_memoria.py --hidden 512 --windows 200 2000 20000
+    python benchmarks/bench_memoria.py --windows 20000 100000 --memory-budget 64
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+from chat_interactivo import RedCrecimientoInfinito
+
+ALPHABET = " abcdefghijklmnopqrstuvwxyzáéíóúñ,.;:¿?¡!ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789\n"
+
+
+def mib(n):
+    return n / (1 << 20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training step memory benchmark")
+    parser.add_argument("--hidden", type=int, default=512, help="hidden units")
+    parser.add_argument("--windows", type=int, nargs="+", default=[200, 2000, 20000], help="characters per step")
+    parser.add_argument("--steps", type=int, default=5, help="timed steps per window length")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        help="activation memory per step (default: the brain's); 0 = train each window in one go")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    np.random.seed(args.seed)
+    ia = RedCrecimientoInfinito(vocabulario=ALPHABET, n_oculta=args.hidden)
+    # Fixed network size: growth would reshape every buffer and hide the steady state
+    ia.expandir_cerebro = lambda: None
+    if args.memory_budget is not None:
+        ia.memoria_activaciones = args.memory_budget * 1024 * 1024 or None
+    parameters = sum(getattr(ia, n).nbytes for n in ("w_eo", "w_os", "b_o", "b_s"))
+    budget = f"{mib(ia.memoria_activaciones):.0f} MiB" if ia.memoria_activaciones else "none"
+    print(f"vocab={len(ia.vocab)} hidden={ia.n_oculta} parameters={mib(parameters):.1f} MiB "
+          f"activation budget={budget}")
+    print(f"{'window':>8} {'chars/s':>10} {'arena MiB':>10} {'arena allocs':>13} "
+          f"{'warm-up allocs':>15} {'step extra MiB':>15}")
+
+    for window in args.windows:
+        indices = rng.integers(0, len(ia.vocab), size=window + 1)
+        before = ia.espacio.reservas
+        ia.aprender_indices(indices, epocas=1)  # warm-up: sizes the arena for this length
+        warm_up = ia.espacio.reservas - before
+
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        before = ia.espacio.reservas
+        start = time.perf_counter()
+        for _ in range(args.steps):
+            ia.aprender_indices(indices, epocas=1)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"{window:>8} {window * args.steps / elapsed:>10,.0f} {mib(ia.espacio.bytes):>10.1f} "
+              f"{ia.espacio.reservas - before:>13} {warm_up:>15} {mib(peak - base):>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
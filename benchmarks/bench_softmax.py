@@ -0,0 +1,104 @@
+"""
+Exact vs sampled softmax training benchmark
+
+Trains two identical brains on the same synthetic large-vocabulary text, one with the exact
+softmax objective and one with the sampled one, and reports training chars/sec and the exact
+held-out cross-entropy after each pass (inference always uses the exact softmax). For the
+sampled brain it also reports how many training steps actually drew a sample: with a
+vocabulary under 2 x negatives the brain trains with the exact softmax instead.
+
+    python benchmarks/bench_softmax.py --vocab 600 --hidden 256 --passes 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root_dir not in sys.path:
+    sys.path.append(root_dir)
+
+from chat_interactivo import RedCrecimientoInfinito
+
+
+def synthetic_text(n_chars, n_vocab, seed):
+    """Zipf-distributed characters with a first-order dependency, so there is something to learn"""
+    rng = np.random.default_rng(seed)
+    alphabet = np.array([chr(0x21 + i) if i < 94 else chr(0x3041 + i) for i in range(n_vocab)])
+    ranks = np.arange(1, n_vocab + 1)
+    p = 1.0 / ranks
+    p /= p.sum()
+    base = rng.choice(n_vocab, size=n_chars, p=p)
+    # Half of the positions follow the previous character deterministically
+    follow = rng.random(n_chars) < 0.5
+    for i in np.flatnonzero(follow[1:]) + 1:
+        base[i] = (base[i - 1] * 7 + 3) % n_vocab
+    return "".join(alphabet[base].tolist())
+
+
+def held_out_loss(ia, indices):
+    probabilities = ia.forward(indices[:-1])
+    targets = probabilities[np.arange(len(indices) - 1), indices[1:]]
+    return float(-np.mean(np.log(targets + 1e-12)))
+
+
+def run(mode, text, held_out, args):
+    np.random.seed(args.seed)
+    ia = RedCrecimientoInfinito(vocabulario=text + held_out, n_oculta=args.hidden)
+    # Fixed network size, so both objectives train exactly the same model
+    ia.expandir_cerebro = lambda: None
+    ia.configurar_softmax(mode, args.negatives)
+    # Count the steps that really sampled, so a fallback to the exact objective cannot pass as a speedup
+    sampled = [0]
+    draw = ia._candidatos_muestreo
+
+    def counted_draw(Y):
+        sampled[0] += 1
+        return draw(Y)
+
+    ia._candidatos_muestreo = counted_draw
+    indices = ia.tokenizador.codificar(text)
+    held = ia.tokenizador.codificar(held_out)
+
+    print(f"\n[{mode}] vocab={len(ia.vocab)} hidden={ia.n_oculta}")
+    print(f"  pass 0: held-out loss {held_out_loss(ia, held):.4f}")
+    elapsed = 0.0
+    steps = 0
+    for p in range(1, args.passes + 1):
+        start = time.perf_counter()
+        for i in range(0, len(indices) - 1, args.window - 1):
+            ia.aprender_indices(indices[i:i + args.window], epocas=1)
+            steps += 1
+        elapsed += time.perf_counter() - start
+        speed = (len(indices) * p) / elapsed
+        print(f"  pass {p}: held-out loss {held_out_loss(ia, held):.4f}  {speed:,.0f} chars/s")
+    if mode == "muestreada":
+        print(f"  sampled steps: {sampled[0]}/{steps}")
+    return (len(indices) * args.passes) / elapsed, held_out_loss(ia, held), sampled[0], steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact vs sampled softmax training benchmark")
+    parser.add_argument("--vocab", type=int, default=600, help="distinct characters in the synthetic text")
+    parser.add_argument("--hidden", type=int, default=256, help="hidden units")
+    parser.add_argument("--chars", type=int, default=50_000, help="training characters per pass")
+    parser.add_argument("--window", type=int, default=1000, help="characters per training step")
+    parser.add_argument("--passes", type=int, default=3)
+    parser.add_argument("--negatives", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    text = synthetic_text(args.chars, args.vocab, args.seed)
+    held_out = synthetic_text(5_000, args.vocab, args.seed + 1)
+
+    results = {mode: run(mode, text, held_out, args) for mode in ("exacta", "muestreada")}
+    exact_speed, exact_loss, _, _ = results["exacta"]
+    sampled_speed, sampled_loss, sampled_steps, steps = results["muestreada"]
+    print(f"\nspeedup x{sampled_speed / exact_speed:.2f} ({sampled_steps}/{steps} steps sampled)  "
+          f"final loss exact {exact_loss:.4f} vs sampled {sampled_loss:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,12 +4,243 @@ import time
 import sys
 import os
 import threading
+import unicodedata
+import uuid
 try:
     from safetensors.numpy import save_file, load_file
 except ImportError:
     save_file = None
     load_file = None
 
+# Cubo para caracteres fuera de vocabulario (cuando el vocabulario tiene tamaño máximo o se ha compactado)
+CARACTER_OOV = "\ufffd"
+# Objetivos de entrenamiento de la capa de salida
+MODOS_SOFTMAX = ("exacta", "muestreada")
+# Memoria por defecto para las activaciones de un paso de entrenamiento, y tramo mínimo (posiciones)
+MEMORIA_ACTIVACIONES = 256 * 1024 * 1024
+TRAMO_MINIMO = 256
+# Límite de neuronas ocultas de expandir_cerebro, y mínimo que respeta la poda estructural
+N_OCULTA_MAXIMA = 1000000
+N_OCULTA_MINIMA = 64
+
+
+def caracteres_a_conservar(frecuencias, min_frecuencia=1, max_vocab=None):
+    """Caracteres que sobreviven a una compactación: los más frecuentes, dejando sitio al cubo OOV"""
+    candidatos = sorted((c for c, n in frecuencias.items() if n >= min_frecuencia and c != CARACTER_OOV),
+                        key=lambda c: -frecuencias[c])
+    if max_vocab is not None:
+        candidatos = candidatos[:max(1, max_vocab - 1)]
+    return set(candidatos)
+
+
+# --- TOKENIZACIÓN VECTORIZADA ---
+class TokenizadorCaracteres:
+    """
+    Tokenizador de caracteres compartido por todas las rutas de codificación/decodificación.
+    El texto se normaliza (NFC/NFKC), se convierte a puntos de código con np.frombuffer(utf-32-le)
+    y se traduce con una LUT; los puntos de código fuera de la tabla (emoji, CJK extendido...)
+    usan un diccionario. Si el vocabulario contiene CARACTER_OOV, los desconocidos caen en él.
+    """
+    TAMANO_LUT = 1 << 16  # Plano multilingüe básico: 256 KB por tokenizador
+
+    def __init__(self, vocab=(), normalizacion=None):
+        self.normalizacion = normalizacion
+        self.lut = np.full(self.TAMANO_LUT, -1, dtype=np.int32)
+        self.altos = {}
+        self.chars = []
+        # Punto de código de cada índice para decodificar con un solo tobytes()
+        self.codigos = np.zeros(0, dtype=np.uint32)
+        self.agregar(vocab)
+
+    def __len__(self):
+        return len(self.chars)
+
+    def __contains__(self, char):
+        return self.indice(char) >= 0
+
+    @property
+    def oov(self):
+        return self.indice(CARACTER_OOV)
+
+    def normalizar(self, texto):
+        # El ASCII ya está normalizado en cualquier forma: evita la llamada en el caso común
+        if self.normalizacion and not texto.isascii():
+            return unicodedata.normalize(self.normalizacion, texto)
+        return texto
+
+    def indice(self, char):
+        codigo = ord(char)
+        if codigo < self.TAMANO_LUT:
+            return int(self.lut[codigo])
+        return self.altos.get(codigo, -1)
+
+    def agregar(self, chars):
+        """Añade caracteres nuevos al final (los índices existentes no cambian)"""
+        nuevos = []
+        for char in chars:
+            if char in self:
+                continue
+            codigo = ord(char)
+            idx = len(self.chars)
+            if codigo < self.TAMANO_LUT:
+                self.lut[codigo] = idx
+            else:
+                self.altos[codigo] = idx
+            self.chars.append(char)
+            nuevos.append(codigo)
+        if nuevos:
+            self.codigos = np.concatenate([self.codigos, np.array(nuevos, dtype=np.uint32)])
+
+    @staticmethod
+    def puntos_de_codigo(texto):
+        return np.frombuffer(texto.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+
+    def _traducir(self, codigos):
+        """Índice de cada punto de código (-1 si es desconocido)"""
+        if not len(codigos):
+            return np.zeros(0, dtype=np.int64)
+        if codigos.max() < self.TAMANO_LUT:
+            return self.lut[codigos].astype(np.int64)
+        ids = np.full(len(codigos), -1, dtype=np.int64)
+        bajos = codigos < self.TAMANO_LUT
+        ids[bajos] = self.lut[codigos[bajos]]
+        # Pocos caracteres distintos fuera de la tabla: un lookup por carácter distinto
+        unicos, inversa = np.unique(codigos[~bajos], return_inverse=True)
+        ids[~bajos] = np.array([self.altos.get(c, -1) for c in unicos.tolist()], dtype=np.int64)[inversa]
+        return ids
+
+    def codificar(self, texto, ampliar=False, normalizar=True):
+        """
+        Índices de los caracteres del texto; los desconocidos van al cubo OOV o, sin él, se omiten.
+        Con ampliar, los desconocidos se añaden antes al vocabulario del tokenizador
+        (solo para tokenizadores sin pesos asociados, p.ej. al construir un corpus).
+        """
+        if normalizar:
+            texto = self.normalizar(texto)
+        codigos = self.puntos_de_codigo(texto)
+        ids = self._traducir(codigos)
+        faltan = ids < 0
+        if faltan.any():
+            if not ampliar:
+                oov = self.oov
+                if oov < 0:
+                    return ids[~faltan]
+                ids[faltan] = oov
+                return ids
+            self.agregar([chr(c) for c in np.unique(codigos[faltan]).tolist()])
+            ids = self._traducir(codigos)
+        return ids
+
+    def desconocidos(self, texto, normalizar=True):
+        """Caracteres distintos del texto que no están en el vocabulario (una pasada vectorizada)"""
+        if normalizar:
+            texto = self.normalizar(texto)
+        codigos = self.puntos_de_codigo(texto)
+        faltan = np.unique(codigos[self._traducir(codigos) < 0])
+        return [chr(c) for c in faltan.tolist()]
+
+    def decodificar(self, indices):
+        return self.codigos[np.asarray(indices, dtype=np.int64)].tobytes().decode('utf-32-le', 'surrogatepass')
+
+
+class EspacioTrabajo:
+    """
+    Arena de buffers float32 para forward/backward: cada nombre tiene un bloque plano que se
+    reutiliza entre pasos y crece hasta la mayor L reciente. Las vistas devueltas son contiguas
+    (valen como `out=`) y solo son válidas hasta la siguiente petición del mismo nombre.
+    """
+
+    # Cada PERIODO pasos, los bloques mucho mayores que lo pedido en ese periodo se liberan
+    PERIODO = 64
+
+    def __init__(self):
+        self.bloques = {}
+        self.tablas = {}
+        self.reservas = 0
+        self._pedido = {}
+        self._pasos = 0
+
+    def buffer(self, nombre, filas, columnas):
+        n = filas * columnas
+        bloque = self.bloques.get(nombre)
+        if bloque is None or bloque.size < n:
+            bloque = np.empty(n, dtype=np.float32)
+            self.bloques[nombre] = bloque
+            self.reservas += 1
+        self._pedido[nombre] = max(self._pedido.get(nombre, 0), n)
+        return bloque[:n].reshape(filas, columnas)
+
+    def _tabla(self, clave, L, calcular):
+        # Tablas que solo dependen de L (y de la clave): se calculan una vez para la mayor L
+        tabla = self.tablas.get(clave)
+        if tabla is None or len(tabla) < L:
+            tabla = calcular(L)
+            self.tablas[clave] = tabla
+            self.reservas += 1
+        self._pedido[clave] = max(self._pedido.get(clave, 0), L)
+        return tabla[:L]
+
+    def sumar_codificacion_posicional(self, x, inicio=0):
+        """
+        Suma la codificación posicional sin/cos de las posiciones inicio..inicio+L-1 a x (L, D).
+        Solo se guardan seno/coseno de 0..L-1; un tramo que empieza en `inicio` se obtiene
+        rotándolos por el ángulo inicio·w (calculado en float64, sin perder precisión).
+        """
+        L, n_oculta = x.shape
+        div_term = np.exp(np.arange(0, n_oculta, 2) * -(np.log(10000.0) / n_oculta))
+        seno = self._tabla(('seno', n_oculta), L, lambda filas: np.sin(np.arange(filas)[:, None] * div_term).astype(np.float32))
+        coseno = self._tabla(('coseno', n_oculta), L, lambda filas: np.cos(np.arange(filas)[:, None] * div_term).astype(np.float32))
+        impares = n_oculta // 2
+        if not inicio:
+            x[:, 0::2] += seno
+            x[:, 1::2] += coseno[:, :impares]
+            return x
+        # sin(a+b) = sin a·cos b + cos a·sin b ; cos(a+b) = cos a·cos b - sin a·sin b
+        c = np.cos(inicio * div_term).astype(np.float32)
+        s = np.sin(inicio * div_term).astype(np.float32)
+        tmp = self.buffer('posicional', L, len(div_term))
+        np.multiply(seno, c, out=tmp)
+        x[:, 0::2] += tmp
+        np.multiply(coseno, s, out=tmp)
+        x[:, 0::2] += tmp
+        np.multiply(coseno, c, out=tmp)
+        x[:, 1::2] += tmp[:, :impares]
+        np.multiply(seno, s, out=tmp)
+        x[:, 1::2] -= tmp[:, :impares]
+        return x
+
+    def divisores_inversos(self, L, k, inicio=0):
+        """1 / min(t + 1, k) para t = inicio..inicio+L-1, como columna (L, 1) float32: la media de la ventana causal"""
+        if inicio >= k:
+            # Pasado el arranque de la secuencia, todas las ventanas están completas
+            return self._tabla(('divisores', k), k + L, self._divisores(k))[k:]
+        return self._tabla(('divisores', k), inicio + L, self._divisores(k))[inicio:]
+
+    @staticmethod
+    def _divisores(k):
+        return lambda filas: (1 / np.minimum(np.arange(1, filas + 1), k)).astype(np.float32)[:, None]
+
+    def fin_de_paso(self):
+        """Libera lo que se quedó grande (p.ej. tras un bloque enorme o un cambio de n_oculta)"""
+        self._pasos += 1
+        if self._pasos % self.PERIODO:
+            return
+        for almacen, medida in ((self.bloques, np.size), (self.tablas, len)):
+            for clave in list(almacen):
+                if medida(almacen[clave]) > 2 * self._pedido.get(clave, 0):
+                    del almacen[clave]
+        self._pedido = {}
+
+    def liberar(self):
+        self.bloques.clear()
+        self.tablas.clear()
+        self._pedido = {}
+
+    @property
+    def bytes(self):
+        return sum(b.nbytes for b in self.bloques.values()) + sum(t.nbytes for t in self.tablas.values())
+
+
 # --- IA OPTIMIZADA CON APRENDIZAJE ACELERADO ---
 class RedCrecimientoInfinito:
     def __init__(self, vocabulario=None, n_oculta=128):
@@ -21,13 +252,41 @@ class RedCrecimientoInfinito:
         self.interacciones = 0
         self.caracteres_totales = 0
         self.t = 0
+        self.window_size = 10 # Ventana de contexto (media móvil causal de embeddings)
         self.lock = threading.RLock()
         
+        # Versión monotónica del modelo: sube con cada mutación (paso de optimizador,
+        # expansión, sueño). Permite saltar guardados redundantes y versionar cachés.
+        self.version = 0
+        self._version_guardada = None
+        # Identidad de esta instancia (id() se reutiliza al recargar un cerebro con la misma versión)
+        self.instancia = uuid.uuid4().hex
+        self._archivo_guardado = None
+        
+        # Política de vocabulario: normalización Unicode y tamaño máximo (None = sin límite).
+        # Con límite, los caracteres que no caben van al cubo CARACTER_OOV.
+        self.normalizacion = "NFC"
+        self.max_vocab = None
+        
+        # Objetivo de entrenamiento de la salida (ver configurar_softmax); inferencia siempre exacta
+        self.modo_softmax = "exacta"
+        self.negativos_softmax = 64
+        
+        # Buffers reutilizables de forward/backward (no se guardan con el modelo)
+        self.espacio = EspacioTrabajo()
+        # Memoria máxima (bytes) para las activaciones de un paso de entrenamiento; los bloques
+        # más largos se entrenan por tramos acumulando gradientes (None = de una vez)
+        self.memoria_activaciones = MEMORIA_ACTIVACIONES
+        # Política de crecimiento (core.growth_policy); None = crecer en cada punto de crecimiento
+        self.politica_crecimiento = None
+        self.ultima_perdida = None
+        
         if vocabulario:
             self.vocab = sorted(list(set(vocabulario)))
-            self.char_to_int = {char: i for i, char in enumerate(self.vocab)}
-            self.int_to_char = {i: char for i, char in enumerate(self.vocab)}
+            self._indexar_vocab()
             n_vocab = len(self.vocab)
+            # Apariciones de cada carácter en entrenamiento (para compactar el vocabulario)
+            self.frecuencias = np.zeros(n_vocab, dtype=np.int64)
             
             # Inicialización Xavier/Glorot
             # Inicialización Xavier/Glorot con float32
@@ -42,15 +301,54 @@ class RedCrecimientoInfinito:
             self.m_b_o, self.v_b_o = np.zeros_like(self.b_o, dtype=np.float32), np.zeros_like(self.b_o, dtype=np.float32)
             self.m_b_s, self.v_b_s = np.zeros_like(self.b_s, dtype=np.float32), np.zeros_like(self.b_s, dtype=np.float32)
 
+    def _indexar_vocab(self):
+        """Reconstruye los mapas carácter ↔ índice y el tokenizador a partir de self.vocab"""
+        self.char_to_int = {char: i for i, char in enumerate(self.vocab)}
+        self.int_to_char = {i: char for i, char in enumerate(self.vocab)}
+        self.tokenizador = TokenizadorCaracteres(self.vocab, normalizacion=self.normalizacion)
+
+    def configurar_vocabulario(self, max_vocab=None, normalizacion="NFC"):
+        """Fija la política de vocabulario; con tamaño máximo se reserva el cubo OOV"""
+        with self.lock:
+            self.normalizacion = normalizacion
+            self.tokenizador.normalizacion = normalizacion
+            self.max_vocab = None
+            if max_vocab is not None and CARACTER_OOV not in self.char_to_int:
+                self.expandir_vocabulario([CARACTER_OOV])
+            self.max_vocab = max_vocab
+
+    def marcar_cambio(self):
+        """Incrementa la versión del modelo tras una mutación de pesos"""
+        with self.lock:
+            self.version += 1
+
+    def esta_sucio(self, archivo=None):
+        """Indica si hay cambios sin guardar (opcionalmente respecto a un archivo concreto)"""
+        if archivo is not None and archivo != self._archivo_guardado:
+            return True
+        return self.version != self._version_guardada
+
     def expandir_vocabulario(self, nuevos_chars):
         """Añade caracteres nuevos al vocabulario y expande las matrices de E/S"""
         with self.lock:
+            nuevos_chars = [c for c in dict.fromkeys(nuevos_chars) if c not in self.char_to_int]
+            if self.max_vocab is not None:
+                # Vocabulario lleno: el resto de caracteres se tokeniza como CARACTER_OOV
+                nuevos_chars = nuevos_chars[:max(0, self.max_vocab - len(self.vocab))]
+            if not nuevos_chars:
+                return
+            # En sesión GPU los pesos vivos están en VRAM: traerlos antes de ampliar y recargar después
+            en_gpu = getattr(self, 'en_sesion_gpu', False)
+            if en_gpu:
+                self.sincronizar_gpu_a_cpu()
             for char in nuevos_chars:
-                if char not in self.vocab:
+                if char not in self.char_to_int:
+                    self.marcar_cambio()
                     idx = len(self.vocab)
                     self.vocab.append(char)
                     self.char_to_int[char] = idx
                     self.int_to_char[idx] = char
+                    self.tokenizador.agregar([char])
                     
                     print(f"✨ VOCABULARIO: Nuevo carácter aprendido: '{char}'")
                     
@@ -67,19 +365,116 @@ class RedCrecimientoInfinito:
                     self.v_w_os = np.hstack([self.v_w_os, np.zeros((self.n_oculta, 1), dtype=np.float32)])
                     
                     # Expandir b_s
-                    self.b_s = np.append(self.b_s, [[0]], axis=1)
-                    self.m_b_s = np.append(self.m_b_s, [[0]], axis=1)
-                    self.v_b_s = np.append(self.v_b_s, [[0]], axis=1)
+                    cero = np.zeros((1, 1), dtype=np.float32)
+                    self.b_s = np.append(self.b_s, cero, axis=1)
+                    self.m_b_s = np.append(self.m_b_s, cero, axis=1)
+                    self.v_b_s = np.append(self.v_b_s, cero, axis=1)
+            self.frecuencias = np.concatenate([self.frecuencias, np.zeros(len(self.vocab) - len(self.frecuencias), dtype=np.int64)])
+            if en_gpu:
+                self.iniciar_sesion_gpu()
+
+    def reordenar_vocabulario(self, orden):
+        """
+        Reordena el vocabulario según `orden` (añadiendo los caracteres que falten) y permuta
+        en consecuencia las filas de w_eo, las columnas de w_os/b_s y sus buffers de Adam.
+        """
+        with self.lock:
+            self.expandir_vocabulario(orden)
+            orden = list(dict.fromkeys(orden))
+            vistos = set(orden)
+            orden += [c for c in self.vocab if c not in vistos]
+            if orden == self.vocab:
+                return False
+            
+            en_gpu = getattr(self, 'en_sesion_gpu', False)
+            if en_gpu:
+                self.sincronizar_gpu_a_cpu()
+            perm = np.array([self.char_to_int[c] for c in orden], dtype=np.int64)
+            self.w_eo, self.m_w_eo, self.v_w_eo = self.w_eo[perm], self.m_w_eo[perm], self.v_w_eo[perm]
+            self.w_os, self.m_w_os, self.v_w_os = self.w_os[:, perm], self.m_w_os[:, perm], self.v_w_os[:, perm]
+            self.b_s, self.m_b_s, self.v_b_s = self.b_s[:, perm], self.m_b_s[:, perm], self.v_b_s[:, perm]
+            self.frecuencias = self.frecuencias[perm]
+            self.vocab = orden
+            self._indexar_vocab()
+            self.marcar_cambio()
+            if en_gpu:
+                self.iniciar_sesion_gpu()
+            return True
+
+    def compactar_vocabulario(self, min_frecuencia=1, max_vocab=None, conservar=None):
+        """
+        Compactación offline: elimina los caracteres poco usados (filas de w_eo, columnas de w_os/b_s
+        y sus buffers de Adam). Por defecto conserva los que aparecen al menos min_frecuencia veces,
+        y como mucho max_vocab; `conservar` fija el conjunto explícitamente (vocabulario compartido).
+        Los eliminados pasan al cubo OOV. Devuelve la lista de caracteres eliminados.
+        """
+        with self.lock:
+            if conservar is None:
+                if not self.frecuencias.any():
+                    return []  # Sin estadísticas (cerebro antiguo): no hay criterio para podar
+                conservar = caracteres_a_conservar(dict(zip(self.vocab, self.frecuencias.tolist())),
+                                                   min_frecuencia, max_vocab)
+            conservar = set(conservar) | {CARACTER_OOV}
+            eliminados = [c for c in self.vocab if c not in conservar]
+            if not eliminados:
+                return []
+            
+            en_gpu = getattr(self, 'en_sesion_gpu', False)
+            if en_gpu:
+                self.sincronizar_gpu_a_cpu()
+            if CARACTER_OOV not in self.char_to_int:
+                max_vocab_actual, self.max_vocab = self.max_vocab, None
+                self.expandir_vocabulario([CARACTER_OOV])
+                self.max_vocab = max_vocab_actual
+            mantener = np.array([i for i, c in enumerate(self.vocab) if c in conservar], dtype=np.int64)
+            self.w_eo, self.m_w_eo, self.v_w_eo = self.w_eo[mantener], self.m_w_eo[mantener], self.v_w_eo[mantener]
+            self.w_os, self.m_w_os, self.v_w_os = self.w_os[:, mantener], self.m_w_os[:, mantener], self.v_w_os[:, mantener]
+            self.b_s, self.m_b_s, self.v_b_s = self.b_s[:, mantener], self.m_b_s[:, mantener], self.v_b_s[:, mantener]
+            self.frecuencias = self.frecuencias[mantener]
+            self.vocab = [self.vocab[i] for i in mantener.tolist()]
+            self._indexar_vocab()
+            self.marcar_cambio()
+            if en_gpu:
+                self.iniciar_sesion_gpu()
+            return eliminados
+
+    def incremento_crecimiento(self):
+        """Neuronas que añadiría expandir_cerebro ahora (0 en el límite)"""
+        # Límite de seguridad mucho más alto para supercomputación
+        if self.n_oculta >= N_OCULTA_MAXIMA:
+            return 0
+        # Crecimiento más inteligente: cuanto más grande, más lento crece (logarítmico)
+        return max(8, int(128 / (1 + np.log1p(self.n_oculta / 128))))
+
+    def bytes_en_memoria(self):
+        """Pesos + buffers de Adam + espacio de trabajo, en bytes"""
+        return sum(getattr(self, n).nbytes for n in (
+            'w_eo', 'w_os', 'b_o', 'b_s', 'm_w_eo', 'v_w_eo', 'm_w_os', 'v_w_os', 'm_b_o', 'v_b_o', 'm_b_s', 'v_b_s'
+        )) + self.espacio.bytes
+
+    def _crecer_si_procede(self, en_gpu=False):
+        """Punto de crecimiento: con política, ella decide si se expande"""
+        if not self.incremento_crecimiento():
+            return
+        if self.politica_crecimiento is not None and not self.politica_crecimiento.decidir(self):
+            return
+        if en_gpu:
+            self.expandir_cerebro_gpu()
+        else:
+            self.expandir_cerebro()
+
+    def _observar_entrenamiento(self, caracteres, segundos, perdida):
+        """Medidas de un paso de entrenamiento para la política de crecimiento"""
+        self.ultima_perdida = perdida
+        if self.politica_crecimiento is not None:
+            self.politica_crecimiento.observar(self, caracteres, segundos, perdida)
 
     def expandir_cerebro(self):
         """Añade neuronas nuevas con crecimiento logarítmico para evitar lentitud extrema"""
         with self.lock:
-            # Límite de seguridad mucho más alto para supercomputación
-            if self.n_oculta >= 1000000:
+            incremento = self.incremento_crecimiento()
+            if not incremento:
                 return
-                
-            # Crecimiento más inteligente: cuanto más grande, más lento crece (logarítmico)
-            incremento = max(8, int(128 / (1 + np.log1p(self.n_oculta / 128))))
             
             n_vocab = len(self.vocab)
             nueva_n_oculta = self.n_oculta + incremento
@@ -109,6 +504,7 @@ class RedCrecimientoInfinito:
             self.v_b_o = np.pad(self.v_b_o, ((0,0), (0, incremento)))
 
             self.n_oculta = nueva_n_oculta
+            self.marcar_cambio()
             
             if hasattr(self, 'on_expand') and self.on_expand:
                 self.on_expand(self.n_oculta)
@@ -119,125 +515,123 @@ class RedCrecimientoInfinito:
         e_x = np.exp(x - x_max)
         return (e_x / (e_x.sum(axis=1, keepdims=True) + 1e-8)).astype(np.float32)
 
+    def _softmax_en_sitio(self, x):
+        """Softmax por filas sobre el propio buffer (sin temporales del tamaño de x)"""
+        x_max = np.max(x, axis=1, keepdims=True)
+        np.subtract(x, x_max, out=x)
+        np.exp(x, out=x)
+        suma = np.sum(x, axis=1, keepdims=True)
+        suma += 1e-8
+        np.divide(x, suma, out=x)
+        return x
+
     def forward(self, x_indices):
-        """Forward optimizado con Ventana de Contexto (Causal Mean Pooling)"""
+        """
+        Forward optimizado con Ventana de Contexto (Causal Mean Pooling).
+        Devuelve una vista del espacio de trabajo: válida hasta la siguiente llamada.
+        """
+        with self.lock:
+            self._capa_oculta(x_indices)
+            self.output = self.espacio.buffer('salida', len(self.hidden), self.w_os.shape[1])
+            np.dot(self.hidden, self.w_os, out=self.output)
+            self.output += self.b_s
+            return self._softmax_en_sitio(self.output)
+
+    def _capa_oculta(self, x_indices, desplazamiento=0):
+        """
+        Embeddings con contexto + posición + Swish; deja self.hidden listo para cualquier salida.
+        Con desplazamiento, x_indices es un tramo que empieza en esa posición del bloque
+        (sus primeras window_size-1 filas solo sirven de contexto y su salida no vale).
+        """
         with self.lock:
+            espacio = self.espacio
+            L = len(x_indices)
+            D = self.n_oculta
+            
             # Embeddings de los caracteres actuales
-            embeddings = self.w_eo[x_indices] # (L, D)
+            embeddings = espacio.buffer('embeddings', L, D)
+            np.take(self.w_eo, x_indices, axis=0, out=embeddings, mode='clip') # (L, D)
             
             # Aplicar Ventana de Contexto (Media móvil causal)
-            # Esto permite que cada caracter "tenga memoria" de los N anteriores
-            self.window_size = 10
-            L = len(x_indices)
-            
+            # Esto permite que cada caracter "tenga memoria" de los window_size anteriores
             if L > 1:
-                # Calculo de media móvil rápida (O(L))
-                cumsum = np.cumsum(embeddings, axis=0)
-                context_embeddings = cumsum.copy()
-                # Restar el elemento que sale de la ventana
+                # Calculo de media móvil rápida (O(L)): suma acumulada menos la que sale de la ventana
                 k = self.window_size
-                context_embeddings[k:] -= cumsum[:-k]
+                cumsum = espacio.buffer('cumsum', L, D)
+                np.cumsum(embeddings, axis=0, out=cumsum)
+                contexto = embeddings
+                contexto[:k] = cumsum[:k]
+                np.subtract(cumsum[k:], cumsum[:-k], out=contexto[k:])
                 
-                # Divisores dinámicos para el inicio de la secuencia
-                divisores = np.arange(1, L + 1)
-                divisores[divisores > k] = k
-                self.emb_with_context = (context_embeddings / divisores[:, None]).astype(np.float32)
+                # Divisores dinámicos para el inicio de la secuencia (ya invertidos, en float32)
+                contexto *= espacio.divisores_inversos(L, k, desplazamiento)
             else:
-                self.emb_with_context = embeddings
+                contexto = embeddings
             
             # --- CODIFICACIÓN POSICIONAL (Sin/Cos) ---
             # Ayuda a la IA a entender el orden de los caracteres en la ventana
-            posiciones = np.arange(L)[:, None]
-            div_term = np.exp(np.arange(0, self.n_oculta, 2) * -(np.log(10000.0) / self.n_oculta))
-            pe = np.zeros((L, self.n_oculta), dtype=np.float32)
-            pe[:, 0::2] = np.sin(posiciones * div_term)
-            pe[:, 1::2] = np.cos(posiciones * div_term[:self.n_oculta//2])
-            
-            self.emb_with_context += pe
+            espacio.sumar_codificacion_posicional(contexto, desplazamiento)
+            self.emb_with_context = contexto
             
             # --- ACTIVACIÓN SWISH (x * sigmoid(x)) ---
             # Más fluida que tanh para redes profundas
-            x_hidden = self.emb_with_context + self.b_o
-            self.hidden = (x_hidden * (1 / (1 + np.exp(-x_hidden)))).astype(np.float32)
-            
-            self.output = self.softmax(np.dot(self.hidden, self.w_os) + self.b_s)
-            return self.output
+            x_hidden = espacio.buffer('x_hidden', L, D)
+            np.add(contexto, self.b_o, out=x_hidden)
+            # La sigmoide se guarda para el gradiente de Swish en aprender_indices
+            sigmoide = espacio.buffer('sigmoide', L, D)
+            np.negative(x_hidden, out=sigmoide)
+            np.exp(sigmoide, out=sigmoide)
+            sigmoide += 1
+            np.reciprocal(sigmoide, out=sigmoide)
+            self._sigmoide = sigmoide
+            self.hidden = espacio.buffer('oculta', L, D)
+            np.multiply(x_hidden, sigmoide, out=self.hidden)
+            return self.hidden
 
     def aprender(self, texto, lr=None, epocas=3):
         with self.lock:
             # 1. Chequear caracteres desconocidos
-            desconocidos = [c for c in texto if c not in self.char_to_int]
+            desconocidos = self.tokenizador.desconocidos(texto)
             if desconocidos:
-                self.expandir_vocabulario(list(set(desconocidos)))
+                self.expandir_vocabulario(desconocidos)
+
+            # Convertir texto a índices
+            indices = self.tokenizador.codificar(texto)
+            self.aprender_indices(indices, lr=lr, epocas=epocas)
 
+    def aprender_indices(self, indices, lr=None, epocas=3):
+        """Entrena sobre índices ya tokenizados (p.ej. una ventana de un corpus pre-tokenizado)"""
+        with self.lock:
             if lr: self.lr = lr
             self.interacciones += 1
-            
-            # Convertir texto a índices
-            indices = [self.char_to_int[c] for c in texto if c in self.char_to_int]
             if len(indices) < 2: return
+            self._contar_frecuencias(indices)
             
+            indices = np.asarray(indices, dtype=np.int64)
             X = indices[:-1]
             Y = indices[1:]
             L = len(X)
+            espacio = self.espacio
             
             for _ in range(epocas):
                 self.t += 1
-                probabilidades = self.forward(X)
-                
-                # Gradiente de salida (Loss: Cross-Entropy)
-                dz_salida = probabilidades.copy()
-                dz_salida[np.arange(len(Y)), Y] -= 1
-                dz_salida /= len(Y)
-                
-                # Gradientes de la capa de salida
-                dw_os = np.dot(self.hidden.T, dz_salida)
-                db_s = np.sum(dz_salida, axis=0, keepdims=True)
-                
-                # Gradiente hacia la capa oculta (Swish gradient)
-                # Swish grad: sig(x) + x * sig(x) * (1 - sig(x)) = swish(x) + sig(x)*(1-swish(x))
-                sig_x = 1 / (1 + np.exp(-(self.emb_with_context + self.b_o)))
-                swish_grad = sig_x + self.hidden * (1 - sig_x)
-                d_hidden = np.dot(dz_salida, self.w_os.T) * swish_grad
-                
-                # --- DISTRIBUCIÓN DE GRADIENTES POR VENTANA DE CONTEXTO ---
-                # Como usamos el promedio de una ventana, el gradiente en cada posición
-                # se distribuye equitativamente entre los caracteres de esa ventana.
-                d_embeddings = d_hidden.copy()
-                if L > 1:
-                    k = self.window_size
-                    # Inversa del promedio móvil (propagación de gradiente causal)
-                    # Cada posición t recibe gradiente de d_hidden[t...t+k-1]
-                    d_emb_distribuido = np.zeros_like(d_embeddings)
-                    
-                    # Divisores dinámicos para normalizar el gradiente
-                    divisores = np.arange(1, L + 1)
-                    divisores[divisores > k] = k
-                    d_hidden_normalized = d_hidden / divisores[:, None]
-                    
-                    # Acumular gradientes (ventana deslizante inversa)
-                    # Este bloque simula la distribución del gradiente del promedio
-                    for t in range(L):
-                        end_idx = min(t + k, L)
-                        d_emb_distribuido[t] = np.sum(d_hidden_normalized[t:end_idx], axis=0)
-                    d_embeddings = d_emb_distribuido
-
-                dw_eo = np.zeros_like(self.w_eo)
-                np.add.at(dw_eo, X, d_embeddings)
-                db_o = np.sum(d_hidden, axis=0, keepdims=True)
+                inicio_paso = time.perf_counter()
+                # Columnas de salida que se actualizan en este paso (None = todo el vocabulario)
+                candidatos = None
+                if self._usar_muestreo():
+                    # Softmax muestreada: cada fila puntúa su objetivo y unos negativos compartidos
+                    candidatos, Y_local, negativos, correccion = self._candidatos_muestreo(Y)
+                    dw_eo, dw_os, db_o, db_s, perdida = self._gradientes(X, Y_local, (candidatos, negativos, correccion))
+                else:
+                    dw_eo, dw_os, db_o, db_s, perdida = self._gradientes(X, Y)
                 
                 # --- OPTIMIZADOR ADAM ---
-                for param, grad, m, v in [
-                    (self.w_eo, dw_eo, self.m_w_eo, self.v_w_eo),
-                    (self.w_os, dw_os, self.m_w_os, self.v_w_os),
-                    (self.b_o, db_o, self.m_b_o, self.v_b_o),
-                    (self.b_s, db_s, self.m_b_s, self.v_b_s)
-                ]:
-                    m[:] = self.beta1 * m + (1 - self.beta1) * grad
-                    v[:] = self.beta2 * v + (1 - self.beta2) * (grad**2)
-                    m_hat = m / (1 - self.beta1**self.t + self.eps)
-                    v_hat = v / (1 - self.beta2**self.t + self.eps)
-                    param -= self.lr * m_hat / (np.sqrt(v_hat) + self.eps)
+                self._paso_adam(self.w_eo, dw_eo, self.m_w_eo, self.v_w_eo)
+                self._paso_adam(self.w_os, dw_os, self.m_w_os, self.v_w_os, candidatos)
+                self._paso_adam(self.b_o, db_o, self.m_b_o, self.v_b_o)
+                self._paso_adam(self.b_s, db_s, self.m_b_s, self.v_b_s, candidatos)
+                self.marcar_cambio()
+                self._observar_entrenamiento(L, time.perf_counter() - inicio_paso, perdida)
 
             # Lógica de crecimiento mejorada para textos largos (PDF/Cargas masivas)
                 # Expande una vez por cada 500 caracteres procesados
@@ -252,11 +646,268 @@ class RedCrecimientoInfinito:
                     caracteres_a_contar -= avance
                     
                     if self.caracteres_totales % 500 == 0:
-                        self.expandir_cerebro()
+                        self._crecer_si_procede()
+            espacio.fin_de_paso()
+
+    def posiciones_por_tramo(self, n_salida, buffers_por_fila=11):
+        """
+        Posiciones que caben en un tramo sin pasar de memoria_activaciones: cada posición ocupa
+        unos `buffers_por_fila` vectores de n_oculta más una fila de la salida (float32).
+        """
+        if not self.memoria_activaciones:
+            return None
+        por_fila = 4 * (buffers_por_fila * self.n_oculta + n_salida)
+        return max(TRAMO_MINIMO, self.memoria_activaciones // por_fila)
+
+    def _gradientes(self, X, Y, muestra=None):
+        """
+        Forward + backward de todo el bloque. Los bloques largos se procesan por tramos de
+        posiciones (posiciones_por_tramo) acumulando los gradientes: cada tramo arrastra las
+        window_size-1 posiciones anteriores como contexto (halo), así que el resultado es el
+        mismo que en una sola pasada.
+        Con muestra = (candidatos, negativos, corrección) de _candidatos_muestreo, Y son índices
+        en candidatos, cada fila solo puntúa su objetivo y los negativos, y dw_os/db_s son de las
+        columnas candidatas.
+        Devuelve (dw_eo, dw_os, db_o, db_s, pérdida media); los gradientes son vistas del espacio de trabajo.
+        """
+        espacio = self.espacio
+        L = len(X)
+        D = self.n_oculta
+        k = self.window_size
+        if muestra is None:
+            w_os, b_s = self.w_os, self.b_s
+        else:
+            candidatos, negativos, correccion = muestra
+            w_objetivos = np.ascontiguousarray(self.w_os[:, candidatos].T)
+            b_objetivos = self.b_s[0, candidatos]
+            # Salida de cada fila: columna 0 = su objetivo (se rellena aparte), 1.. = negativos compartidos
+            w_os = np.zeros((D, len(negativos) + 1), dtype=np.float32)
+            w_os[:, 1:] = w_objetivos[negativos].T
+            b_s = np.zeros((1, len(negativos) + 1), dtype=np.float32)
+            b_s[0, 1:] = b_objetivos[negativos] - correccion
+        n_salida = w_os.shape[1]
+        tramo = self.posiciones_por_tramo(n_salida) or L
+        escala = np.float32(1 / L)
+        
+        dw_eo = espacio.buffer('dw_eo', *self.w_eo.shape)
+        dw_eo.fill(0)
+        if muestra is None:
+            dw_os = espacio.buffer('dw_os', D, n_salida)
+            db_s = np.zeros((1, n_salida), dtype=np.float32)
+        else:
+            dw_os = espacio.buffer('dw_os', D, len(candidatos))
+            dw_os.fill(0)
+            db_s = np.zeros((1, len(candidatos)), dtype=np.float32)
+        db_o = np.zeros((1, D), dtype=np.float32)
+        perdida = 0.0
+        
+        for inicio in range(0, L, tramo):
+            fin = min(L, inicio + tramo)
+            halo = min(k - 1, inicio)
+            x_tramo = X[inicio - halo:fin]
+            filas = len(x_tramo)
+            self._capa_oculta(x_tramo, inicio - halo)
+            hidden = self.hidden[halo:]
+            
+            # Gradiente de salida (Loss: Cross-Entropy), sobre el propio buffer de probabilidades
+            dz_salida = espacio.buffer('salida', fin - inicio, n_salida)
+            np.dot(hidden, w_os, out=dz_salida)
+            dz_salida += b_s
+            filas_salida, objetivos = np.arange(fin - inicio), Y[inicio:fin]
+            columna_objetivo = objetivos
+            if muestra is not None:
+                # Logit del objetivo de cada fila; un negativo que coincide con él no cuenta
+                w_objetivo = espacio.buffer('w_objetivo', fin - inicio, D)
+                np.take(w_objetivos, objetivos, axis=0, out=w_objetivo)
+                dz_salida[:, 0] = np.einsum('td,td->t', hidden, w_objetivo) + b_objetivos[objetivos]
+                dz_salida[:, 1:][objetivos[:, None] == negativos] = -np.inf
+                columna_objetivo = 0
+            self._softmax_en_sitio(dz_salida)
+            perdida -= float(np.log(dz_salida[filas_salida, columna_objetivo] + 1e-12).sum())
+            dz_salida[filas_salida, columna_objetivo] -= 1
+            dz_salida *= escala
+            
+            # Gradientes de la capa de salida
+            if muestra is None:
+                destino = dw_os if inicio == 0 else espacio.buffer('dw_os_tramo', D, n_salida)
+                np.dot(hidden.T, dz_salida, out=destino)
+                if inicio:
+                    dw_os += destino
+                db_s += np.sum(dz_salida, axis=0, keepdims=True)
+            else:
+                destino = espacio.buffer('dw_os_tramo', D, n_salida)
+                np.dot(hidden.T, dz_salida, out=destino)
+                dw_os[:, negativos] += destino[:, 1:]
+                db_s[0, negativos] += np.sum(dz_salida[:, 1:], axis=0)
+                db_s[0] += np.bincount(objetivos, weights=dz_salida[:, 0], minlength=len(candidatos))
+            
+            # Gradiente hacia la capa oculta (Swish gradient)
+            # Swish grad: sig(x) + x * sig(x) * (1 - sig(x)) = swish(x) + sig(x)*(1-swish(x))
+            # (con la sigmoide que dejó el forward; las filas del halo no tienen pérdida en este tramo)
+            sig_x = self._sigmoide[halo:]
+            swish_grad = espacio.buffer('swish_grad', fin - inicio, D)
+            np.subtract(1, sig_x, out=swish_grad)
+            swish_grad *= hidden
+            swish_grad += sig_x
+            d_hidden = espacio.buffer('d_hidden', filas, D)
+            d_hidden[:halo] = 0
+            np.dot(dz_salida, w_os.T, out=d_hidden[halo:])
+            if muestra is not None:
+                # La columna 0 de w_os es cero: la parte del objetivo va por su propia columna de pesos
+                np.multiply(w_objetivo, dz_salida[:, :1], out=w_objetivo)
+                d_hidden[halo:] += w_objetivo
+                # Suma por columna objetivo ordenando las filas: reduceat es ~2x más rápido que np.add.at
+                np.multiply(hidden, dz_salida[:, :1], out=w_objetivo)
+                orden = np.argsort(objetivos, kind='stable')
+                ordenados = objetivos[orden]
+                primeros = np.flatnonzero(np.r_[True, ordenados[1:] != ordenados[:-1]])
+                dw_os[:, ordenados[primeros]] += np.add.reduceat(w_objetivo[orden], primeros, axis=0).T
+            d_hidden[halo:] *= swish_grad
+            db_o += np.sum(d_hidden, axis=0, keepdims=True)
+            
+            # --- DISTRIBUCIÓN DE GRADIENTES POR VENTANA DE CONTEXTO ---
+            # Como usamos el promedio de una ventana, el gradiente en cada posición
+            # se distribuye equitativamente entre los caracteres de esa ventana.
+            d_embeddings = d_hidden
+            if L > 1:
+                # Inversa del promedio móvil (propagación de gradiente causal):
+                # cada posición t recibe d_hidden[t...t+k-1] / divisores, que es la diferencia
+                # de dos valores de la suma acumulada desde el final
+                d_normalizado = espacio.buffer('swish_grad', filas, D)
+                np.multiply(d_hidden, espacio.divisores_inversos(filas, k, inicio - halo), out=d_normalizado)
+                acumulado = espacio.buffer('cumsum', filas, D)
+                np.cumsum(d_normalizado[::-1], axis=0, out=acumulado)
+                desde_t = acumulado[::-1]
+                d_embeddings = espacio.buffer('d_embeddings', filas, D)
+                corte = max(0, filas - k)
+                d_embeddings[corte:] = desde_t[corte:]
+                np.subtract(desde_t[:corte], desde_t[k:], out=d_embeddings[:corte])
+            np.add.at(dw_eo, x_tramo, d_embeddings)
+        
+        return dw_eo, dw_os, db_o, db_s, perdida / L
+
+    def _paso_adam(self, param, grad, m, v, columnas=None):
+        """Actualización Adam; con columnas, solo esas (Adam perezoso de la softmax muestreada)"""
+        correccion_m = 1 - self.beta1**self.t + self.eps
+        correccion_v = 1 - self.beta2**self.t + self.eps
+        if columnas is None:
+            # En sitio, con un único temporal del espacio de trabajo
+            tmp = self.espacio.buffer('adam', *param.shape)
+            m *= self.beta1
+            np.multiply(grad, 1 - self.beta1, out=tmp)
+            m += tmp
+            v *= self.beta2
+            np.square(grad, out=tmp)
+            tmp *= 1 - self.beta2
+            v += tmp
+            # param -= lr * m_hat / (sqrt(v_hat) + eps)
+            np.divide(v, correccion_v, out=tmp)
+            np.sqrt(tmp, out=tmp)
+            tmp += self.eps
+            np.divide(m, tmp, out=tmp)
+            tmp *= self.lr / correccion_m
+            param -= tmp
+            return
+        m_c = self.beta1 * m[:, columnas] + (1 - self.beta1) * grad
+        v_c = self.beta2 * v[:, columnas] + (1 - self.beta2) * (grad**2)
+        m[:, columnas] = m_c
+        v[:, columnas] = v_c
+        m_hat = m_c / correccion_m
+        v_hat = v_c / correccion_v
+        param[:, columnas] -= self.lr * m_hat / (np.sqrt(v_hat) + self.eps)
+
+    def configurar_softmax(self, modo="exacta", negativos=64):
+        """
+        Objetivo de entrenamiento de la capa de salida: "exacta" (softmax sobre todo el vocabulario)
+        o "muestreada" (cada posición puntúa su objetivo y `negativos` caracteres compartidos, sacados
+        según su frecuencia). Con vocabularios de menos de 2 × negativos se entrena con la exacta.
+        La inferencia usa siempre la softmax exacta.
+        """
+        if modo not in MODOS_SOFTMAX:
+            raise ValueError(f"modo de softmax desconocido: {modo}")
+        with self.lock:
+            self.modo_softmax = modo
+            self.negativos_softmax = max(1, int(negativos))
 
-    def dormir(self, umbral_poda=0.01, factor_refuerzo=1.1):
-        """Simula el sueño: consolida memoria (con poda)"""
-        return self._procesar_descanso(umbral_poda, factor_refuerzo, decay=0.9995, fase="profundo")
+    def _usar_muestreo(self):
+        # Con vocabularios pequeños la softmax exacta cuesta lo mismo y no aproxima nada
+        return self.modo_softmax == "muestreada" and len(self.vocab) > 2 * self.negativos_softmax
+
+    def _negativos_muestreo(self):
+        """
+        Negativos compartidos por todo un paso: negativos_softmax caracteres sin reemplazo con
+        probabilidad ∝ frecuencia^0.75, y su corrección logQ (log del número esperado de apariciones).
+        """
+        n_vocab = len(self.vocab)
+        k = self.negativos_softmax
+        q = (self.frecuencias[:n_vocab] + 1.0) ** 0.75
+        q /= q.sum()
+        negativos = np.random.choice(n_vocab, size=k, replace=False, p=q)
+        return negativos, np.log(np.minimum(1.0, k * q[negativos])).astype(np.float32)
+
+    def _candidatos_muestreo(self, Y):
+        """
+        Muestra de un paso de la softmax muestreada. Cada fila puntúa solo su objetivo y los
+        negativos compartidos, así que el coste de la salida es L × (negativos + 1) sea cual sea
+        la variedad del bloque. Devuelve (candidatos, Y local, negativos locales, corrección):
+        candidatos son las columnas que reciben gradiente (objetivos ∪ negativos) y los índices
+        locales apuntan a ellas.
+        """
+        negativos, correccion = self._negativos_muestreo()
+        candidatos, locales = np.unique(np.concatenate([np.asarray(Y, dtype=np.int64), negativos]),
+                                        return_inverse=True)
+        return candidatos, locales[:len(Y)], locales[len(Y):], correccion
+
+    def _contar_frecuencias(self, indices):
+        self.frecuencias += np.bincount(np.asarray(indices, dtype=np.int64), minlength=len(self.frecuencias))
+
+    def dormir(self, umbral_poda=0.01, factor_refuerzo=1.1, poda_estructural=True):
+        """Simula el sueño: consolida memoria (con poda) y elimina las neuronas que quedaron muertas"""
+        with self.lock:
+            resultado = self._procesar_descanso(umbral_poda, factor_refuerzo, decay=0.9995, fase="profundo")
+            resultado['neuronas_eliminadas'] = self.podar_neuronas() if poda_estructural else 0
+            return resultado
+
+    def podar_neuronas(self, umbral_relativo=0.05, max_fraccion=0.1, minimo=N_OCULTA_MINIMA):
+        """
+        Poda estructural: elimina las neuronas ocultas con las conexiones de entrada (columna de w_eo)
+        y de salida (fila de w_os) prácticamente muertas, con norma por debajo de umbral_relativo × la
+        mediana. Recorta de verdad w_eo, w_os, b_o y sus buffers de Adam, así que el cerebro queda más
+        pequeño y más rápido. Como mucho max_fraccion de las neuronas por llamada y nunca por debajo
+        de `minimo`. Devuelve cuántas eliminó.
+        """
+        with self.lock:
+            # En sesión GPU los pesos de CPU están desfasados: decidir y recortar sobre los de la GPU
+            en_gpu = getattr(self, 'en_sesion_gpu', False)
+            if en_gpu:
+                self.sincronizar_gpu_a_cpu()
+            entrada = np.linalg.norm(self.w_eo, axis=0)
+            salida = np.linalg.norm(self.w_os, axis=1)
+            muertas = ((entrada <= max(umbral_relativo * np.median(entrada), 1e-10)) &
+                       (salida <= max(umbral_relativo * np.median(salida), 1e-10)))
+            candidatas = np.flatnonzero(muertas)
+            n_max = min(int(self.n_oculta * max_fraccion), self.n_oculta - minimo)
+            if n_max <= 0 or not len(candidatas):
+                return 0
+            if len(candidatas) > n_max:
+                # Primero las más débiles
+                candidatas = candidatas[np.argsort((entrada * salida)[candidatas])[:n_max]]
+            conservar = np.setdiff1d(np.arange(self.n_oculta), candidatas)
+            
+            self.w_eo, self.m_w_eo, self.v_w_eo = (a[:, conservar] for a in (self.w_eo, self.m_w_eo, self.v_w_eo))
+            self.w_os, self.m_w_os, self.v_w_os = (a[conservar, :] for a in (self.w_os, self.m_w_os, self.v_w_os))
+            self.b_o, self.m_b_o, self.v_b_o = (a[:, conservar] for a in (self.b_o, self.m_b_o, self.v_b_o))
+            self.n_oculta = len(conservar)
+            # Los buffers del tamaño anterior ya no sirven
+            self.espacio.liberar()
+            self.marcar_cambio()
+            if en_gpu:
+                self.iniciar_sesion_gpu()
+            
+            print(f"✂️ PODA ESTRUCTURAL: {len(candidatas)} neuronas eliminadas, quedan {self.n_oculta}")
+            if hasattr(self, 'on_expand') and self.on_expand:
+                self.on_expand(self.n_oculta)
+            return len(candidatas)
 
     def siesta(self, factor_refuerzo=1.05):
         """Simula una siesta: organiza y refuerza sin borrar (sin poda)"""
@@ -313,6 +964,7 @@ class RedCrecimientoInfinito:
             
             self.b_o = np.clip(self.b_o, -2, 2)
             self.b_s = np.clip(self.b_s, -2, 2)
+            self.marcar_cambio()
             
             conexiones_finales = np.count_nonzero(np.abs(self.w_eo) > 1e-10) + np.count_nonzero(np.abs(self.w_os) > 1e-10)
             
@@ -325,11 +977,11 @@ class RedCrecimientoInfinito:
     def generar_respuesta(self, semilla, longitud=120, temperatura=0.7, top_p=0.9, penalty=1.2):
         """Generación avanzada con Top-p (Nucleus) Sampling y Penalización de Repetición"""
         with self.lock:
-            indices_contexto = [self.char_to_int[c] for c in semilla if c in self.char_to_int]
+            indices_contexto = self.tokenizador.codificar(semilla).tolist()
             if not indices_contexto:
                 indices_contexto = [self.char_to_int[np.random.choice(self.vocab)]]
                 
-            res = ""
+            generados = []
             counts = {} # Para penalización de repetición
             
             for _ in range(longitud):
@@ -345,6 +997,11 @@ class RedCrecimientoInfinito:
                     if logits[idx] > 0: logits[idx] /= (penalty * count)
                     else: logits[idx] *= (penalty * count)
                 
+                # El cubo OOV no es un carácter real: nunca se genera
+                oov = self.tokenizador.oov
+                if oov >= 0 and len(self.vocab) > 1:
+                    logits[oov] = -np.inf
+                
                 # 3. Softmax manual para aplicar Top-p
                 exp_l = np.exp(logits - np.max(logits))
                 probs = exp_l / np.sum(exp_l)
@@ -366,19 +1023,19 @@ class RedCrecimientoInfinito:
                 
                 # 5. Muestreo final
                 siguiente_idx = np.random.choice(len(self.vocab), p=probs)
-                char_nuevo = self.int_to_char[siguiente_idx]
+                char_nuevo = self.tokenizador.chars[siguiente_idx]
                 
-                res += char_nuevo
+                generados.append(siguiente_idx)
                 indices_contexto.append(siguiente_idx)
                 counts[siguiente_idx] = counts.get(siguiente_idx, 0) + 1
                 
                 if len(indices_contexto) > 20:
                     indices_contexto.pop(0)
 
-                if char_nuevo == "\n" or (char_nuevo in ".!?" and len(res) > 20): break
-                if char_nuevo == " " and len(res) > 80: break
+                if char_nuevo == "\n" or (char_nuevo in ".!?" and len(generados) > 20): break
+                if char_nuevo == " " and len(generados) > 80: break
                 
-            return res
+            return self.tokenizador.decodificar(generados)
 
     def aprender_gpu(self, texto, epocas=3):
         """Versión acelerada por GPU (MPS en Mac) para entrenamiento masivo"""
@@ -395,22 +1052,21 @@ class RedCrecimientoInfinito:
 
         with self.lock: # Bloquear igual que en CPU para thread-safety
             # 1. Chequear caracteres desconocidos
-            desconocidos = [c for c in texto if c not in self.char_to_int]
+            desconocidos = self.tokenizador.desconocidos(texto)
             if desconocidos:
-                self.expandir_vocabulario(list(set(desconocidos)))
-                if getattr(self, 'en_sesion_gpu', False):
-                    self.iniciar_sesion_gpu() # Re-iniciar si estaba activa para actualizar shapes
+                self.expandir_vocabulario(desconocidos) # Re-inicia la sesión GPU si estaba activa
 
             device = torch.device("mps")
             self.interacciones += 1
             
             # Convertir texto a índices
-            indices = [self.char_to_int[c] for c in texto if c in self.char_to_int]
+            indices = self.tokenizador.codificar(texto)
             if len(indices) < 2: return
+            self._contar_frecuencias(indices)
             
             # Convertir datos a tensores en GPU
-            X_data = np.array(indices[:-1], dtype=np.int64)
-            Y_data = np.array(indices[1:], dtype=np.int64)
+            X_data = indices[:-1]
+            Y_data = indices[1:]
             
             X_tensor = torch.from_numpy(X_data).to(device)
             Y_tensor = torch.from_numpy(Y_data).to(device)
@@ -428,49 +1084,27 @@ class RedCrecimientoInfinito:
             
             # Optimizador Adam en PyTorch
             optimizer = torch.optim.Adam([w_eo_torch, w_os_torch, b_o_torch, b_s_torch], lr=self.lr)
-            loss_fn = torch.nn.CrossEntropyLoss()
-            
-            L = len(X_data)
             
+            inicio_paso = time.perf_counter()
+            perdida = 0
             for _ in range(epocas):
                 optimizer.zero_grad()
-                
-                # Embeddings: (L, D)
-                embeddings = w_eo_torch[X_tensor]
-                
-                # Codificación Posicional GPU
-                with torch.no_grad():
-                    posiciones = torch.arange(L, device=device).unsqueeze(1)
-                    div_term = torch.exp(torch.arange(0, self.n_oculta, 2, device=device) * -(np.log(10000.0) / self.n_oculta))
-                    pe = torch.zeros((L, self.n_oculta), device=device)
-                    pe[:, 0::2] = torch.sin(posiciones * div_term)
-                    pe[:, 1::2] = torch.cos(posiciones * div_term)
-                
-                embeddings = embeddings + pe
-                
-                # Capa Oculta con Swish (SiLU en PyTorch)
-                hidden = torch.nn.functional.silu(embeddings + b_o_torch)
-                
-                # Capa Salida
-                logits = torch.matmul(hidden, w_os_torch) + b_s_torch
-                
-                # Loss
-                loss = loss_fn(logits, Y_tensor)
-                
-                # Backward
-                loss.backward()
+                # Forward + Backward (por tramos si el bloque no cabe en memoria_activaciones)
+                perdida = self._pasada_gpu(w_eo_torch, w_os_torch, b_o_torch, b_s_torch, X_tensor, Y_tensor, device)
                 optimizer.step()
+                self.marcar_cambio()
             
             # Sincronizar pesos de vuelta a CPU con detach
             self.w_eo = w_eo_torch.detach().cpu().numpy()
             self.w_os = w_os_torch.detach().cpu().numpy()
             self.b_o = b_o_torch.detach().cpu().numpy()
             self.b_s = b_s_torch.detach().cpu().numpy()
+            self._observar_entrenamiento(len(X_data) * epocas, time.perf_counter() - inicio_paso, float(perdida))
             
             # Actualizar contadores de expansión
             self.caracteres_totales += len(texto)
             if self.caracteres_totales % 2000 == 0: # Chequear expansión menos frecuente en GPU
-                self.expandir_cerebro()
+                self._crecer_si_procede()
                 # Nota: Si el cerebro se expande, los punteros self.w_eo cambian de tamaño
                 # y en la próxima llamada a aprender_gpu se volverán a cargar con el nuevo tamaño.
 
@@ -484,19 +1118,7 @@ class RedCrecimientoInfinito:
             with self.lock:
                 self.device = torch.device("mps")
                 
-                # Pre-calcular mapa de caracteres para vectorización rápida
-                # Creamos un array numpy que actúa como Look-Up Table (LUT)
-                # Asumimos unicode max 65536 para texto normal, o usamos dict.
-                # Para máxima velocidad (aunque gasta RAM), un array directo:
-                self.max_char_val = 128 # ASCII extendido basico
-                for c in self.char_to_int:
-                    self.max_char_val = max(self.max_char_val, ord(c))
-                
-                self.char_map_array = np.zeros(self.max_char_val + 1, dtype=np.int32) - 1
-                for c, i in self.char_to_int.items():
-                    if ord(c) <= self.max_char_val:
-                        self.char_map_array[ord(c)] = i
-
+                # La LUT de caracteres vive en self.tokenizador y se actualiza al expandir el vocabulario
                 self.gpu_cache = {
                     'w_eo': torch.from_numpy(self.w_eo).to(self.device).requires_grad_(True),
                     'w_os': torch.from_numpy(self.w_os).to(self.device).requires_grad_(True),
@@ -510,7 +1132,6 @@ class RedCrecimientoInfinito:
                      self.gpu_cache['b_o'], self.gpu_cache['b_s']], 
                     lr=self.lr
                 )
-                self.gpu_loss_fn = torch.nn.CrossEntropyLoss()
                 
                 self.en_sesion_gpu = True
                 print("🧠 SESIÓN GPU (V2) INICIADA: LUT compilada.")
@@ -526,74 +1147,115 @@ class RedCrecimientoInfinito:
             return
 
         with self.lock:
-            import torch
             # 1. Chequear caracteres desconocidos
-            desconocidos = [c for c in texto if c not in self.char_to_int]
+            desconocidos = self.tokenizador.desconocidos(texto)
             if desconocidos:
-                self.expandir_vocabulario(list(set(desconocidos)))
-                self.iniciar_sesion_gpu() # Actualizar sesión con nuevos shapes
+                self.expandir_vocabulario(desconocidos) # Sincroniza y recarga la sesión con los nuevos shapes
 
-            self.interacciones += 1
-            
             # --- TOKENIZACIÓN ULTRARÁPIDA ---
-            # 1. Convertir string a buffer int32 (Unicode)
-            # En Python str es unicode, difícil de acceder directo sin C.
-            # Método híbrido rápido: encode utf-32 (4 bytes) y leer numpy
-            # Ojo: esto es complejo. Método "Dumb but Fast":
-            # Usar bytearray si es ASCII, o lista si es mix.
-            # OPTIMIZACIÓN: Solo chars conocidos.
-            
-            # Revertimos a lista por compatibilidad unicode segura, pero optimizada
-            # Si el texto es muy largo, str.translate es más rápido que loops
-            # Pero necesitamos mapear a ints.
-            
-            # Intento de vectorización con numpy
-            # codigos = np.array([ord(c) for c in texto], dtype=np.int32)
-            # indices = self.char_map_array[codigos]
-            # indices = indices[indices >= 0]
-            
-            # Fallback seguro y mejorado:
-            indices = [self.char_to_int[c] for c in texto if c in self.char_to_int]
+            # utf-32 → np.frombuffer → LUT (ver TokenizadorCaracteres), sin bucles Python por carácter
+            indices = self.tokenizador.codificar(texto)
+            self.aprender_indices_gpu(indices, epocas=epocas)
+
+    def aprender_indices_gpu(self, indices, epocas=2):
+        """Entrena índices ya tokenizados en la sesión GPU (sin sesión: CPU)"""
+        if not getattr(self, 'en_sesion_gpu', False):
+            self.aprender_indices(indices, epocas=epocas)
+            return
+
+        with self.lock:
+            import torch
+            self.interacciones += 1
             if len(indices) < 2: return
+            self._contar_frecuencias(indices)
             
-            X_tensor = torch.tensor(indices[:-1], dtype=torch.long, device=self.device)
-            Y_tensor = torch.tensor(indices[1:], dtype=torch.long, device=self.device)
+            indices = torch.as_tensor(np.asarray(indices, dtype=np.int64), device=self.device)
+            X_tensor = indices[:-1]
+            Y_tensor = indices[1:]
             
             w_eo = self.gpu_cache['w_eo']
             w_os = self.gpu_cache['w_os']
             b_o = self.gpu_cache['b_o']
             b_s = self.gpu_cache['b_s']
             
+            L_batch = X_tensor.size(0)
+            inicio_paso = time.perf_counter()
+            perdida = 0
             for _ in range(epocas):
                 self.gpu_optimizer.zero_grad()
-                embeddings = w_eo[X_tensor]
-                
-                # Codificación Posicional
-                L_batch = X_tensor.size(0)
-                posiciones = torch.arange(L_batch, device=self.device).unsqueeze(1)
-                div_term = torch.exp(torch.arange(0, self.n_oculta, 2, device=self.device) * -(np.log(10000.0) / self.n_oculta))
-                pe = torch.zeros((L_batch, self.n_oculta), device=self.device)
-                pe[:, 0::2] = torch.sin(posiciones * div_term)
-                pe[:, 1::2] = torch.cos(posiciones * div_term)
-                
-                embeddings = embeddings + pe
-                
-                hidden = torch.nn.functional.silu(embeddings + b_o)
-                logits = torch.matmul(hidden, w_os) + b_s
-                loss = self.gpu_loss_fn(logits, Y_tensor)
-                loss.backward()
+                perdida = self._pasada_gpu(w_eo, w_os, b_o, b_s, X_tensor, Y_tensor, self.device)
                 self.gpu_optimizer.step()
+                self.marcar_cambio()
                 if L_batch > 1000: torch.mps.empty_cache() # Evitar fragmentación en bloques gigantes
+            # float() sincroniza con la GPU una vez por bloque, no por época
+            self._observar_entrenamiento(L_batch * epocas, time.perf_counter() - inicio_paso, float(perdida))
             
-            self.caracteres_totales += len(texto)
+            self.caracteres_totales += len(indices)
             
             # --- EXPANSIÓN DINÁMICA (Exponential Throttling) ---
             # Antes: if self.caracteres_totales % 2000 == 0
             # Ahora: Cuanto más grande la red, menos frecuentemente expande.
             # Umbral = 2000 * (1 + neuronas/500)
             umbral_expansion = 2000 * (1 + (self.n_oculta // 500))
-            if self.caracteres_totales % umbral_expansion < len(texto): # Deteción aproximada de cruce
-                 self.expandir_cerebro_gpu() # Nueva versión interna para GPU
+            if self.caracteres_totales % umbral_expansion < len(indices): # Deteción aproximada de cruce
+                 self._crecer_si_procede(en_gpu=True) # Nueva versión interna para GPU
+
+    def _pasada_gpu(self, w_eo, w_os, b_o, b_s, X_tensor, Y_tensor, device):
+        """
+        Forward + backward en la GPU, por tramos de posiciones_por_tramo: cada tramo hace su
+        backward y libera su grafo, y los gradientes se acumulan en los tensores de pesos.
+        La pérdida es la media sobre el bloque entero, igual que de una sola vez; se devuelve
+        como tensor (sin sincronizar con la GPU).
+        En modo muestreado, cada fila puntúa su objetivo y unos negativos compartidos por toda la
+        pasada (como _candidatos_muestreo en CPU): la salida es L × (negativos + 1).
+        """
+        import torch
+        L = X_tensor.size(0)
+        negativos = None
+        if self._usar_muestreo():
+            negativos, correccion = self._negativos_muestreo()
+            negativos = torch.as_tensor(negativos, device=device)
+            correccion = torch.as_tensor(correccion, device=device)
+        # Activaciones que autograd guarda por posición: embeddings, pe, suma, pre-activación, oculta
+        # (y los pesos del objetivo de cada fila con la softmax muestreada)
+        if negativos is None:
+            tramo = self.posiciones_por_tramo(w_os.shape[1], buffers_por_fila=6) or L
+        else:
+            tramo = self.posiciones_por_tramo(negativos.size(0) + 1, buffers_por_fila=7) or L
+        div_term = torch.exp(torch.arange(0, self.n_oculta, 2, device=device) * -(np.log(10000.0) / self.n_oculta))
+        total = 0
+        for inicio in range(0, L, tramo):
+            fin = min(L, inicio + tramo)
+            # Embeddings: (tramo, D)
+            embeddings = w_eo[X_tensor[inicio:fin]]
+            
+            # Codificación Posicional GPU (posiciones absolutas dentro del bloque)
+            with torch.no_grad():
+                posiciones = torch.arange(inicio, fin, device=device).unsqueeze(1)
+                pe = torch.zeros((fin - inicio, self.n_oculta), device=device)
+                pe[:, 0::2] = torch.sin(posiciones * div_term)
+                pe[:, 1::2] = torch.cos(posiciones * div_term)
+            
+            # Capa Oculta con Swish (SiLU en PyTorch)
+            hidden = torch.nn.functional.silu(embeddings + pe + b_o)
+            
+            # Capa Salida
+            objetivos = Y_tensor[inicio:fin]
+            if negativos is None:
+                logits = torch.matmul(hidden, w_os) + b_s
+            else:
+                # Columna 0: el objetivo de la fila; un negativo que coincide con él no cuenta
+                logit_objetivo = (hidden * w_os[:, objetivos].T).sum(dim=1) + b_s[0, objetivos]
+                logits_negativos = torch.matmul(hidden, w_os[:, negativos]) + (b_s[0, negativos] - correccion)
+                logits_negativos = logits_negativos.masked_fill(objetivos.unsqueeze(1) == negativos, float('-inf'))
+                logits = torch.cat([logit_objetivo.unsqueeze(1), logits_negativos], dim=1)
+                objetivos = torch.zeros_like(objetivos)
+            
+            # Loss y Backward (acumula en .grad)
+            loss = torch.nn.functional.cross_entropy(logits, objetivos, reduction='sum') / L
+            loss.backward()
+            total = total + loss.detach()
+        return total
 
     def expandir_cerebro_gpu(self):
         """Versión especial de expansión que actualiza los tensores en VRAM"""
@@ -641,8 +1303,16 @@ class RedCrecimientoInfinito:
         if torch.backends.mps.is_available():
             torch.mps.empty_cache()
 
-    def guardar(self, archivo):
+    def guardar(self, archivo, forzar=False):
+        """Guarda el cerebro en disco. Devuelve False si no había cambios que escribir."""
         with self.lock:
+            if not forzar and not self.esta_sucio(archivo) and os.path.exists(archivo):
+                return False
+
+            # Sincronizar con GPU si está activa antes de guardar
+            if getattr(self, 'en_sesion_gpu', False):
+                self.sincronizar_gpu_a_cpu()
+
             # Detectar si safetensors está disponible y si el archivo debe ser safetensors
             usar_safetensors = save_file is not None and archivo.endswith('.safetensors')
             
@@ -654,12 +1324,9 @@ class RedCrecimientoInfinito:
                     'm_w_eo': self.m_w_eo, 'v_w_eo': self.v_w_eo,
                     'm_w_os': self.m_w_os, 'v_w_os': self.v_w_os,
                     'm_b_o': self.m_b_o, 'v_b_o': self.v_b_o,
-                    'm_b_s': self.m_b_s, 'v_b_s': self.v_b_s
+                    'm_b_s': self.m_b_s, 'v_b_s': self.v_b_s,
+                    'frecuencias': self.frecuencias
                 }
-                
-                # Sincronizar con GPU si está activa antes de guardar
-                if getattr(self, 'en_sesion_gpu', False):
-                    self.sincronizar_gpu_a_cpu()
 
                 # 2. Preparar Metadata (Todo debe ser string)
                 metadata = {
@@ -667,7 +1334,8 @@ class RedCrecimientoInfinito:
                     'vocab': "".join(self.vocab), # String único
                     'n_oculta': str(self.n_oculta),
                     'interacciones': str(self.interacciones),
-                    'caracteres_totales': str(self.caracteres_totales)
+                    'caracteres_totales': str(self.caracteres_totales),
+                    'version': str(self.version)
                 }
                 
                 save_file(tensors, archivo, metadata=metadata)
@@ -682,12 +1350,25 @@ class RedCrecimientoInfinito:
                         'm_w_os': self.m_w_os, 'v_w_os': self.v_w_os,
                         'm_b_o': self.m_b_o, 'v_b_o': self.v_b_o,
                         'm_b_s': self.m_b_s, 'v_b_s': self.v_b_s,
+                        'frecuencias': self.frecuencias,
                         't': self.t,
                         'vocab': self.vocab, 'n_oculta': self.n_oculta,
                         'interacciones': self.interacciones,
-                        'caracteres_totales': self.caracteres_totales
+                        'caracteres_totales': self.caracteres_totales,
+                        'version': self.version
                     }, f)
 
+            self._version_guardada = self.version
+            self._archivo_guardado = archivo
+            return True
+
+    @staticmethod
+    def _frecuencias_cargadas(frecuencias, n_vocab):
+        # Cerebros guardados antes de contar frecuencias: empiezan a cero
+        if frecuencias is None or len(frecuencias) != n_vocab:
+            return np.zeros(n_vocab, dtype=np.int64)
+        return np.asarray(frecuencias, dtype=np.int64)
+
     @staticmethod
     def cargar(archivo):
         # Detectar formato
@@ -717,6 +1398,9 @@ class RedCrecimientoInfinito:
             n_oculta = int(metadata['n_oculta'])
             vocab_str = metadata['vocab']
             red = RedCrecimientoInfinito(vocabulario=list(vocab_str), n_oculta=n_oculta)
+            # El constructor ordena el vocabulario; los pesos siguen el orden guardado (con expansiones al final)
+            red.vocab = list(vocab_str)
+            red._indexar_vocab()
             
             # Asignar tensores
             red.w_eo = tensors['w_eo']
@@ -732,11 +1416,15 @@ class RedCrecimientoInfinito:
             red.v_b_o = tensors.get('v_b_o', np.zeros_like(red.b_o))
             red.m_b_s = tensors.get('m_b_s', np.zeros_like(red.b_s))
             red.v_b_s = tensors.get('v_b_s', np.zeros_like(red.b_s))
+            red.frecuencias = RedCrecimientoInfinito._frecuencias_cargadas(tensors.get('frecuencias'), len(red.vocab))
             
             # Restaurar escalares
             red.t = int(metadata.get('t', 0))
             red.interacciones = int(metadata.get('interacciones', 0))
             red.caracteres_totales = int(metadata.get('caracteres_totales', 0))
+            red.version = int(metadata.get('version', 0))
+            red._version_guardada = red.version
+            red._archivo_guardado = archivo
             
             return red
 
@@ -745,9 +1433,8 @@ class RedCrecimientoInfinito:
             with open(archivo, 'rb') as f:
                 d = pickle.load(f)
             red = RedCrecimientoInfinito(n_oculta=d['n_oculta'])
-            red.vocab = d['vocab']
-            red.char_to_int = {char: i for i, char in enumerate(red.vocab)}
-            red.int_to_char = {i: char for i, char in enumerate(red.vocab)}
+            red.vocab = list(d['vocab'])
+            red._indexar_vocab()
             red.w_eo, red.w_os, red.b_o, red.b_s = d['w_eo'], d['w_os'], d['b_o'], d['b_s']
             
             # Cargar buffers de Adam si existen
@@ -759,6 +1446,7 @@ class RedCrecimientoInfinito:
             red.v_b_o = d.get('v_b_o', np.zeros_like(red.b_o))
             red.m_b_s = d.get('m_b_s', np.zeros_like(red.b_s))
             red.v_b_s = d.get('v_b_s', np.zeros_like(red.b_s))
+            red.frecuencias = RedCrecimientoInfinito._frecuencias_cargadas(d.get('frecuencias'), len(red.vocab))
             red.t = d.get('t', 0)
             
             red.interacciones = d.get('interacciones', 0)
@@ -778,6 +1466,10 @@ class RedCrecimientoInfinito:
             red.m_b_s = red.m_b_s.astype(np.float32)
             red.v_b_s = red.v_b_s.astype(np.float32)
             
+            red.version = d.get('version', 0)
+            red._version_guardada = red.version
+            red._archivo_guardado = archivo
+            
             return red
 
 if __name__ == "__main__":
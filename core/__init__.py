@@ -1,4 +1,11 @@
 """Core module for MAGI system"""
-from .signals import IAWorkerSignals
 
 __all__ = ['IAWorkerSignals']
+
+
+def __getattr__(name):
+    # Importación diferida: los modos de consola no necesitan PySide6
+    if name == 'IAWorkerSignals':
+        from .signals import IAWorkerSignals
+        return IAWorkerSignals
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,69 @@
+"""
+Corpus comprimidos y empaquetados
+Lee líneas de .gz/.bz2/.xz y de miembros de texto de .zip/.tar descomprimiendo de forma incremental
+(solo códecs de la biblioteca estándar)
+"""
+import bz2
+import gzip
+import lzma
+import tarfile
+import zipfile
+
+EXTENSIONES_TEXTO = ('.txt',)
+# Cada códec recibe el archivo en disco ya abierto en binario
+COMPRESORES = {
+    '.gz': lambda raw: gzip.GzipFile(fileobj=raw, mode='rb'),
+    '.bz2': bz2.BZ2File,
+    '.xz': lzma.LZMAFile,
+}
+EXTENSIONES_TAR = ('.tar', '.tgz', '.tbz2', '.txz', '.tar.gz', '.tar.bz2', '.tar.xz')
+
+
+def extensiones_corpus(base=EXTENSIONES_TEXTO):
+    """Extensiones que las rutas de texto aceptan: planas, comprimidas y empaquetadas"""
+    comprimidas = tuple(ext + comp for ext in base for comp in COMPRESORES)
+    return tuple(base) + comprimidas + ('.zip',) + EXTENSIONES_TAR
+
+
+def es_comprimido(path):
+    """True si el archivo hay que descomprimirlo (offsets en bytes del archivo en disco, no del texto)"""
+    nombre = path.lower()
+    return nombre.endswith('.zip') or nombre.endswith(EXTENSIONES_TAR) or nombre.endswith(tuple(COMPRESORES))
+
+
+def _iter_lineas(f, raw, max_linea):
+    while True:
+        linea = f.readline(max_linea)
+        if not linea:
+            break
+        yield linea, raw.tell()
+
+
+def iter_lineas_comprimidas(path, max_linea, base=EXTENSIONES_TEXTO):
+    """
+    Genera (linea_bytes, offset) donde offset es la posición en el archivo comprimido (para progreso).
+    Los miembros de un .zip/.tar se leen en orden, separados por una línea vacía (fin de párrafo).
+    """
+    nombre = path.lower()
+    with open(path, 'rb') as raw:
+        if nombre.endswith(EXTENSIONES_TAR):
+            # Modo flujo ('r|*'): un único recorrido secuencial, sin buscar hacia atrás
+            with tarfile.open(fileobj=raw, mode='r|*') as tar:
+                for miembro in tar:
+                    if not miembro.isfile() or not miembro.name.lower().endswith(base):
+                        continue
+                    f = tar.extractfile(miembro)
+                    yield from _iter_lineas(f, raw, max_linea)
+                    yield b'\n', raw.tell()
+        elif nombre.endswith('.zip'):
+            with zipfile.ZipFile(raw) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or not info.filename.lower().endswith(base):
+                        continue
+                    with zf.open(info) as f:
+                        yield from _iter_lineas(f, raw, max_linea)
+                    yield b'\n', raw.tell()
+        else:
+            extension = nombre[nombre.rfind('.'):]
+            with COMPRESORES[extension](raw) as f:
+                yield from _iter_lineas(f, raw, max_linea)
@@ -2,14 +2,91 @@
 Gestor de Cerebros MAGI
 Maneja la lógica de los tres cerebros y el votante anónimo
 """
+import itertools
 import os
 import time
+from collections import OrderedDict
 import numpy as np
-import fitz
-import whisper
-import torch
 
-from chat_interactivo import RedCrecimientoInfinito
+from chat_interactivo import RedCrecimientoInfinito, caracteres_a_conservar
+from core.text_stream import (iter_line_batches, iter_stream_batches, ChunkerStage, SentenceChunkerStage,
+                              SegmentChunkerStage, medida_item, file_size)
+from core.pipeline import IngestionPipeline
+from core.content_cache import ContentCache, hash_archivo
+from core.pdf_extract import iter_pdf_pages_cached
+from core.transcription import (get_transcription_worker, iter_transcripciones, elegir_device,
+                                TranscriptionPool, CachedTranscriber, duracion_audio)
+from core.ledger import TrainingLedger, LedgerReport, hash_texto
+from core.job_manifest import JobManifest
+from core.discovery import descubrir
+from core.archives import extensiones_corpus, es_comprimido
+from core.dialogue_import import iter_dialogos, medida_lote
+from core.watcher import FolderWatcher
+from core.token_corpus import TokenCorpus, construir_corpus, EXTENSION as TOKEN_CORPUS_EXTENSION
+from core.shared_vocab import VocabularioCompartido, TokenizerStage
+from core.growth_policy import crear_politica
+
+
+def _ajustar_hilos_entrenamiento(hilos):
+    """
+    Limita los hilos de torch del proceso principal para no competir con los transcriptores.
+    Devuelve los hilos que había (para restaurarlos al terminar) o None sin torch.
+    """
+    try:
+        import torch
+    except ImportError:
+        return None
+    previos = torch.get_num_threads()
+    torch.set_num_threads(hilos)
+    return previos
+
+
+def _entrenar_gpu(ia, texto, epocas, indices=None):
+    """Entrena un bloque en la sesión GPU si el cerebro la soporta (CPU: una época)"""
+    if indices is not None and hasattr(ia, 'aprender_indices_gpu'):
+        ia.aprender_indices_gpu(indices, epocas=epocas)
+    elif hasattr(ia, 'aprender_bloque_gpu'):
+        ia.aprender_bloque_gpu(texto, epocas=epocas)
+    else:
+        ia.aprender(texto, epocas=1)
+
+
+class _ProgresoCarpeta:
+    """
+    Progreso en bytes de un trabajo por carpeta con descubrimiento perezoso: el total son los bytes
+    descubiertos hasta ahora (tamaños del stat de scandir), así que crece mientras se recorre.
+    El hilo fuente del pipeline registra lo descubierto; el de entrenamiento, lo terminado.
+    """
+
+    def __init__(self):
+        self.tamanos = {}
+        self.total = 0
+        self.terminados = 0
+        self.archivos_saltados = 0
+        self.bytes_saltados = 0
+        self._ultimo = 0
+
+    def descubierto(self, path, tamano):
+        self.tamanos[path] = tamano
+        self.total += tamano
+
+    def saltado(self, tamano):
+        self.archivos_saltados += 1
+        self.bytes_saltados += tamano
+
+    def terminado(self, path):
+        self.terminados += self.tamanos.pop(path, 0)
+
+    def porcentaje(self, en_curso=0):
+        """No retrocede aunque el total crezca; el 100 lo marca el final del trabajo"""
+        actual = min(99, int((self.terminados + en_curso) / max(1, self.total) * 100))
+        self._ultimo = max(self._ultimo, actual)
+        return self._ultimo
+
+    def volcar(self, reporte):
+        """Pasa los archivos saltados al informe del ledger (al terminar, desde un solo hilo)"""
+        reporte.archivos_saltados += self.archivos_saltados
+        reporte.caracteres_saltados += self.bytes_saltados
 
 
 class BrainManager:
@@ -20,14 +97,73 @@ class BrainManager:
         self.archivo_gaspar = "gaspar.safetensors"
         self.archivo_casper = "casper.safetensors"
         
+        # Cachés derivadas (texto de PDF, transcripciones...) direccionadas por contenido
+        self.directorio_cache = "magi_cache"
+        
+        # Configuración de Whisper (el modelo se carga una vez y queda caliente)
+        self.whisper_modelo = "base"
+        self.whisper_idioma = "es"
+        # Hilos de torch para el worker de transcripción (None = no tocar). Es un ajuste de todo el
+        # proceso: se aplica al cargar el modelo y limita también el entrenamiento en este proceso
+        self.whisper_hilos = None
+        # Procesos de transcripción para carpetas (None = automático según núcleos)
+        self.transcripcion_procesos = None
+        # Procesos de extracción de PDF (None = automático)
+        self.pdf_workers = None
+        # Límite de la caché de transcripciones
+        self.cache_transcripciones_mb = 512
+        
+        # Registro de contenido ya aprendido: "skip" (saltar), "downweight" (1 época) u "off"
+        self.archivo_ledger = "magi_ledger.sqlite"
+        self.ledger = TrainingLedger(self.archivo_ledger, politica="skip")
+        
+        # Descubrimiento de archivos en carpetas: recursivo, patrones glob y orden por tamaño
+        # (orden: None = orden del recorrido, "pequenos", "grandes" o "nombre")
+        self.busqueda_recursiva = True
+        self.patrones_incluir = None
+        self.patrones_excluir = None
+        self.orden_archivos = None
+        
+        # Checkpoint de trabajos largos (cerebros + manifiesto): cada N archivos o N segundos
+        self.checkpoint_archivos = 50
+        self.checkpoint_segundos = 300
+        
+        # Política de vocabulario: normalización Unicode ("NFC", "NFKC" o None) y tamaño máximo
+        # (None = sin límite; con el vocabulario lleno, los caracteres nuevos van al cubo OOV)
+        self.normalizacion_unicode = "NFC"
+        self.max_vocabulario = None
+        
+        # Objetivo de entrenamiento de la salida: "exacta" o "muestreada" (negativos por frecuencia,
+        # para vocabularios grandes). La inferencia usa siempre la softmax exacta.
+        self.modo_softmax = "exacta"
+        self.negativos_softmax = 64
+        # Memoria (MB) para las activaciones de un paso de entrenamiento por cerebro: los bloques
+        # que no caben se entrenan por tramos con acumulación de gradientes (None = sin límite)
+        self.memoria_activaciones_mb = 256
+        # Política de crecimiento (core.growth_policy); None = crecer en cada punto de crecimiento.
+        # Ver configurar_crecimiento()
+        self.politica_crecimiento = None
+        
+        # Vocabulario compartido (opcional): un solo tokenizado y ampliaciones sincronizadas
+        # en los tres cerebros. Ver activar_vocabulario_compartido()
+        self.vocabulario_compartido = None
+        
         # Cargar o crear cerebros
         self._load_brains()
+        for nombre in ("melchor", "gaspar", "casper"):
+            self._sincronizar_ledger(nombre)
+        self.aplicar_politica_vocabulario()
+        self.aplicar_ajustes_entrenamiento()
         
         # Estado de activación
         self.melchor_activo = True
         self.gaspar_activo = True
         self.casper_activo = True
         self.votante_anonimo_activo = False
+        
+        # Caché de evaluaciones: clave (cerebro, versión del modelo, texto)
+        self._cache_evaluaciones = OrderedDict()
+        self._cache_evaluaciones_max = 512
     
     def _load_brains(self):
         """Carga o crea los cerebros (soporte migración pkl -> safetensors)"""
@@ -62,6 +198,142 @@ class BrainManager:
         self.ia_gaspar = cargar_o_crear(self.archivo_gaspar)
         self.ia_casper = cargar_o_crear(self.archivo_casper)
     
+    def _sincronizar_ledger(self, nombre):
+        """
+        Olvida lo que el ledger registró para un cerebro en versiones posteriores a la cargada:
+        son bloques aprendidos tras su último guardado que el cerebro en disco no contiene.
+        """
+        ia = getattr(self, f"ia_{nombre}")
+        borradas = self.ledger.descartar_posteriores(nombre.upper(), getattr(ia, 'version', 0))
+        if borradas:
+            print(f"🧹 Ledger {nombre.upper()}: {borradas} entradas posteriores al último guardado descartadas")
+    
+    def activar_vocabulario_compartido(self, activo=True):
+        """
+        Alinea los vocabularios de los tres cerebros (activos o no) y comparte el tokenizado.
+        Devuelve cuántos cerebros hubo que permutar.
+        """
+        if not activo:
+            self.vocabulario_compartido = None
+            return 0
+        self.vocabulario_compartido = VocabularioCompartido([self.ia_melchor, self.ia_gaspar, self.ia_casper])
+        return self.vocabulario_compartido.alinear()
+    
+    def aplicar_politica_vocabulario(self):
+        """Aplica normalizacion_unicode y max_vocabulario a los tres cerebros"""
+        for ia in (self.ia_melchor, self.ia_gaspar, self.ia_casper):
+            ia.configurar_vocabulario(self.max_vocabulario, self.normalizacion_unicode)
+        self._realinear_vocabulario()
+    
+    def aplicar_ajustes_entrenamiento(self):
+        """Aplica modo_softmax, negativos_softmax, memoria_activaciones_mb y politica_crecimiento a los tres cerebros"""
+        for ia in (self.ia_melchor, self.ia_gaspar, self.ia_casper):
+            self._ajustar_cerebro(ia)
+    
+    def _ajustar_cerebro(self, ia):
+        ia.configurar_softmax(self.modo_softmax, self.negativos_softmax)
+        ia.memoria_activaciones = self.memoria_activaciones_mb * 1024 * 1024 if self.memoria_activaciones_mb else None
+        ia.politica_crecimiento = self.politica_crecimiento
+    
+    def configurar_crecimiento(self, memoria_mb=None, coste_us=None, estancamiento=False, politica=None, on_decision=None):
+        """
+        Fija la política de crecimiento de los tres cerebros: presupuesto de memoria entre todos (MB),
+        coste máximo de entrenamiento (µs por carácter y época) y/o crecer solo si la pérdida se estanca.
+        Se puede pasar una política ya construida. Sin nada, los cerebros crecen como siempre.
+        """
+        self.politica_crecimiento = politica or crear_politica(memoria_mb, coste_us, estancamiento, on_decision)
+        if self.politica_crecimiento is not None:
+            self.politica_crecimiento.vincular(
+                lambda: {"melchor": self.ia_melchor, "gaspar": self.ia_gaspar, "casper": self.ia_casper})
+        self.aplicar_ajustes_entrenamiento()
+        return self.politica_crecimiento
+    
+    def compactar_vocabularios(self, signals=None, console_mode=False, min_frecuencia=2, max_vocab=None):
+        """
+        Compactación offline: elimina de los cerebros los caracteres con menos de min_frecuencia
+        apariciones (y deja como mucho max_vocab). Con vocabulario compartido se poda el mismo
+        conjunto en los tres cerebros usando las frecuencias sumadas.
+        """
+        def log(msg):
+            if console_mode:
+                print(msg)
+            elif signals:
+                signals.respuesta_lista.emit("SISTEMA", msg)
+        
+        try:
+            if self.vocabulario_compartido is not None:
+                cerebros = [(self.ia_melchor, self.archivo_melchor, "MELCHOR"),
+                            (self.ia_gaspar, self.archivo_gaspar, "GASPAR"),
+                            (self.ia_casper, self.archivo_casper, "CASPER")]
+                totales = {}
+                for ia, _, _ in cerebros:
+                    for c, n in zip(ia.vocab, ia.frecuencias.tolist()):
+                        totales[c] = totales.get(c, 0) + n
+                conservar = caracteres_a_conservar(totales, min_frecuencia, max_vocab) if any(totales.values()) else None
+            else:
+                cerebros = self.get_active_brains()
+                conservar = None
+            
+            for ia, path, nombre in cerebros:
+                antes = len(ia.vocab)
+                if conservar is None and not ia.frecuencias.any():
+                    log(f"⚠️ {nombre}: sin estadísticas de frecuencia todavía; se omite")
+                    continue
+                eliminados = ia.compactar_vocabulario(min_frecuencia, max_vocab, conservar=conservar)
+                ia.guardar(path)
+                muestra = "".join(eliminados[:20]) + ("…" if len(eliminados) > 20 else "")
+                log(f"🗜️ {nombre}: vocabulario {antes} → {len(ia.vocab)}" + (f" (eliminados: {muestra!r})" if eliminados else ""))
+            
+            if self.vocabulario_compartido is not None:
+                self.vocabulario_compartido.alinear()
+            if signals and not console_mode:
+                signals.entrenamiento_terminado.emit()
+        
+        except Exception as e:
+            log(f"❌ Error compactando vocabulario: {str(e)}")
+    
+    def compactar_neuronas(self, signals=None, console_mode=False, umbral_relativo=0.05, max_fraccion=0.1):
+        """
+        Poda estructural bajo demanda (el sueño profundo ya la hace): elimina de los cerebros activos
+        las neuronas ocultas con entrada y salida prácticamente muertas y los guarda más pequeños.
+        """
+        def log(msg):
+            if console_mode:
+                print(msg)
+            elif signals:
+                signals.respuesta_lista.emit("SISTEMA", msg)
+        
+        try:
+            for ia, path, nombre in self.get_active_brains():
+                antes = ia.n_oculta
+                eliminadas = ia.podar_neuronas(umbral_relativo=umbral_relativo, max_fraccion=max_fraccion)
+                if eliminadas:
+                    ia.guardar(path)
+                log(f"✂️ {nombre}: neuronas {antes:,} → {ia.n_oculta:,}")
+            if signals and not console_mode:
+                signals.entrenamiento_terminado.emit()
+        
+        except Exception as e:
+            log(f"❌ Error compactando neuronas: {str(e)}")
+    
+    def _realinear_vocabulario(self):
+        # Tras sustituir un cerebro, el registro debe apuntar al nuevo y alinear su vocabulario
+        if self.vocabulario_compartido is not None:
+            self.activar_vocabulario_compartido(True)
+    
+    def _etapas_tokenizador(self):
+        """Etapa de tokenizado para los pipelines si el vocabulario es compartido"""
+        if self.vocabulario_compartido is None:
+            return []
+        return [("tokenizer", TokenizerStage(self.vocabulario_compartido))]
+    
+    def _aprender_texto(self, ia, texto, epocas=3):
+        """Entrena un texto en un cerebro usando el vocabulario compartido si está activo"""
+        if self.vocabulario_compartido is None:
+            ia.aprender(texto, epocas=epocas)
+        else:
+            ia.aprender_indices(self.vocabulario_compartido.indices_de(texto), epocas=epocas)
+    
     def set_expansion_callbacks(self, melchor=None, gaspar=None, casper=None):
         """Configura callbacks de expansión"""
         if melchor:
@@ -115,7 +387,8 @@ class BrainManager:
             resultados_totales = {
                 'podadas': 0,
                 'reforzadas': 0,
-                'activas': 0
+                'activas': 0,
+                'neuronas_eliminadas': 0
             }
             
             for ia, path, nombre in cerebros_activos:
@@ -128,17 +401,20 @@ class BrainManager:
                 resultados_totales['podadas'] += resultado['podadas']
                 resultados_totales['reforzadas'] += resultado['reforzadas']
                 resultados_totales['activas'] += resultado['activas']
+                resultados_totales['neuronas_eliminadas'] += resultado['neuronas_eliminadas']
                 
                 # Guardar cerebro después del sueño
                 ia.guardar(path)
                 
                 signals.respuesta_lista.emit("ESTADÍSTICAS", 
-                    f"   └─ {nombre}: {resultado['podadas']:,} podadas, {resultado['reforzadas']:,} reforzadas")
+                    f"   └─ {nombre}: {resultado['podadas']:,} podadas, {resultado['reforzadas']:,} reforzadas, "
+                    f"{resultado['neuronas_eliminadas']:,} neuronas eliminadas ({ia.n_oculta:,} quedan)")
             
             # Resumen final
             signals.respuesta_lista.emit("ESTADÍSTICAS", 
                 f"✨ Sueño completado - Total: {resultados_totales['podadas']:,} conexiones eliminadas, "
-                f"{resultados_totales['reforzadas']:,} reforzadas, {resultados_totales['activas']:,} activas")
+                f"{resultados_totales['reforzadas']:,} reforzadas, {resultados_totales['activas']:,} activas, "
+                f"{resultados_totales['neuronas_eliminadas']:,} neuronas eliminadas")
             
             # Actualizar estadísticas
             peso = self.get_total_size_mb()
@@ -191,10 +467,21 @@ class BrainManager:
             signals.respuesta_lista.emit("SISTEMA", f"❌ Error durante la siesta: {str(e)}")
     
     def evaluar_texto(self, ia, texto):
-        """Evalúa la confianza de un cerebro en un texto"""
+        """Evalúa la confianza de un cerebro en un texto (cacheado por versión del modelo)"""
         if not texto:
             return 0
-        indices = [ia.char_to_int[c] for c in texto if c in ia.char_to_int]
+        
+        # La versión cambia con cada mutación y la instancia con cada carga, así que un acierto nunca es obsoleto
+        clave = (getattr(ia, 'instancia', id(ia)), getattr(ia, 'version', None), texto)
+        if clave in self._cache_evaluaciones:
+            self._cache_evaluaciones.move_to_end(clave)
+            return self._cache_evaluaciones[clave]
+        
+        # Con vocabulario compartido, los índices se calculan una vez para todos los cerebros
+        if self.vocabulario_compartido is not None and ia in self.vocabulario_compartido.cerebros:
+            indices = self.vocabulario_compartido.tokenizar(texto).tolist()
+        else:
+            indices = ia.tokenizador.codificar(texto).tolist()
         if len(indices) < 2:
             return 0.5
         
@@ -202,7 +489,12 @@ class BrainManager:
         for i in range(len(indices)-1):
             pred = ia.forward([indices[i]])
             probs.append(pred[0, indices[i+1]])
-        return np.mean(probs) if probs else 0
+        confianza = np.mean(probs) if probs else 0
+        
+        self._cache_evaluaciones[clave] = confianza
+        if len(self._cache_evaluaciones) > self._cache_evaluaciones_max:
+            self._cache_evaluaciones.popitem(last=False)
+        return confianza
     
     def process_message(self, texto, signals):
         """Procesa un mensaje del usuario con soporte para etiquetas @"""
@@ -262,8 +554,8 @@ class BrainManager:
             signals.respuesta_lista.emit(nombre, respuesta_final)
             
             # Solo aprende el cerebro objetivo
-            ia.aprender(texto_limpio)
-            ia.aprender(respuesta_final, epocas=1)
+            self._aprender_texto(ia, texto_limpio)
+            self._aprender_texto(ia, respuesta_final, epocas=1)
             ia.guardar(path)
             return
 
@@ -302,8 +594,8 @@ class BrainManager:
         
         # Entrenar solo a los cerebros que participaron
         for ia, path, _ in brains_to_respond:
-            ia.aprender(texto_limpio)
-            ia.aprender(respuesta_final, epocas=1)
+            self._aprender_texto(ia, texto_limpio)
+            self._aprender_texto(ia, respuesta_final, epocas=1)
             ia.guardar(path)
 
     def process_message_separate(self, texto, signals):
@@ -329,8 +621,8 @@ class BrainManager:
             signals.respuesta_lista.emit(nombre, respuesta)
             
             # Cada uno aprende de su propia respuesta
-            ia.aprender(texto_limpio)
-            ia.aprender(respuesta, epocas=1)
+            self._aprender_texto(ia, texto_limpio)
+            self._aprender_texto(ia, respuesta, epocas=1)
             ia.guardar(path)
             
             # Pequeña pausa para no saturar la UI
@@ -367,8 +659,8 @@ class BrainManager:
         # En modo debate, TAMBIÉN aprenden todos los cerebros activos
         # para que la experiencia sea compartida y evolucionen juntos
         for ia, path, _ in self.get_active_brains():
-            ia.aprender(texto)
-            ia.aprender(respuesta, epocas=1)
+            self._aprender_texto(ia, texto)
+            self._aprender_texto(ia, respuesta, epocas=1)
             ia.guardar(path)
         
         signals.pensando.emit(False)
@@ -379,7 +671,7 @@ class BrainManager:
         if len(activos) > 1:
             signals.respuesta_lista.emit("SISTEMA", f"🧠 Aprendizaje compartido: {', '.join(activos)}")
     
-    def train_massive(self, texto, signals):
+    def train_massive(self, texto, signals, epocas=1):
         """Entrenamiento masivo con progreso basado en caracteres"""
         try:
             cerebros_activos = self.get_active_brains()
@@ -395,11 +687,11 @@ class BrainManager:
             total_chars = max(1, len(texto))
             chars_procesados = 0
             ultimo_progreso_chars = 0
+            reporte = LedgerReport()
             
             for i, linea in enumerate(lineas):
                 if linea.strip():
-                    for ia, _, _ in cerebros_activos:
-                        ia.aprender(linea, epocas=1)
+                    self._aprender_bloque(cerebros_activos, linea, epocas, reporte)
                 
                 chars_procesados += len(linea) + 1 # +1 por el \n
                 
@@ -411,7 +703,10 @@ class BrainManager:
             
             for ia, path, _ in cerebros_activos:
                 ia.guardar(path)
+            self.ledger.commit()
             
+            if reporte.hay_algo():
+                signals.respuesta_lista.emit("SISTEMA", reporte.resumen())
             signals.progreso_entrenamiento.emit(100)
             signals.entrenamiento_terminado.emit()
             
@@ -419,7 +714,122 @@ class BrainManager:
             signals.respuesta_lista.emit("SISTEMA", f"Error en entrenamiento: {str(e)}")
             signals.progreso_entrenamiento.emit(0)
     
-    def train_from_file(self, path, signals):
+    def _descubrir(self, folder_path, extensiones):
+        """
+        Entradas (path, tamano, mtime) de la carpeta según la configuración de descubrimiento:
+        el generador perezoso de scandir, o una lista si hay que ordenarlas
+        """
+        return descubrir(
+            folder_path,
+            extensiones=extensiones,
+            incluir=self.patrones_incluir,
+            excluir=self.patrones_excluir,
+            recursivo=self.busqueda_recursiva,
+            orden=self.orden_archivos
+        )
+    
+    def _pendientes(self, entradas, cerebros, progreso):
+        """
+        Rutas de las entradas aún no aprendidas, según las va pidiendo el pipeline.
+        Tamaño y mtime vienen del stat de scandir: ni el ledger ni el progreso vuelven a hacer stat.
+        """
+        for entrada in entradas:
+            if self.ledger.archivo_aprendido(cerebros, entrada.path, (entrada.tamano, entrada.mtime)):
+                progreso.saltado(entrada.tamano)
+                continue
+            progreso.descubierto(entrada.path, entrada.tamano)
+            yield entrada.path
+    
+    def _filtrar_aprendidos(self, archivos, cerebros, reporte, firmas=None):
+        """
+        Descarta archivos que todos los cerebros ya aprendieron (sin releerlos).
+        firmas ({path: (tamano, mtime)}) evita volver a hacer stat de lo ya descubierto.
+        """
+        firmas = firmas or {}
+        pendientes = []
+        for archivo in archivos:
+            firma = firmas.get(archivo)
+            if self.ledger.archivo_aprendido(cerebros, archivo, firma):
+                reporte.archivos_saltados += 1
+                reporte.caracteres_saltados += firma[0] if firma else file_size(archivo)
+            else:
+                pendientes.append(archivo)
+        return pendientes
+    
+    def _registrar_archivo(self, archivo, clave, cerebros):
+        if not clave:
+            return
+        self.ledger.registrar_firma(archivo, clave)
+        for ia, _, nombre in cerebros:
+            self.ledger.registrar_archivo(nombre, ia, clave)
+    
+    @staticmethod
+    def _detenido(stop_event):
+        """True si el trabajo terminó porque se pidió parar (no hay que darlo por completado)"""
+        return bool(stop_event and stop_event.is_set())
+    
+    def _aprender_bloque(self, cerebros, texto, epocas, reporte, entrenar=None):
+        """
+        Entrena un bloque en cada cerebro según el ledger (saltar/atenuar lo ya aprendido).
+        Devuelve True si algún cerebro lo ha entrenado.
+        """
+        clave = hash_texto(texto)
+        entrenado = False
+        indices = None
+        for ia, _, nombre in cerebros:
+            epocas_bloque = self.ledger.epocas(ia, nombre, clave, epocas)
+            if not epocas_bloque:
+                continue
+            if epocas_bloque < epocas:
+                reporte.bloques_atenuados += 1
+            # Vocabulario compartido: un solo tokenizado (o el de la etapa del pipeline) para todos
+            if indices is None and self.vocabulario_compartido is not None:
+                indices = self.vocabulario_compartido.indices_de(texto)
+            if entrenar:
+                entrenar(ia, texto, epocas_bloque, indices)
+            elif indices is not None:
+                ia.aprender_indices(indices, epocas=epocas_bloque)
+            else:
+                ia.aprender(texto, epocas=epocas_bloque)
+            self.ledger.registrar_bloque(nombre, ia, clave)
+            entrenado = True
+        if not entrenado:
+            reporte.bloques_saltados += 1
+            reporte.caracteres_saltados += len(texto)
+        return entrenado
+    
+    def get_transcriptor(self):
+        """Worker de transcripción compartido con la configuración actual"""
+        return get_transcription_worker(
+            tamano=self.whisper_modelo,
+            hilos_cpu=self.whisper_hilos,
+            idioma=self.whisper_idioma
+        )
+    
+    def _transcriptor_con_cache(self, transcriptor, signals=None):
+        """Consulta la caché de transcripciones antes de invocar a Whisper"""
+        cache = ContentCache(
+            os.path.join(self.directorio_cache, "transcripts"),
+            extension=".jsonl",
+            max_bytes=self.cache_transcripciones_mb * 1024 * 1024
+        )
+        
+        def on_hit(path):
+            if signals:
+                signals.respuesta_lista.emit("SISTEMA", f"⚡ Transcripción en caché: {os.path.basename(path)}")
+        
+        return CachedTranscriber(transcriptor, cache, self.whisper_modelo, self.whisper_idioma, on_cache_hit=on_hit)
+    
+    def _pipeline_texto(self, archivos, chunk_size=1000, separador=" ", stop_event=None, inicios=None):
+        """Pipeline lector → troceador para archivos de texto; el entrenamiento consume los bloques"""
+        return IngestionPipeline(
+            iter_line_batches(archivos, hashear=True, inicios=inicios),
+            [("chunker", ChunkerStage(chunk_size=chunk_size, separador=separador))] + self._etapas_tokenizador(),
+            stop_event=stop_event,
+            medida=medida_item
+        )
+    
+    def train_from_file(self, path, signals, epocas=5, chunk_size=1000, stop_event=None):
         """Entrena desde archivo de texto"""
         try:
             cerebros_activos = self.get_active_brains()
@@ -427,176 +837,206 @@ class BrainManager:
                 signals.respuesta_lista.emit("SISTEMA", "⚠️ No hay cerebros activos")
                 return
             
-            signals.respuesta_lista.emit("SISTEMA", "📄 Leyendo archivo de texto...")
-            
-            # Leer todo el archivo
-            with open(path, 'rt', encoding='utf-8', errors='ignore') as f:
-                texto_completo = f.read()
-            
-            # Dividir en bloques de ~1000 caracteres para procesamiento eficiente
-            chunk_size = 1000
-            bloques = []
-            
-            # Intentar dividir por párrafos primero
-            parrafos = texto_completo.split('\n\n')
-            bloque_actual = ""
+            reporte = LedgerReport()
+            if not self._filtrar_aprendidos([path], cerebros_activos, reporte):
+                signals.respuesta_lista.emit("SISTEMA", f"⏭️ {os.path.basename(path)} ya fue aprendido por todos los cerebros activos")
+                signals.progreso_entrenamiento.emit(100)
+                signals.entrenamiento_terminado.emit()
+                return
             
-            for parrafo in parrafos:
-                parrafo = parrafo.strip()
-                if not parrafo:
+            total_bytes = file_size(path)
+            signals.respuesta_lista.emit("SISTEMA", f"📄 Leyendo archivo de texto en streaming ({total_bytes / (1024 * 1024):.1f} MB)...")
+            
+            # Bloques de ~1000 caracteres alineados a párrafos; lectura y troceado
+            # corren en hilos propios mientras los cerebros entrenan
+            pipeline = self._pipeline_texto([path], chunk_size=chunk_size, stop_event=stop_event)
+            n_bloques = 0
+            total_caracteres = 0
+            for tipo, _, payload, bytes_leidos in pipeline:
+                if tipo == 'error':
+                    raise IOError(payload)
+                if tipo == 'fin':
+                    self._registrar_archivo(path, payload, cerebros_activos)
+                if tipo != 'bloque':
                     continue
                 
-                if len(bloque_actual) + len(parrafo) < chunk_size:
-                    bloque_actual += " " + parrafo if bloque_actual else parrafo
-                else:
-                    if bloque_actual:
-                        bloques.append(bloque_actual)
-                    bloque_actual = parrafo
-            
-            # Agregar último bloque
-            if bloque_actual:
-                bloques.append(bloque_actual)
-            
-            # Si no hay bloques, dividir por tamaño fijo
-            if not bloques:
-                for i in range(0, len(texto_completo), chunk_size):
-                    chunk = texto_completo[i:i+chunk_size].strip()
-                    if chunk:
-                        bloques.append(chunk)
-            
-            total_caracteres = sum(len(b) for b in bloques)
-            signals.respuesta_lista.emit("SISTEMA", f"📚 Procesando {len(bloques)} bloques ({total_caracteres} caracteres)...")
-            
-            # Entrenar
-            caracteres_procesados = 0
-            for idx, bloque in enumerate(bloques):
-                if bloque.strip():
-                    for ia, _, _ in cerebros_activos:
-                        ia.aprender(bloque, epocas=5)
-                    
-                    caracteres_procesados += len(bloque)
+                self._aprender_bloque(cerebros_activos, payload, epocas, reporte)
+                
+                n_bloques += 1
+                total_caracteres += len(payload)
                 
-                progress = int((caracteres_procesados / total_caracteres) * 100)
+                progress = int((bytes_leidos / total_bytes) * 100)
                 signals.progreso_entrenamiento.emit(min(progress, 100))
                 
                 # Guardar cada 100 bloques
-                if (idx + 1) % 100 == 0:
+                if n_bloques % 100 == 0:
                     for ia, path_save, _ in cerebros_activos:
                         ia.guardar(path_save)
-                    signals.respuesta_lista.emit("SISTEMA", f"💾 Guardado intermedio ({idx+1}/{len(bloques)} bloques)")
+                    signals.respuesta_lista.emit("SISTEMA", f"💾 Guardado intermedio ({n_bloques} bloques, {bytes_leidos / (1024 * 1024):.1f} MB leídos)")
             
             # Guardar final
             for ia, path_save, _ in cerebros_activos:
                 ia.guardar(path_save)
+            self.ledger.commit()
             
-            signals.progreso_entrenamiento.emit(100)
-            signals.entrenamiento_terminado.emit()
-            signals.respuesta_lista.emit("SISTEMA", f"✅ Texto completado: {len(bloques)} bloques, {total_caracteres} caracteres procesados")
+            if self._detenido(stop_event):
+                signals.entrenamiento_detenido.emit()
+                signals.respuesta_lista.emit("SISTEMA", f"⏸️ Texto detenido: {n_bloques} bloques, {total_caracteres} caracteres procesados")
+            else:
+                signals.progreso_entrenamiento.emit(100)
+                signals.entrenamiento_terminado.emit()
+                signals.respuesta_lista.emit("SISTEMA", f"✅ Texto completado: {n_bloques} bloques, {total_caracteres} caracteres procesados")
+            if reporte.hay_algo():
+                signals.respuesta_lista.emit("SISTEMA", reporte.resumen())
+            signals.respuesta_lista.emit("ESTADÍSTICAS", f"⏱️ Pipeline: {pipeline.resumen()}")
             
         except Exception as e:
             signals.respuesta_lista.emit("SISTEMA", f"❌ Error: {str(e)}")
     
-    def train_from_text_folder(self, folder_path, signals):
-        """Entrena desde carpeta de archivos TXT"""
+    def train_from_stream(self, stream, signals, epocas=5, chunk_size=1000, stop_event=None, nombre="<stdin>"):
+        """Entrena desde un flujo binario de texto (stdin) sin conocer su tamaño de antemano"""
         try:
             cerebros_activos = self.get_active_brains()
             if not cerebros_activos:
                 signals.respuesta_lista.emit("SISTEMA", "⚠️ No hay cerebros activos")
                 return
             
-            # Buscar todos los archivos .txt en la carpeta
-            archivos_txt = [os.path.join(folder_path, f) for f in os.listdir(folder_path) 
-                           if f.lower().endswith('.txt')]
+            signals.respuesta_lista.emit("SISTEMA", f"📥 Leyendo texto de {nombre} en streaming...")
+            pipeline = IngestionPipeline(
+                iter_stream_batches(stream, nombre),
+                [("chunker", ChunkerStage(chunk_size=chunk_size))] + self._etapas_tokenizador(),
+                stop_event=stop_event,
+                medida=medida_item
+            )
+            reporte = LedgerReport()
+            n_bloques = 0
+            total_caracteres = 0
+            for tipo, _, payload, bytes_leidos in pipeline:
+                if tipo == 'error':
+                    raise IOError(payload)
+                if tipo != 'bloque':
+                    continue
+                
+                self._aprender_bloque(cerebros_activos, payload, epocas, reporte)
+                n_bloques += 1
+                total_caracteres += len(payload)
+                
+                if n_bloques % 100 == 0:
+                    for ia, path_save, _ in cerebros_activos:
+                        ia.guardar(path_save)
+                    self.ledger.commit()
+                    signals.respuesta_lista.emit("SISTEMA", f"💾 Guardado intermedio ({n_bloques} bloques, {bytes_leidos / (1024 * 1024):.1f} MB leídos)")
+            
+            for ia, path_save, _ in cerebros_activos:
+                ia.guardar(path_save)
+            self.ledger.commit()
             
-            if not archivos_txt:
-                signals.respuesta_lista.emit("SISTEMA", "⚠️ No se encontraron archivos .txt en la carpeta")
+            if self._detenido(stop_event):
+                signals.entrenamiento_detenido.emit()
+                signals.respuesta_lista.emit("SISTEMA", f"⏸️ Flujo detenido: {n_bloques} bloques, {total_caracteres} caracteres procesados")
+            else:
+                signals.progreso_entrenamiento.emit(100)
+                signals.entrenamiento_terminado.emit()
+                signals.respuesta_lista.emit("SISTEMA", f"✅ Flujo completado: {n_bloques} bloques, {total_caracteres} caracteres procesados")
+            signals.respuesta_lista.emit("ESTADÍSTICAS", f"⏱️ Pipeline: {pipeline.resumen()}")
+            if reporte.hay_algo():
+                signals.respuesta_lista.emit("SISTEMA", reporte.resumen())
+        
+        except Exception as e:
+            signals.respuesta_lista.emit("SISTEMA", f"❌ Error: {str(e)}")
+    
+    def train_from_text_folder(self, folder_path, signals, epocas=5, chunk_size=1000, stop_event=None):
+        """Entrena desde carpeta de archivos TXT"""
+        try:
+            cerebros_activos = self.get_active_brains()
+            if not cerebros_activos:
+                signals.respuesta_lista.emit("SISTEMA", "⚠️ No hay cerebros activos")
                 return
             
-            signals.respuesta_lista.emit("SISTEMA", f"📁 Encontrados {len(archivos_txt)} archivos TXT")
+            # Buscar todos los archivos .txt en la carpeta (y subcarpetas), también comprimidos.
+            # Sin orden, el primer archivo se lee mientras scandir sigue recorriendo el resto
+            entradas = self._descubrir(folder_path, extensiones_corpus())
+            reporte = LedgerReport()
+            progreso = _ProgresoCarpeta()
+            archivos_txt = self._pendientes(entradas, cerebros_activos, progreso)
+            n_archivos = None
+            if isinstance(entradas, list):
+                # Con orden el recorrido ya está hecho: el total se conoce desde el principio
+                archivos_txt = list(archivos_txt)
+                n_archivos = len(archivos_txt)
+                signals.respuesta_lista.emit("SISTEMA", f"📁 Encontrados {len(entradas)} archivos TXT")
+                if progreso.archivos_saltados:
+                    signals.respuesta_lista.emit("SISTEMA", f"⏭️ {progreso.archivos_saltados} archivos ya aprendidos, quedan {n_archivos}")
             
             total_caracteres_global = 0
             total_bloques_global = 0
+            idx = 0
             
-            for idx, archivo_path in enumerate(archivos_txt):
+            # El siguiente archivo se lee y trocea mientras se entrena el actual
+            pipeline = self._pipeline_texto(archivos_txt, chunk_size=chunk_size, stop_event=stop_event)
+            for tipo, archivo_path, payload, bytes_leidos in pipeline:
                 nombre_archivo = os.path.basename(archivo_path)
-                signals.respuesta_lista.emit("SISTEMA", f"📄 [{idx+1}/{len(archivos_txt)}] Procesando: {nombre_archivo}")
                 
-                try:
-                    # Leer archivo
-                    with open(archivo_path, 'rt', encoding='utf-8', errors='ignore') as f:
-                        texto_completo = f.read()
+                if tipo == 'archivo':
+                    idx += 1
+                    n_bloques = 0
+                    total_caracteres = 0
+                    posicion = f"{idx}/{n_archivos}" if n_archivos is not None else idx
+                    signals.respuesta_lista.emit("SISTEMA", f"📄 [{posicion}] Procesando: {nombre_archivo}")
+                
+                elif tipo == 'bloque':
+                    self._aprender_bloque(cerebros_activos, payload, epocas, reporte)
+                    n_bloques += 1
+                    total_caracteres += len(payload)
                     
-                    if not texto_completo.strip():
+                    signals.progreso_entrenamiento.emit(progreso.porcentaje(bytes_leidos))
+                
+                elif tipo == 'error':
+                    progreso.terminado(archivo_path)
+                    signals.respuesta_lista.emit("SISTEMA", f"❌ Error en {nombre_archivo}: {payload}")
+                
+                elif tipo == 'fin':
+                    progreso.terminado(archivo_path)
+                    self._registrar_archivo(archivo_path, payload, cerebros_activos)
+                    if not n_bloques:
                         signals.respuesta_lista.emit("SISTEMA", f"⚠️ Archivo vacío: {nombre_archivo}")
                         continue
                     
-                    # Dividir en bloques de ~1000 caracteres
-                    chunk_size = 1000
-                    bloques = []
-                    
-                    # Intentar dividir por párrafos
-                    parrafos = texto_completo.split('\n\n')
-                    bloque_actual = ""
-                    
-                    for parrafo in parrafos:
-                        parrafo = parrafo.strip()
-                        if not parrafo:
-                            continue
-                        
-                        if len(bloque_actual) + len(parrafo) < chunk_size:
-                            bloque_actual += " " + parrafo if bloque_actual else parrafo
-                        else:
-                            if bloque_actual:
-                                bloques.append(bloque_actual)
-                            bloque_actual = parrafo
-                    
-                    if bloque_actual:
-                        bloques.append(bloque_actual)
-                    
-                    # Si no hay bloques, dividir por tamaño fijo
-                    if not bloques:
-                        for i in range(0, len(texto_completo), chunk_size):
-                            chunk = texto_completo[i:i+chunk_size].strip()
-                            if chunk:
-                                bloques.append(chunk)
-                    
-                    if not bloques:
-                        signals.respuesta_lista.emit("SISTEMA", f"⚠️ No se pudo procesar: {nombre_archivo}")
-                        continue
-                    
-                    total_caracteres = sum(len(b) for b in bloques)
-                    signals.respuesta_lista.emit("SISTEMA", f"   └─ {len(bloques)} bloques, {total_caracteres} caracteres")
-                    
-                    # Entrenar con bloques
-                    for bloque in bloques:
-                        if bloque.strip():
-                            for ia, _, _ in cerebros_activos:
-                                ia.aprender(bloque, epocas=5)
-                    
-                    total_bloques_global += len(bloques)
+                    signals.respuesta_lista.emit("SISTEMA", f"   └─ {n_bloques} bloques, {total_caracteres} caracteres")
+                    total_bloques_global += n_bloques
                     total_caracteres_global += total_caracteres
                     
-                    # Actualizar progreso
-                    progreso = int(((idx + 1) / len(archivos_txt)) * 100)
-                    signals.progreso_entrenamiento.emit(progreso)
-                    
                     # Guardar después de cada archivo
                     for ia, path_save, _ in cerebros_activos:
                         ia.guardar(path_save)
-                    
-                except Exception as e:
-                    signals.respuesta_lista.emit("SISTEMA", f"❌ Error en {nombre_archivo}: {str(e)}")
-                    continue
+                    self.ledger.commit()
             
-            signals.progreso_entrenamiento.emit(100)
-            signals.entrenamiento_terminado.emit()
-            signals.respuesta_lista.emit("SISTEMA", 
-                f"✅ Carpeta completada: {len(archivos_txt)} archivos, {total_bloques_global} bloques, {total_caracteres_global} caracteres")
+            progreso.volcar(reporte)
+            if not idx and not reporte.archivos_saltados and not self._detenido(stop_event):
+                signals.respuesta_lista.emit("SISTEMA", "⚠️ No se encontraron archivos .txt en la carpeta")
+                return
+            
+            if self._detenido(stop_event):
+                # Lo entrenado del archivo a medias solo se guardaba al terminarlo
+                for ia, path_save, _ in cerebros_activos:
+                    ia.guardar(path_save)
+                self.ledger.commit()
+                signals.entrenamiento_detenido.emit()
+                signals.respuesta_lista.emit("SISTEMA", 
+                    f"⏸️ Carpeta detenida en el archivo {idx}: {total_bloques_global} bloques, {total_caracteres_global} caracteres")
+            else:
+                signals.progreso_entrenamiento.emit(100)
+                signals.entrenamiento_terminado.emit()
+                signals.respuesta_lista.emit("SISTEMA", 
+                    f"✅ Carpeta completada: {idx} archivos, {total_bloques_global} bloques, {total_caracteres_global} caracteres")
+            if reporte.hay_algo():
+                signals.respuesta_lista.emit("SISTEMA", reporte.resumen())
+            signals.respuesta_lista.emit("ESTADÍSTICAS", f"⏱️ Pipeline: {pipeline.resumen()}")
         
         except Exception as e:
             signals.respuesta_lista.emit("SISTEMA", f"❌ Error en carpeta: {str(e)}")
     
-    def train_from_pdf(self, path, signals):
+    def train_from_pdf(self, path, signals, epocas=5, stop_event=None):
         """Entrena desde PDF"""
         try:
             cerebros_activos = self.get_active_brains()
@@ -604,143 +1044,178 @@ class BrainManager:
                 signals.respuesta_lista.emit("SISTEMA", "⚠️ No hay cerebros activos")
                 return
             
-            signals.respuesta_lista.emit("SISTEMA", f"📖 Extrayendo texto del PDF...")
-            doc = fitz.open(path)
-            total_pages = len(doc)
-            
-            # Extraer todo el texto primero
-            texto_completo = []
-            for page_num in range(total_pages):
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                if text.strip():
-                    texto_completo.append(text)
-                
-                # Actualizar progreso de extracción (primera mitad)
-                progress = int(((page_num + 1) / total_pages) * 50)
-                signals.progreso_entrenamiento.emit(progress)
-            
-            doc.close()
-            
-            # Unir todo el texto
-            texto_total = "\n".join(texto_completo)
-            
-            # Limpiar y preparar el texto
-            # Eliminar líneas muy cortas que probablemente sean ruido
-            lineas = texto_total.split('\n')
-            lineas_limpias = [l.strip() for l in lineas if len(l.strip()) > 10]
-            
-            # Reconstruir en bloques (párrafos)
-            bloques = []
-            bloque_actual = []
-            
-            for linea in lineas_limpias:
-                bloque_actual.append(linea)
-                # Si la línea termina con punto, crear un bloque
-                if linea.endswith('.') or linea.endswith('!') or linea.endswith('?'):
-                    bloques.append(' '.join(bloque_actual))
-                    bloque_actual = []
-            
-            # Agregar último bloque si existe
-            if bloque_actual:
-                bloques.append(' '.join(bloque_actual))
-            
-            if not bloques:
-                signals.respuesta_lista.emit("SISTEMA", "⚠️ No se pudo extraer texto significativo del PDF")
+            reporte = LedgerReport()
+            if not self._filtrar_aprendidos([path], cerebros_activos, reporte):
+                signals.respuesta_lista.emit("SISTEMA", "⏭️ Este PDF ya fue aprendido por los cerebros activos")
                 return
             
-            total_caracteres = sum(len(b) for b in bloques)
-            signals.respuesta_lista.emit("SISTEMA", f"📚 Procesando {len(bloques)} bloques de texto ({total_caracteres} caracteres)...")
-            
-            # Entrenar con bloques (similar al chat)
-            caracteres_procesados = 0
-            for idx, bloque in enumerate(bloques):
-                if bloque.strip():
-                    for ia, _, _ in cerebros_activos:
-                        # Usar 5 épocas para aprendizaje profundo de archivos
-                        ia.aprender(bloque, epocas=5)
-                    
-                    caracteres_procesados += len(bloque)
+            signals.respuesta_lista.emit("SISTEMA", f"📖 Extrayendo texto del PDF...")
+            cache_pdf = ContentCache(os.path.join(self.directorio_cache, "pdf_text"))
+            total_pages = [1]
+            
+            def extraer_paginas():
+                # Páginas extraídas en paralelo (o leídas de caché) y entregadas en orden
+                for page_num, total, text in iter_pdf_pages_cached(
+                        path, cache_pdf, workers=self.pdf_workers,
+                        on_cache_hit=lambda _: signals.respuesta_lista.emit("SISTEMA", "⚡ Texto del PDF recuperado de caché")):
+                    total_pages[0] = max(1, total)
+                    if text.strip():
+                        yield ('pagina', path, text, page_num)
+            
+            # Extracción, limpieza y entrenamiento solapados: las páginas siguientes se
+            # decodifican mientras los cerebros aprenden los bloques ya construidos
+            pipeline = IngestionPipeline(
+                extraer_paginas(),
+                [("cleaner", SentenceChunkerStage())] + self._etapas_tokenizador(),
+                stop_event=stop_event,
+                medida=medida_item
+            )
+            
+            n_bloques = 0
+            total_caracteres = 0
+            for _, _, bloque, pagina in pipeline:
+                # 5 épocas por defecto para aprendizaje profundo de archivos
+                self._aprender_bloque(cerebros_activos, bloque, epocas, reporte)
                 
-                # Actualizar progreso (segunda mitad: 50-100%)
-                progress = 50 + int((caracteres_procesados / total_caracteres) * 50)
+                n_bloques += 1
+                total_caracteres += len(bloque)
+                
+                progress = int((pagina / total_pages[0]) * 100)
                 signals.progreso_entrenamiento.emit(min(progress, 100))
                 
                 # Guardar cada 50 bloques
-                if (idx + 1) % 50 == 0:
+                if n_bloques % 50 == 0:
                     for ia, path_save, _ in cerebros_activos:
                         ia.guardar(path_save)
-                    signals.respuesta_lista.emit("SISTEMA", f"💾 Guardado intermedio ({idx+1}/{len(bloques)} bloques)")
+                    self.ledger.commit()
+                    signals.respuesta_lista.emit("SISTEMA", f"💾 Guardado intermedio ({n_bloques} bloques, página {pagina}/{total_pages[0]})")
             
-            # Guardar final
+            if not n_bloques:
+                signals.respuesta_lista.emit("SISTEMA", "⚠️ No se pudo extraer texto significativo del PDF")
+                return
+            
+            # Guardar final (la clave es la misma que usa la caché de texto del PDF);
+            # un PDF detenido a medias no cuenta como archivo aprendido
+            detenido = self._detenido(stop_event)
+            if not detenido:
+                self._registrar_archivo(path, hash_archivo(path), cerebros_activos)
             for ia, path_save, _ in cerebros_activos:
                 ia.guardar(path_save)
+            self.ledger.commit()
             
-            signals.progreso_entrenamiento.emit(100)
-            signals.entrenamiento_terminado.emit()
-            signals.respuesta_lista.emit("SISTEMA", f"✅ PDF completado: {len(bloques)} bloques, {total_caracteres} caracteres procesados")
+            if detenido:
+                signals.entrenamiento_detenido.emit()
+                signals.respuesta_lista.emit("SISTEMA", f"⏸️ PDF detenido: {n_bloques} bloques, {total_caracteres} caracteres procesados")
+            else:
+                signals.progreso_entrenamiento.emit(100)
+                signals.entrenamiento_terminado.emit()
+                signals.respuesta_lista.emit("SISTEMA", f"✅ PDF completado: {n_bloques} bloques, {total_caracteres} caracteres procesados")
+            if reporte.hay_algo():
+                signals.respuesta_lista.emit("SISTEMA", reporte.resumen())
+            signals.respuesta_lista.emit("ESTADÍSTICAS", f"⏱️ Pipeline: {pipeline.resumen()}")
             
         except Exception as e:
             signals.respuesta_lista.emit("SISTEMA", f"❌ PDF Error: {str(e)}")
     
-    def train_from_video(self, path, signals):
-        """Entrena desde video/audio"""
+    def train_from_video(self, path, signals, epocas=1, chunk_size=2000, stop_event=None):
+        """Entrena desde video/audio a medida que Whisper emite segmentos"""
         try:
             cerebros_activos = self.get_active_brains()
             if not cerebros_activos:
                 signals.respuesta_lista.emit("SISTEMA", "⚠️ No hay cerebros activos")
                 return
             
-            device = "mps" if torch.backends.mps.is_available() else "cpu"
-            signals.respuesta_lista.emit("SISTEMA", f"Cargando modelo Whisper en {device.upper()}...")
-            model = whisper.load_model("base", device=device).float()
-            
-            result = model.transcribe(path, verbose=False, language="es", fp16=False)
-            text = result["text"]
-            
-            if not text.strip():
-                signals.respuesta_lista.emit("SISTEMA", "No se detectó habla en el archivo.")
+            reporte = LedgerReport()
+            if not self._filtrar_aprendidos([path], cerebros_activos, reporte):
+                signals.respuesta_lista.emit("SISTEMA", "⏭️ Este archivo ya fue aprendido por los cerebros activos")
                 return
             
-            # Guardar transcripción
+            device = elegir_device()
+            signals.respuesta_lista.emit("SISTEMA", f"Transcribiendo con Whisper ({self.whisper_modelo}) en {device.upper()}...")
+            duracion = duracion_audio(path)
+            segmentos = self._transcriptor_con_cache(self.get_transcriptor(), signals).submit_stream(path)
+            
+            # La transcripción se escribe junto al archivo según llega
             txt_path = os.path.splitext(path)[0] + ".txt"
             try:
-                with open(txt_path, "w", encoding="utf-8") as f:
-                    f.write(text)
-                signals.respuesta_lista.emit("SISTEMA", f"Transcripción guardada en: {os.path.basename(txt_path)}")
-            except:
-                pass
+                f_txt = open(txt_path, "w", encoding="utf-8")
+            except OSError:
+                f_txt = None
             
             signals.respuesta_lista.emit("SISTEMA", "Iniciando aprendizaje...")
             
-            # Entrenar en bloques
-            chunk_size = 2000
-            for i in range(0, len(text), chunk_size):
-                chunk = text[i:i + chunk_size]
-                if len(chunk) < 2:
-                    continue
-                
-                for ia, _, _ in cerebros_activos:
-                    ia.aprender(chunk, epocas=1)
-                
-                progress = int((min(i + chunk_size, len(text)) / len(text)) * 100)
-                signals.progreso_entrenamiento.emit(progress)
-                
-                if (i // chunk_size + 1) % 5 == 0:
-                    for ia, path_save, _ in cerebros_activos:
-                        ia.guardar(path_save)
+            # Entrenar en bloques de chunk_size caracteres en cuanto se completan
+            buffer = ""
+            total_caracteres = 0
+            n_bloques = 0
+            
+            def entrenar(chunk):
+                self._aprender_bloque(cerebros_activos, chunk, epocas, reporte)
+            
+            try:
+                for seg in segmentos:
+                    if stop_event and stop_event.is_set():
+                        break
+                    if f_txt:
+                        f_txt.write(seg['text'])
+                    buffer += seg['text']
+                    total_caracteres += len(seg['text'].strip())
+                    
+                    while len(buffer) >= chunk_size:
+                        entrenar(buffer[:chunk_size])
+                        buffer = buffer[chunk_size:]
+                        n_bloques += 1
+                        if n_bloques % 5 == 0:
+                            for ia, path_save, _ in cerebros_activos:
+                                ia.guardar(path_save)
+                            self.ledger.commit()
+                    
+                    if duracion:
+                        signals.progreso_entrenamiento.emit(min(99, int(seg['end'] / duracion * 100)))
+            finally:
+                # Si se detiene o falla el entrenamiento, el worker deja de transcribir el resto
+                if hasattr(segmentos, 'cancelar'):
+                    segmentos.cancelar()
+                if f_txt:
+                    f_txt.close()
+            
+            if not total_caracteres:
+                if self._detenido(stop_event):
+                    signals.entrenamiento_detenido.emit()
+                    signals.respuesta_lista.emit("SISTEMA", "Video training stopped before any speech was transcribed.")
+                else:
+                    signals.respuesta_lista.emit("SISTEMA", "No se detectó habla en el archivo.")
+                return
+            
+            if f_txt:
+                signals.respuesta_lista.emit("SISTEMA", f"Transcripción guardada en: {os.path.basename(txt_path)}")
             
+            if len(buffer.strip()) >= 2:
+                entrenar(buffer)
+            
+            # Misma clave de medio que la caché de transcripciones (memorizada, no relee el archivo);
+            # una transcripción detenida a medias no cuenta como archivo aprendido
+            detenido = self._detenido(stop_event)
+            if not detenido:
+                self._registrar_archivo(path, hash_archivo(path), cerebros_activos)
             for ia, path_save, _ in cerebros_activos:
                 ia.guardar(path_save)
+            self.ledger.commit()
             
-            signals.progreso_entrenamiento.emit(100)
-            signals.entrenamiento_terminado.emit()
-            signals.respuesta_lista.emit("SISTEMA", "Video training completed.")
+            if detenido:
+                signals.entrenamiento_detenido.emit()
+                signals.respuesta_lista.emit("SISTEMA", "Video training stopped: partial transcript learned.")
+            else:
+                signals.progreso_entrenamiento.emit(100)
+                signals.entrenamiento_terminado.emit()
+                signals.respuesta_lista.emit("SISTEMA", "Video training completed.")
+            if reporte.hay_algo():
+                signals.respuesta_lista.emit("SISTEMA", reporte.resumen())
             
         except Exception as e:
             signals.respuesta_lista.emit("SISTEMA", f"❌ Video Error: {str(e)}")
     
-    def train_from_video_folder(self, folder_path, signals):
+    def train_from_video_folder(self, folder_path, signals, epocas=1, chunk_size=2000, stop_event=None):
         """Entrena desde carpeta de videos"""
         try:
             cerebros_activos = self.get_active_brains()
@@ -749,63 +1224,472 @@ class BrainManager:
                 return
             
             extensiones = ('.mp4', '.mkv', '.avi', '.mov', '.mp3', '.wav')
-            archivos = [os.path.join(folder_path, f) for f in os.listdir(folder_path) 
-                       if f.lower().endswith(extensiones)]
+            entradas = self._descubrir(folder_path, extensiones)
+            reporte = LedgerReport()
+            progreso = _ProgresoCarpeta()
+            pendientes = self._pendientes(entradas, cerebros_activos, progreso)
+            if isinstance(entradas, list):
+                archivos = list(pendientes)
+                n_archivos = len(archivos)
+            else:
+                # Basta con el primer pendiente para arrancar el pool; el resto se descubre según se envía
+                primero = next(pendientes, None)
+                archivos = [] if primero is None else itertools.chain([primero], pendientes)
+                n_archivos = None
             
             if not archivos:
-                signals.respuesta_lista.emit("SISTEMA", "No video files found.")
+                progreso.volcar(reporte)
+                if reporte.archivos_saltados:
+                    signals.respuesta_lista.emit("SISTEMA", f"⏭️ {reporte.archivos_saltados} archivos ya aprendidos, no queda ninguno")
+                else:
+                    signals.respuesta_lista.emit("SISTEMA", "No video files found.")
                 return
             
-            device = "mps" if torch.backends.mps.is_available() else "cpu"
-            signals.respuesta_lista.emit("SISTEMA", f"Processing {len(archivos)} files ({device.upper()})...")
+            # Transcripción en un pool de procesos CPU mientras los cerebros entrenan
+            # con las transcripciones ya terminadas (el throughput lo marca la etapa más lenta)
+            pool = TranscriptionPool(
+                tamano=self.whisper_modelo,
+                idioma=self.whisper_idioma,
+                procesos=self.transcripcion_procesos
+            )
+            signals.respuesta_lista.emit("SISTEMA", 
+                f"Processing {n_archivos if n_archivos is not None else 'all'} files (CPU: {pool.procesos} transcriptores x {pool.hilos_por_proceso} hilos, "
+                f"{pool.hilos_entrenamiento} hilos de entrenamiento)...")
+            
+            def transcribir():
+                # Los segmentos de cada archivo se entregan según se decodifican
+                transcriptor = self._transcriptor_con_cache(pool, signals)
+                for idx, path_archivo, segmentos in iter_transcripciones(transcriptor, archivos, ventana=pool.procesos + 1, stream=True):
+                    posicion = f"{idx+1}/{n_archivos}" if n_archivos is not None else idx + 1
+                    signals.respuesta_lista.emit("SISTEMA", f"🚀 Procesando [{posicion}]: {os.path.basename(path_archivo)}")
+                    # El fin lleva el hash del medio solo si se transcribió entero (clave del ledger)
+                    clave = None
+                    try:
+                        for seg in segmentos:
+                            yield ('segmento', path_archivo, seg['text'], idx)
+                        clave = hash_archivo(path_archivo)
+                    except Exception as e:
+                        signals.respuesta_lista.emit("SISTEMA", f"❌ Error en {os.path.basename(path_archivo)}: {str(e)}")
+                    yield ('fin', path_archivo, clave, idx)
+            
+            pipeline = IngestionPipeline(
+                transcribir(),
+                [("chunker", SegmentChunkerStage(chunk_size=chunk_size))] + self._etapas_tokenizador(),
+                maxsize=64,
+                stop_event=stop_event,
+                medida=medida_item
+            )
+            
+            # Solo durante el trabajo: el resto de la app vuelve a tener todos los hilos al terminar
+            hilos_previos = _ajustar_hilos_entrenamiento(pool.hilos_entrenamiento)
+            try:
+                for tipo, path_archivo, payload, idx in pipeline:
+                    if tipo == 'bloque':
+                        self._aprender_bloque(cerebros_activos, payload, epocas, reporte)
+                        continue
+                    
+                    # Fin de archivo
+                    progreso.terminado(path_archivo)
+                    signals.progreso_entrenamiento.emit(progreso.porcentaje())
+                    
+                    self._registrar_archivo(path_archivo, payload, cerebros_activos)
+                    for ia, path_save, _ in cerebros_activos:
+                        ia.guardar(path_save)
+                    self.ledger.commit()
+            finally:
+                pool.close()
+                if hilos_previos is not None:
+                    _ajustar_hilos_entrenamiento(hilos_previos)
             
-            model = whisper.load_model("base", device=device).float()
+            progreso.volcar(reporte)
+            if self._detenido(stop_event):
+                # Lo entrenado del archivo a medias solo se guardaba al terminarlo
+                for ia, path_save, _ in cerebros_activos:
+                    ia.guardar(path_save)
+                self.ledger.commit()
+                signals.entrenamiento_detenido.emit()
+                signals.respuesta_lista.emit("SISTEMA", "Bulk training stopped.")
+            else:
+                signals.progreso_entrenamiento.emit(100)
+                signals.entrenamiento_terminado.emit()
+                signals.respuesta_lista.emit("SISTEMA", "Bulk training complete.")
+            if reporte.hay_algo():
+                signals.respuesta_lista.emit("SISTEMA", reporte.resumen())
+            signals.respuesta_lista.emit("ESTADÍSTICAS", f"⏱️ Pipeline: {pipeline.resumen()}")
             
-            for idx, path_archivo in enumerate(archivos):
-                nombre = os.path.basename(path_archivo)
-                signals.respuesta_lista.emit("SISTEMA", f"🚀 Procesando [{idx+1}/{len(archivos)}]: {nombre}")
+        except Exception as e:
+            signals.respuesta_lista.emit("SISTEMA", f"❌ Folder Error: {str(e)}")
+    
+    def train_from_dialogues(self, path, signals=None, console_mode=False, stop_event=None,
+                             campo_prompt=None, campo_respuesta=None, lote=64, epocas_prompt=3):
+        """
+        Entrena con pares (prompt, respuesta) de un JSONL/CSV igual que el chat:
+        el prompt con epocas_prompt y la respuesta con una época.
+        Soporta modo consola (headless) y stop_event para interrupción segura.
+        """
+        def log(msg):
+            if console_mode:
+                print(msg)
+            elif signals:
+                signals.respuesta_lista.emit("SISTEMA", msg)
+        
+        try:
+            cerebros_activos = self.get_active_brains()
+            if not cerebros_activos:
+                log("⚠️ No hay cerebros activos")
+                return
+            
+            total_bytes = file_size(path)
+            log(f"💬 Importando diálogos de {os.path.basename(path)} ({total_bytes / (1024 * 1024):.1f} MB)...")
+            
+            def lotes():
+                # El parseo corre en el hilo del pipeline mientras los cerebros entrenan el lote anterior
+                actual = []
+                invalidos = 0
+                offset = 0
+                for prompt, respuesta, offset in iter_dialogos(path, campo_prompt, campo_respuesta):
+                    if prompt is None:
+                        invalidos += 1
+                        continue
+                    actual.append((prompt, respuesta))
+                    if len(actual) >= lote:
+                        yield ('dialogos', path, actual, offset)
+                        actual = []
+                if actual:
+                    yield ('dialogos', path, actual, offset)
+                yield ('fin', path, invalidos, offset)
+            
+            pipeline = IngestionPipeline(lotes(), stop_event=stop_event, nombre_fuente="parser", medida=medida_lote)
+            reporte = LedgerReport()
+            n_pares = 0
+            n_caracteres = 0
+            invalidos = 0
+            inicio = time.time()
+            ultimo_informe = inicio
+            ultimo_checkpoint = inicio
+            
+            for tipo, _, payload, offset in pipeline:
+                if tipo == 'fin':
+                    invalidos = payload
+                    continue
                 
-                result = model.transcribe(path_archivo, verbose=False, language="es", fp16=False)
-                text = result["text"].strip()
+                claves = [hash_texto(prompt + "\n" + respuesta) for prompt, respuesta in payload]
+                entrenados = [False] * len(payload)
+                # Vocabulario compartido: el lote se tokeniza una vez (fuera de los bloqueos de los cerebros)
+                tokens = None
+                if self.vocabulario_compartido is not None:
+                    tokens = [(self.vocabulario_compartido.tokenizar(prompt), self.vocabulario_compartido.tokenizar(respuesta))
+                              for prompt, respuesta in payload]
+                for ia, _, nombre in cerebros_activos:
+                    # Un solo bloqueo por lote en lugar de uno por llamada
+                    with ia.lock:
+                        for i, (prompt, respuesta) in enumerate(payload):
+                            epocas = self.ledger.epocas(ia, nombre, claves[i], epocas_prompt)
+                            if not epocas:
+                                continue
+                            if tokens:
+                                ia.aprender_indices(tokens[i][0], epocas=epocas)
+                                ia.aprender_indices(tokens[i][1], epocas=1)
+                            else:
+                                ia.aprender(prompt, epocas=epocas)
+                                ia.aprender(respuesta, epocas=1)
+                            self.ledger.registrar_bloque(nombre, ia, claves[i])
+                            entrenados[i] = True
                 
-                if text:
-                    # Entrenar
-                    chunk_size = 2000
-                    for c_idx in range(0, len(text), chunk_size):
-                        chunk = text[c_idx:c_idx + chunk_size]
-                        if len(chunk) >= 2:
-                            for ia, _, _ in cerebros_activos:
-                                ia.aprender(chunk, epocas=1)
+                for i, (prompt, respuesta) in enumerate(payload):
+                    if entrenados[i]:
+                        n_pares += 1
+                        n_caracteres += len(prompt) + len(respuesta)
+                    else:
+                        reporte.bloques_saltados += 1
+                        reporte.caracteres_saltados += len(prompt) + len(respuesta)
                 
-                progreso = int(((idx + 1) / len(archivos)) * 100)
-                signals.progreso_entrenamiento.emit(progreso)
+                ahora = time.time()
+                if ahora - ultimo_informe >= 5:
+                    transcurrido = max(1e-6, ahora - inicio)
+                    fraccion = min(1.0, offset / total_bytes)
+                    eta = transcurrido * (1 - fraccion) / fraccion if fraccion else 0
+                    log(f"💬 {n_pares:,} pares | {fraccion * 100:.1f}% | {n_caracteres / transcurrido:,.0f} chars/s | "
+                        f"{n_pares / transcurrido:.1f} pares/s | ETA {eta / 60:.1f} min")
+                    if signals and not console_mode:
+                        signals.progreso_entrenamiento.emit(int(fraccion * 100))
+                    ultimo_informe = ahora
                 
-                for ia, path_save, _ in cerebros_activos:
-                    ia.guardar(path_save)
-            
-            signals.progreso_entrenamiento.emit(100)
-            signals.entrenamiento_terminado.emit()
-            signals.respuesta_lista.emit("SISTEMA", "Bulk training complete.")
+                if ahora - ultimo_checkpoint >= self.checkpoint_segundos:
+                    for ia, path_save, _ in cerebros_activos:
+                        ia.guardar(path_save)
+                    self.ledger.commit()
+                    ultimo_checkpoint = ahora
             
+            for ia, path_save, _ in cerebros_activos:
+                ia.guardar(path_save)
+            self.ledger.commit()
+            
+            detenido = self._detenido(stop_event)
+            if detenido:
+                log("🛑 Importación interrumpida: cerebros guardados")
+            transcurrido = max(1e-6, time.time() - inicio)
+            log(f"✅ Diálogos completados: {n_pares:,} pares, {n_caracteres:,} caracteres en {transcurrido:.0f}s "
+                f"({n_pares / transcurrido:.1f} pares/s)" + (f", {invalidos} registros no reconocidos" if invalidos else ""))
+            log(f"⏱️ Pipeline: {pipeline.resumen()}")
+            if reporte.hay_algo():
+                log(reporte.resumen())
+            if signals and not console_mode:
+                if detenido:
+                    signals.entrenamiento_detenido.emit()
+                else:
+                    signals.progreso_entrenamiento.emit(100)
+                    signals.entrenamiento_terminado.emit()
+        
         except Exception as e:
-            signals.respuesta_lista.emit("SISTEMA", f"❌ Folder Error: {str(e)}")
+            log(f"❌ Error importando diálogos: {str(e)}")
     
+    def watch_folders(self, carpetas, signals=None, console_mode=False, stop_event=None, intervalo=30,
+                      epocas=5, chunk_size=1000):
+        """
+        Modo demonio: sondea las carpetas cada `intervalo` segundos y entrena solo archivos
+        nuevos o modificados (de los ampliados, solo los bytes nuevos) hasta que se active stop_event.
+        """
+        def log(msg):
+            if console_mode:
+                print(msg)
+            elif signals:
+                signals.respuesta_lista.emit("SISTEMA", msg)
+        
+        if isinstance(carpetas, str):
+            carpetas = [carpetas]
+        watcher = FolderWatcher(
+            carpetas,
+            extensiones_corpus(),
+            os.path.join(os.path.dirname(self.archivo_melchor), "magi_watch_index.json"),
+            incluir=self.patrones_incluir,
+            excluir=self.patrones_excluir
+        )
+        
+        def checkpoint(cerebros):
+            # Cerebros primero: el índice nunca marca como aprendido algo sin guardar
+            for ia, path_save, _ in cerebros:
+                ia.guardar(path_save)
+            self.ledger.commit()
+            watcher.guardar()
+        
+        log(f"👁️ Vigilando {len(carpetas)} carpeta(s) cada {intervalo}s. {len(watcher.indice)} archivos ya indexados.")
+        ultimo_checkpoint = time.time()
+        cerebros_activos = self.get_active_brains()
+        
+        try:
+            while not (stop_event and stop_event.is_set()):
+                cerebros_activos = self.get_active_brains()
+                cambios = watcher.escanear() if cerebros_activos else []
+                
+                if cambios:
+                    nuevos_bytes = sum(tamano - inicio for _, inicio, tamano, _ in cambios)
+                    log(f"📥 {len(cambios)} archivo(s) nuevos o modificados ({nuevos_bytes / (1024 * 1024):.1f} MB)")
+                    pendientes = {ruta: (tamano, mtime) for ruta, _, tamano, mtime in cambios}
+                    inicios = {ruta: inicio for ruta, inicio, _, _ in cambios if inicio}
+                    reporte = LedgerReport()
+                    n_caracteres = 0
+                    
+                    pipeline = self._pipeline_texto(list(pendientes), chunk_size=chunk_size,
+                                                    stop_event=stop_event, inicios=inicios)
+                    for tipo, archivo_path, payload, _ in pipeline:
+                        if tipo == 'bloque':
+                            if self._aprender_bloque(cerebros_activos, payload, epocas, reporte):
+                                n_caracteres += len(payload)
+                        elif tipo == 'fin':
+                            self._registrar_archivo(archivo_path, payload, cerebros_activos)
+                            watcher.confirmar(archivo_path, *pendientes[archivo_path])
+                        elif tipo == 'error':
+                            log(f"❌ Error en {os.path.basename(archivo_path)}: {payload}")
+                        
+                        if time.time() - ultimo_checkpoint >= self.checkpoint_segundos:
+                            checkpoint(cerebros_activos)
+                            ultimo_checkpoint = time.time()
+                    
+                    log(f"✅ {n_caracteres:,} caracteres nuevos aprendidos | ⏱️ {pipeline.resumen()}")
+                    if reporte.hay_algo():
+                        log(reporte.resumen())
+                
+                if time.time() - ultimo_checkpoint >= self.checkpoint_segundos:
+                    checkpoint(cerebros_activos)
+                    ultimo_checkpoint = time.time()
+                
+                if stop_event:
+                    stop_event.wait(intervalo)
+                else:
+                    time.sleep(intervalo)
+        finally:
+            checkpoint(cerebros_activos)
+            log("🛑 Vigilancia detenida: cerebros e índice guardados")
+
+    def build_token_corpus(self, origen, destino=None, signals=None, console_mode=False, stop_event=None):
+        """
+        Tokeniza una vez un archivo o carpeta de texto en un corpus .magitok (memmap).
+        Devuelve la ruta del corpus o None si se detuvo.
+        """
+        def log(msg):
+            if console_mode:
+                print(msg)
+            elif signals:
+                signals.respuesta_lista.emit("SISTEMA", msg)
+
+        try:
+            if os.path.isdir(origen):
+                # Lista completa: el progreso y el log cuentan archivos
+                archivos = [entrada.path for entrada in self._descubrir(origen, extensiones_corpus())]
+            else:
+                archivos = [origen]
+            if not archivos:
+                log("⚠️ No se encontraron archivos de texto")
+                return None
+            if destino is None:
+                destino = os.path.normpath(origen).rstrip(os.sep) + TOKEN_CORPUS_EXTENSION
+
+            log(f"🔤 Tokenizando {len(archivos)} archivo(s) en {os.path.basename(destino)}...")
+            inicio = time.time()
+
+            def on_archivo(i, archivo):
+                if signals and not console_mode:
+                    signals.progreso_entrenamiento.emit(int(i / len(archivos) * 100))
+
+            cabecera = construir_corpus(archivos, destino, stop_event=stop_event, on_archivo=on_archivo)
+            if cabecera is None:
+                log("🛑 Tokenización interrumpida: no se ha escrito el corpus")
+                return None
+
+            transcurrido = max(1e-6, time.time() - inicio)
+            log(f"✅ Corpus listo: {cabecera['n_tokens']:,} tokens ({cabecera['dtype']}), "
+                f"{len(cabecera['vocab'])} caracteres distintos, {cabecera['n_tokens'] / transcurrido:,.0f} chars/s")
+            if signals and not console_mode:
+                signals.progreso_entrenamiento.emit(100)
+                signals.entrenamiento_terminado.emit()
+            return destino
+
+        except Exception as e:
+            log(f"❌ Error tokenizando corpus: {str(e)}")
+            return None
+
+    def train_from_token_corpus(self, path, signals=None, console_mode=False, stop_event=None,
+                                longitud=1000, epocas=1, pasadas=1, modo="secuencial", ventanas=None, semilla=None):
+        """
+        Entrena desde un corpus .magitok leyendo ventanas de `longitud` tokens del memmap.
+        Cada ventana se traduce al vocabulario de cada cerebro con su LUT; sin re-tokenizar texto.
+        modo "secuencial" recorre el corpus `pasadas` veces; "aleatorio" muestrea `ventanas` por pasada.
+        No pasa por el ledger: repetir pasadas es intencionado.
+        """
+        def log(msg):
+            if console_mode:
+                print(msg)
+            elif signals:
+                signals.respuesta_lista.emit("SISTEMA", msg)
+
+        try:
+            cerebros_activos = self.get_active_brains()
+            if not cerebros_activos:
+                log("⚠️ No hay cerebros activos")
+                return
+
+            corpus = TokenCorpus(path)
+            if len(corpus) < 2:
+                log("⚠️ El corpus está vacío")
+                return
+
+            # LUTs antes de abrir la sesión GPU: pueden ampliar el vocabulario (y los shapes).
+            # Con vocabulario compartido todos los cerebros usan la misma LUT y la misma ventana traducida
+            compartido = self.vocabulario_compartido
+            if compartido is not None:
+                luts = [corpus.lut_para(compartido.tokenizador, compartido.ampliar)] * len(cerebros_activos)
+            else:
+                luts = [corpus.lut_para(ia.tokenizador, ia.expandir_vocabulario) for ia, _, _ in cerebros_activos]
+            gpu = [hasattr(ia, 'iniciar_sesion_gpu') and ia.iniciar_sesion_gpu() for ia, _, _ in cerebros_activos]
+
+            por_pasada = corpus.n_ventanas(longitud) if modo == "secuencial" or ventanas is None else ventanas
+            total = max(1, por_pasada * pasadas)
+            log(f"📚 Corpus {os.path.basename(path)}: {len(corpus):,} tokens, {por_pasada:,} ventanas de {longitud} "
+                f"× {pasadas} pasada(s) ({modo})" + (" | GPU" if any(gpu) else ""))
+
+            inicio = time.time()
+            ultimo_informe = inicio
+            ultimo_checkpoint = inicio
+            n_ventanas = 0
+            n_tokens = 0
+            try:
+                for pasada in range(pasadas):
+                    semilla_pasada = None if semilla is None else semilla + pasada
+                    for _, ventana in corpus.ventanas(longitud, modo=modo, n=ventanas, semilla=semilla_pasada):
+                        if stop_event and stop_event.is_set():
+                            break
+                        traducida = luts[0][ventana] if compartido is not None else None
+                        for (ia, _, _), lut, en_gpu in zip(cerebros_activos, luts, gpu):
+                            indices = traducida if traducida is not None else lut[ventana]
+                            if en_gpu:
+                                ia.aprender_indices_gpu(indices, epocas=epocas)
+                            else:
+                                ia.aprender_indices(indices, epocas=epocas)
+                        n_ventanas += 1
+                        n_tokens += len(ventana)
+
+                        ahora = time.time()
+                        if ahora - ultimo_informe >= 5:
+                            transcurrido = max(1e-6, ahora - inicio)
+                            fraccion = min(1.0, n_ventanas / total)
+                            eta = transcurrido * (1 - fraccion) / fraccion if fraccion else 0
+                            log(f"📚 Pasada {pasada + 1}/{pasadas} | {fraccion * 100:.1f}% | "
+                                f"{n_tokens / transcurrido:,.0f} tokens/s | ETA {eta / 60:.1f} min")
+                            if signals and not console_mode:
+                                signals.progreso_entrenamiento.emit(int(fraccion * 100))
+                            ultimo_informe = ahora
+                        if ahora - ultimo_checkpoint >= self.checkpoint_segundos:
+                            for ia, path_save, _ in cerebros_activos:
+                                ia.guardar(path_save)
+                            ultimo_checkpoint = ahora
+                    if stop_event and stop_event.is_set():
+                        break
+            finally:
+                for (ia, path_save, _), en_gpu in zip(cerebros_activos, gpu):
+                    if en_gpu:
+                        ia.finalizar_sesion_gpu()
+                    ia.guardar(path_save)
+
+            transcurrido = max(1e-6, time.time() - inicio)
+            if self._detenido(stop_event):
+                log(f"🛑 Entrenamiento interrumpido tras {n_ventanas:,} ventanas: cerebros guardados")
+                if signals and not console_mode:
+                    signals.entrenamiento_detenido.emit()
+            else:
+                log(f"✅ Corpus completado: {n_ventanas:,} ventanas, {n_tokens:,} tokens en {transcurrido:.0f}s "
+                    f"({n_tokens / transcurrido:,.0f} tokens/s)")
+                if signals and not console_mode:
+                    signals.progreso_entrenamiento.emit(100)
+                    signals.entrenamiento_terminado.emit()
+
+        except Exception as e:
+            log(f"❌ Error entrenando desde corpus: {str(e)}")
+
     def load_external_brain(self, nombre_cerebro, filename):
         """Carga un cerebro externo"""
         try:
             cerebro_cargado = RedCrecimientoInfinito.cargar(filename)
+            cerebro_cargado.configurar_vocabulario(self.max_vocabulario, self.normalizacion_unicode)
+            self._ajustar_cerebro(cerebro_cargado)
             
             if nombre_cerebro == "melchor":
                 self.ia_melchor = cerebro_cargado
                 self.ia_melchor.guardar(self.archivo_melchor)
+                self._sincronizar_ledger("melchor")
+                self._realinear_vocabulario()
                 return True, f"✅ MELCHOR cargado exitosamente ({self.ia_melchor.n_oculta} neuronas)"
             elif nombre_cerebro == "gaspar":
                 self.ia_gaspar = cerebro_cargado
                 self.ia_gaspar.guardar(self.archivo_gaspar)
+                self._sincronizar_ledger("gaspar")
+                self._realinear_vocabulario()
                 return True, f"✅ GASPAR cargado exitosamente ({self.ia_gaspar.n_oculta} neuronas)"
             elif nombre_cerebro == "casper":
                 self.ia_casper = cerebro_cargado
                 self.ia_casper.guardar(self.archivo_casper)
+                self._sincronizar_ledger("casper")
+                self._realinear_vocabulario()
                 return True, f"✅ CASPER cargado exitosamente ({self.ia_casper.n_oculta} neuronas)"
             
             return False, "Nombre de cerebro inválido"
@@ -813,10 +1697,12 @@ class BrainManager:
         except Exception as e:
             return False, f"Error cargando cerebro: {str(e)}"
 
-    def train_from_text_folder_gpu(self, folder_path, signals=None, console_mode=False, stop_event=None):
+    def train_from_text_folder_gpu(self, folder_path, signals=None, console_mode=False, stop_event=None, reanudar=True,
+                                   epocas=2, chunk_size=200000):
         """
         Entrena desde carpeta de archivos TXT usando GPU MPS.
         Soporta modo consola (headless) y stop_event para interrupción segura.
+        Con reanudar, un manifiesto junto a los cerebros permite continuar donde se detuvo.
         """
         def log(msg):
             if console_mode:
@@ -845,12 +1731,38 @@ class BrainManager:
                  log("⚠️ PyTorch no encontrado. Usando CPU...")
 
             # Buscar archivos
-            archivos_txt = [os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.lower().endswith('.txt')]
-            if not archivos_txt:
+            # El manifiesto necesita la lista completa; tamaño y mtime vienen ya del stat de scandir
+            entradas = list(self._descubrir(folder_path, extensiones_corpus()))
+            if not entradas:
                 log("⚠️ No se encontraron archivos .txt")
                 return
             
-            log(f"📁 BATCH JOB: {len(archivos_txt)} archivos TXT en cola")
+            # Manifiesto del trabajo: archivos completados y offset alcanzado en cada uno
+            ruta_manifiesto = JobManifest.ruta_para(os.path.dirname(self.archivo_melchor), folder_path)
+            manifiesto = JobManifest.cargar(ruta_manifiesto, folder_path) if reanudar else None
+            if manifiesto and not manifiesto.compatible(cerebros_activos):
+                log("⚠️ Los cerebros son más antiguos que el último checkpoint del trabajo: se empieza de cero")
+                manifiesto = None
+            if manifiesto:
+                reiniciados = manifiesto.sincronizar(entradas)
+                log(f"♻️ Reanudando trabajo: {manifiesto.completados()} archivos ya completados"
+                    + (f", {reiniciados} modificados desde entonces" if reiniciados else ""))
+            else:
+                manifiesto = JobManifest(ruta_manifiesto, folder_path)
+                manifiesto.sincronizar(entradas)
+            pendientes = manifiesto.pendientes()
+            # Los comprimidos no se pueden reanudar a mitad: se releen y el ledger salta lo ya visto
+            inicios = {ruta: offset for ruta, offset in pendientes if offset and not es_comprimido(ruta)}
+            
+            reporte = LedgerReport()
+            firmas = {ruta: (e["tamano"], e["mtime"]) for ruta, e in manifiesto.archivos.items()}
+            archivos_txt = self._filtrar_aprendidos([ruta for ruta, _ in pendientes], cerebros_activos, reporte, firmas)
+            if not archivos_txt:
+                log(f"⏭️ Nada nuevo: los {reporte.archivos_saltados} archivos pendientes ya fueron aprendidos")
+                manifiesto.eliminar()
+                return
+            
+            log(f"📁 BATCH JOB: {len(archivos_txt)} archivos TXT en cola ({reporte.archivos_saltados} ya aprendidos)")
             
             # 1. INICIAR SESIÓN GPU PERSISTENTE
             for ia, _, nombre in cerebros_activos:
@@ -859,57 +1771,92 @@ class BrainManager:
                     success = ia.iniciar_sesion_gpu()
                     if success: log(f"   └─ {nombre}: VRAM cargada OK")
 
+            def pendiente(archivo):
+                return firmas[archivo][0] - inicios.get(archivo, 0)
+            
+            def checkpoint():
+                # Primero los cerebros, luego el manifiesto: nunca apunta más allá de lo guardado
+                for ia, path_save, _ in cerebros_activos:
+                    if hasattr(ia, 'sincronizar_gpu_a_cpu'):
+                        ia.sincronizar_gpu_a_cpu()
+                    ia.guardar(path_save)
+                manifiesto.guardar(cerebros_activos)
+                self.ledger.commit()
+            
             total_caracteres_global = 0
+            total_bytes_global = max(1, sum(pendiente(a) for a in archivos_txt))
+            bytes_previos = 0
+            ultimo_checkpoint = time.time()
+            inicio_trabajo = ultimo_informe = time.time()
+            completado = False
+            
+            # MEGA-CHUNKS para M4: 200,000 caracteres leídos en streaming.
+            # Lectura y troceado del siguiente archivo se solapan con el entrenamiento.
+            pipeline = self._pipeline_texto(archivos_txt, chunk_size=chunk_size, separador="\n\n",
+                                            stop_event=stop_event, inicios=inicios)
+            idx = -1
             
             try:
                 # 2. PROCESAR ARCHIVOS (Bucle rápido)
-                for idx, archivo_path in enumerate(archivos_txt):
+                for tipo, archivo_path, payload, bytes_leidos in pipeline:
                     # Chequear interrupción
                     if stop_event and stop_event.is_set():
-                        log("\n🛑 INTERRUPTED BY USER (ESC DETECTED)")
                         break
-
-                    try:
-                        with open(archivo_path, 'rt', encoding='utf-8', errors='ignore') as f:
-                            texto_completo = f.read()
-                        
-                        if not texto_completo.strip(): continue
-                        
-                        # MEGA-CHUNKS para M4: 200,000 caracteres
-                        chunk_size = 200000 
-                        bloques = [texto_completo[i:i+chunk_size] for i in range(0, len(texto_completo), chunk_size)]
-                        
-                        for bloque in bloques:
-                            if stop_event and stop_event.is_set(): break
-                            if bloque.strip():
-                                for ia, _, _ in cerebros_activos:
-                                    if hasattr(ia, 'aprender_bloque_gpu'):
-                                        ia.aprender_bloque_gpu(bloque, epocas=2)
-                                    else:
-                                        ia.aprender(bloque, epocas=1)
-                        
-                        total_caracteres_global += len(texto_completo)
-                        
-                        # Progreso UI / Console Log
-                        if console_mode:
-                            sys.stdout.write(f"\r✅ Processed {idx+1}/{len(archivos_txt)} files | Total Chars: {total_caracteres_global:,}")
-                            sys.stdout.flush()
-                        else:
-                            if (idx + 1) % 5 == 0 or idx == len(archivos_txt) - 1:
-                                progreso = int(((idx + 1) / len(archivos_txt)) * 100)
-                                update_progress(progreso)
+                    
+                    if tipo == 'archivo':
+                        idx += 1
+                        continue
+                    
+                    if tipo == 'error':
+                        bytes_previos += pendiente(archivo_path)
+                        log(f"❌ Error en archivo {idx}: {payload}")
+                        continue
+                    
+                    if tipo == 'bloque':
+                        try:
+                            if self._aprender_bloque(cerebros_activos, payload, epocas, reporte, entrenar=_entrenar_gpu):
+                                total_caracteres_global += len(payload)
+                        except Exception as e:
+                            log(f"❌ Error en archivo {idx}: {str(e)}")
+                        manifiesto.avanzar(archivo_path, bytes_leidos)
                         
-                        # Guardado periódico
-                        if (idx + 1) % 50 == 0:
-                            log(f"💾 Checkpoint: Sincronizando RAM...")
-                            for ia, path_save, _ in cerebros_activos:
-                                if hasattr(ia, 'sincronizar_gpu_a_cpu'):
-                                    ia.sincronizar_gpu_a_cpu()
-                                ia.guardar(path_save)
-                                
-                    except Exception as e:
-                        log(f"❌ Error en archivo {idx}: {str(e)}")
+                        # Checkpoint por tiempo para archivos muy grandes
+                        if time.time() - ultimo_checkpoint >= self.checkpoint_segundos:
+                            checkpoint()
+                            ultimo_checkpoint = time.time()
                         continue
+                    
+                    # tipo == 'fin': archivo completado
+                    bytes_previos += pendiente(archivo_path)
+                    manifiesto.completar(archivo_path)
+                    self._registrar_archivo(archivo_path, payload, cerebros_activos)
+                    
+                    # Progreso UI / Console Log (líneas periódicas con throughput y ETA, sin reescribir con \r)
+                    if console_mode:
+                        if time.time() - ultimo_informe >= 10 or idx == len(archivos_txt) - 1:
+                            fraccion = min(1.0, bytes_previos / total_bytes_global)
+                            transcurrido = max(1e-6, time.time() - inicio_trabajo)
+                            eta = transcurrido * (1 - fraccion) / fraccion if fraccion else 0
+                            log(f"✅ Processed {idx+1}/{len(archivos_txt)} files ({fraccion * 100:.1f}% bytes) | "
+                                f"Total Chars: {total_caracteres_global:,} | {total_caracteres_global / transcurrido:,.0f} chars/s | "
+                                f"ETA {eta / 60:.1f} min")
+                            ultimo_informe = time.time()
+                    else:
+                        if (idx + 1) % 5 == 0 or idx == len(archivos_txt) - 1:
+                            progreso = int(min(bytes_previos, total_bytes_global) / total_bytes_global * 100)
+                            update_progress(progreso)
+                    
+                    # Guardado periódico
+                    if (idx + 1) % self.checkpoint_archivos == 0 or time.time() - ultimo_checkpoint >= self.checkpoint_segundos:
+                        log(f"💾 Checkpoint: Sincronizando RAM...")
+                        checkpoint()
+                        ultimo_checkpoint = time.time()
+                
+                if stop_event and stop_event.is_set():
+                    log("\n🛑 INTERRUPTED BY USER (ESC DETECTED)")
+                    log(f"💾 Progreso guardado en {os.path.basename(ruta_manifiesto)}: se reanudará en la próxima ejecución")
+                else:
+                    completado = True
             
             finally:
                 # 3. FINALIZAR SESIÓN GPU (Siempre ejecutar, incluso si hay error)
@@ -918,12 +1865,26 @@ class BrainManager:
                     if hasattr(ia, 'finalizar_sesion_gpu'):
                         ia.finalizar_sesion_gpu()
                     ia.guardar(path_save)
+                self.ledger.commit()
+                if completado:
+                    manifiesto.eliminar()
+                else:
+                    manifiesto.guardar(cerebros_activos)
 
             if not console_mode and signals:
-                update_progress(100)
-                signals.entrenamiento_terminado.emit()
-            
-            log(f"\n✅ FINALIZADO: {len(archivos_txt)} archivos procesados a velocidad luz. Total: {total_caracteres_global:,} caracteres.")
+                if completado:
+                    update_progress(100)
+                    signals.entrenamiento_terminado.emit()
+                else:
+                    signals.entrenamiento_detenido.emit()
+            
+            if completado:
+                log(f"\n✅ FINALIZADO: {len(archivos_txt)} archivos procesados a velocidad luz. Total: {total_caracteres_global:,} caracteres.")
+            else:
+                log(f"\n⏸️ DETENIDO: {idx + 1}/{len(archivos_txt)} archivos alcanzados. Total: {total_caracteres_global:,} caracteres.")
+            log(f"⏱️ Pipeline: {pipeline.resumen()}")
+            if reporte.hay_algo():
+                log(reporte.resumen())
             
         except Exception as e:
             log(f"❌ CRITICAL GPU ERROR: {str(e)}")
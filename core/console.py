@@ -0,0 +1,118 @@
+"""
+Salida de consola para trabajos sin GUI
+Sustituye a IAWorkerSignals con las mismas señales y escribe texto legible o JSON lines
+con caracteres/segundo y ETA
+"""
+import json
+import sys
+import threading
+import time
+
+
+class _Senal:
+    """Imita la interfaz emit() de una Signal de Qt"""
+
+    def __init__(self, funcion=None):
+        self._funcion = funcion
+
+    def emit(self, *args):
+        if self._funcion:
+            self._funcion(*args)
+
+
+class ConsoleSignals:
+    """
+    Señales de consola. El progreso se limita a una línea cada `intervalo` segundos;
+    el throughput se mide con los caracteres procesados por los cerebros (caracteres_totales,
+    que cuenta cada época), así que refleja el trabajo del modelo y no solo el tamaño del corpus.
+    """
+
+    def __init__(self, cerebros=None, json_lines=False, salida=None, intervalo=2.0):
+        self.cerebros = cerebros or []
+        self.json_lines = json_lines
+        self.salida = salida or sys.stdout
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._inicio = time.time()
+        self._chars_inicio = self._caracteres()
+        self._ultimo_progreso = 0.0
+        self._porcentaje = None
+
+        self.respuesta_lista = _Senal(self._mensaje)
+        self.progreso_entrenamiento = _Senal(self._progreso)
+        self.entrenamiento_terminado = _Senal(self._terminado)
+        self.entrenamiento_detenido = _Senal(self._detenido)
+        self.error_ocurrido = _Senal(lambda texto: self._mensaje("ERROR", texto))
+        # Señales solo de interfaz: se ignoran en consola
+        self.stats_actualizadas = _Senal()
+        self.voto_magi = _Senal()
+        self.cerebro_expandido = _Senal()
+        self.texto_transcrito = _Senal()
+        self.pensando = _Senal()
+
+    def _caracteres(self):
+        # Todos los cerebros aprenden el mismo texto: basta con el que más ha avanzado
+        return max((ia.caracteres_totales for ia, _, _ in self.cerebros), default=0)
+
+    def metricas(self):
+        transcurrido = max(1e-6, time.time() - self._inicio)
+        caracteres = self._caracteres() - self._chars_inicio
+        p = self._porcentaje
+        eta = transcurrido * (100 - p) / p if p and p < 100 else None
+        return {
+            "percent": p,
+            "chars": caracteres,
+            "chars_per_sec": round(caracteres / transcurrido, 1),
+            "elapsed_s": round(transcurrido, 1),
+            "eta_s": round(eta, 1) if eta is not None else None,
+        }
+
+    def _escribir(self, evento, datos):
+        with self._lock:
+            if self.json_lines:
+                linea = json.dumps(dict(event=evento, time=round(time.time(), 3), **datos), ensure_ascii=False)
+            elif evento == "message":
+                linea = f"[{datos['author']}] {datos['text']}"
+            else:
+                linea = self._formatear(evento, datos)
+            self.salida.write(linea + "\n")
+            self.salida.flush()
+
+    @staticmethod
+    def _formatear(evento, m):
+        icono = {"done": "✅", "stopped": "⏸️"}.get(evento, "⏳")
+        partes = [f"{icono} {evento}"]
+        if m["percent"] is not None:
+            partes.append(f"{m['percent']}%")
+        partes.append(f"{m['chars']:,} chars")
+        partes.append(f"{m['chars_per_sec']:,.0f} chars/s")
+        if m["eta_s"] is not None:
+            partes.append(f"ETA {m['eta_s'] / 60:.1f} min")
+        return " | ".join(partes)
+
+    def _mensaje(self, autor, texto):
+        self._escribir("message", {"author": autor, "text": texto})
+
+    def _progreso(self, porcentaje):
+        self._porcentaje = porcentaje
+        ahora = time.time()
+        if porcentaje < 100 and ahora - self._ultimo_progreso < self.intervalo:
+            return
+        self._ultimo_progreso = ahora
+        self._escribir("progress", self.metricas())
+
+    def _terminado(self):
+        self._escribir("done", self.metricas())
+
+    def _detenido(self):
+        self._escribir("stopped", self.metricas())
+
+    def crecimiento(self, decision):
+        """Decisión de la política de crecimiento (en texto ya la anuncia la propia política)"""
+        if self.json_lines:
+            self._escribir("growth", decision)
+
+    def latido(self):
+        """Línea de progreso periódica aunque el trabajo no emita porcentajes"""
+        self._ultimo_progreso = time.time()
+        self._escribir("progress", self.metricas())
@@ -0,0 +1,106 @@
+"""
+Caché direccionada por contenido
+Guarda resultados derivados de un archivo (texto extraído, transcripciones...) bajo el hash de su contenido
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+# Memo de hashes por (ruta, tamaño, mtime) para no releer archivos grandes en el mismo proceso
+_memo_hashes = {}
+_lock_memo = threading.Lock()
+
+
+def hash_archivo(path, bloque=1 << 20):
+    """SHA-256 del contenido de un archivo, leído por bloques"""
+    st = os.stat(path)
+    firma = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _lock_memo:
+        if firma in _memo_hashes:
+            return _memo_hashes[firma]
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            datos = f.read(bloque)
+            if not datos:
+                break
+            h.update(datos)
+    digest = h.hexdigest()
+
+    with _lock_memo:
+        _memo_hashes[firma] = digest
+    return digest
+
+
+class ContentCache:
+    """
+    Directorio de entradas identificadas por clave (normalmente un hash de contenido).
+    Con max_bytes, al publicar una entrada se eliminan las menos usadas recientemente.
+    """
+
+    def __init__(self, directorio, extension=".txt", max_bytes=None):
+        self.directorio = directorio
+        self.extension = extension
+        self.max_bytes = max_bytes
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, clave + self.extension)
+
+    def get(self, clave):
+        """Ruta de la entrada si existe, o None (marca la entrada como usada)"""
+        ruta = self.ruta(clave)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        return ruta
+
+    def _entradas(self):
+        if not os.path.isdir(self.directorio):
+            return []
+        return [e for e in os.scandir(self.directorio) if e.is_file() and e.name.endswith(self.extension)]
+
+    def evictar(self, conservar=None):
+        """Elimina entradas por antigüedad de uso hasta quedar bajo max_bytes"""
+        if not self.max_bytes:
+            return 0
+        entradas = sorted(self._entradas(), key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entradas)
+        eliminadas = 0
+        for entrada in entradas:
+            if total <= self.max_bytes:
+                break
+            if conservar and entrada.path == conservar:
+                continue
+            try:
+                total -= entrada.stat().st_size
+                os.remove(entrada.path)
+                eliminadas += 1
+            except OSError:
+                pass
+        return eliminadas
+
+    @contextmanager
+    def writer(self, clave):
+        """
+        Abre un archivo temporal para escribir la entrada.
+        Solo se publica (rename atómico) si el bloque termina sin excepción.
+        """
+        os.makedirs(self.directorio, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                yield f
+            os.replace(tmp, self.ruta(clave))
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        self.evictar(conservar=self.ruta(clave))
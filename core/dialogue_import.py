@@ -0,0 +1,105 @@
+"""
+Importación de diálogos (JSONL / CSV)
+Parsea registros en streaming y los convierte en pares (prompt, respuesta) con el offset en bytes
+"""
+import csv
+import json
+
+from core.text_stream import iter_lines
+
+# Nombres de campo reconocidos automáticamente (primero el prompt, luego la respuesta)
+CAMPOS_PAR = (
+    ("prompt", "response"), ("prompt", "completion"), ("input", "output"),
+    ("instruction", "output"), ("question", "answer"), ("pregunta", "respuesta"),
+    ("user", "assistant"), ("usuario", "asistente"),
+)
+ROLES_PROMPT = ("user", "usuario", "human", "humano")
+ROLES_RESPUESTA = ("assistant", "asistente", "gpt", "bot", "model")
+
+
+def _texto(valor):
+    return valor.strip() if isinstance(valor, str) else ""
+
+
+def pares_de_registro(registro, campo_prompt=None, campo_respuesta=None):
+    """Extrae los pares (prompt, respuesta) de un registro ya parseado (dict)"""
+    if not isinstance(registro, dict):
+        return []
+
+    if campo_prompt and campo_respuesta:
+        par = (_texto(registro.get(campo_prompt)), _texto(registro.get(campo_respuesta)))
+        return [par] if all(par) else []
+
+    # Formato conversación: [{"role": "user", "content": ...}, {"role": "assistant", ...}]
+    mensajes = registro.get("messages") or registro.get("conversations") or registro.get("mensajes")
+    if isinstance(mensajes, list):
+        pares = []
+        prompt = None
+        for m in mensajes:
+            if not isinstance(m, dict):
+                continue
+            rol = str(m.get("role") or m.get("from") or m.get("rol") or "").lower()
+            contenido = _texto(m.get("content") or m.get("value") or m.get("contenido"))
+            if rol in ROLES_PROMPT:
+                prompt = contenido
+            elif rol in ROLES_RESPUESTA and prompt and contenido:
+                pares.append((prompt, contenido))
+                prompt = None
+        return pares
+
+    for c_prompt, c_respuesta in CAMPOS_PAR:
+        if c_prompt in registro and c_respuesta in registro:
+            par = (_texto(registro[c_prompt]), _texto(registro[c_respuesta]))
+            return [par] if all(par) else []
+    return []
+
+
+def _iter_jsonl(path):
+    for linea, offset in iter_lines(path):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            yield json.loads(linea), offset
+        except ValueError:
+            yield None, offset
+
+
+def _iter_csv(path):
+    # csv necesita las líneas tal cual para soportar campos entre comillas con saltos de línea
+    posicion = [0]
+
+    def lineas():
+        for linea, offset in iter_lines(path):
+            posicion[0] = offset
+            yield linea
+
+    for fila in csv.DictReader(lineas()):
+        yield fila, posicion[0]
+
+
+def iter_dialogos(path, campo_prompt=None, campo_respuesta=None):
+    """
+    Genera (prompt, respuesta, offset) sin cargar el archivo entero.
+    Acepta .jsonl/.json (un registro por línea) y .csv, también comprimidos (.gz, .bz2, .xz).
+    Los registros que no se pueden interpretar se cuentan con prompt None.
+    """
+    nombre = path.lower()
+    for sufijo in ('.gz', '.bz2', '.xz'):
+        if nombre.endswith(sufijo):
+            nombre = nombre[:-len(sufijo)]
+    registros = _iter_csv(path) if nombre.endswith('.csv') else _iter_jsonl(path)
+
+    for registro, offset in registros:
+        pares = pares_de_registro(registro, campo_prompt, campo_respuesta)
+        if not pares:
+            yield None, None, offset
+        for prompt, respuesta in pares:
+            yield prompt, respuesta, offset
+
+
+def medida_lote(item):
+    """Caracteres de un lote ('dialogos', path, [(prompt, respuesta), ...], offset)"""
+    if item[0] != 'dialogos':
+        return 0
+    return sum(len(p) + len(r) for p, r in item[2])
@@ -0,0 +1,82 @@
+"""
+Descubrimiento de corpus
+Recorre carpetas con os.scandir de forma perezosa y recursiva, filtra por extensión y patrones glob
+y, opcionalmente, ordena por tamaño
+"""
+import fnmatch
+import os
+from collections import namedtuple
+
+Entrada = namedtuple("Entrada", "path tamano mtime")
+
+# Órdenes soportados por descubrir()
+ORDENES = {
+    "pequenos": lambda e: (e.tamano, e.path),   # feedback temprano
+    "grandes": lambda e: (-e.tamano, e.path),   # reparto de carga entre workers
+    "nombre": lambda e: e.path,
+}
+
+
+def _coincide(relativa, nombre, patrones):
+    """Un patrón puede referirse al nombre ('*.txt') o a la ruta relativa ('borradores/*')"""
+    return any(fnmatch.fnmatch(relativa, p) or fnmatch.fnmatch(nombre, p) for p in patrones)
+
+
+def iter_archivos(raiz, extensiones=None, incluir=None, excluir=None, recursivo=True, seguir_enlaces=False):
+    """
+    Genera Entrada(path, tamano, mtime) según se recorre cada directorio, sin listar el árbol entero.
+    Los ocultos (.git, ._archivo de macOS...) se ignoran; excluir también poda directorios completos.
+    """
+    if extensiones:
+        extensiones = tuple(e.lower() for e in extensiones)
+    pendientes = [raiz]
+    while pendientes:
+        directorio = pendientes.pop()
+        try:
+            iterador = os.scandir(directorio)
+        except OSError:
+            continue
+
+        subdirectorios = []
+        with iterador:
+            for entry in iterador:
+                if entry.name.startswith('.'):
+                    continue
+                relativa = os.path.relpath(entry.path, raiz)
+                try:
+                    if entry.is_dir(follow_symlinks=seguir_enlaces):
+                        if recursivo and not (excluir and _coincide(relativa, entry.name, excluir)):
+                            subdirectorios.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+
+                if extensiones and not entry.name.lower().endswith(extensiones):
+                    continue
+                if incluir and not _coincide(relativa, entry.name, incluir):
+                    continue
+                if excluir and _coincide(relativa, entry.name, excluir):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                yield Entrada(entry.path, st.st_size, st.st_mtime_ns)
+
+        # Profundidad primero, en orden alfabético de subdirectorios
+        pendientes.extend(sorted(subdirectorios, reverse=True))
+
+
+def descubrir(raiz, extensiones=None, incluir=None, excluir=None, recursivo=True, orden=None):
+    """
+    Entradas del corpus. Sin orden se devuelve el generador perezoso tal cual;
+    con orden ("pequenos", "grandes", "nombre") hace falta recorrer todo antes de ordenar.
+    """
+    entradas = iter_archivos(raiz, extensiones=extensiones, incluir=incluir, excluir=excluir, recursivo=recursivo)
+    if orden is None:
+        return entradas
+    if orden not in ORDENES:
+        raise ValueError(f"Orden desconocido: {orden}")
+    return sorted(entradas, key=ORDENES[orden])
@@ -0,0 +1,210 @@
+"""
+Políticas de crecimiento de los cerebros
+Los cerebros llegan a sus puntos de crecimiento por caracteres vistos (cada 500 en CPU, con un
+umbral que aumenta con el tamaño en GPU). En cada punto, la política decide si expandir_cerebro
+se ejecuta según la memoria de los tres cerebros, el coste medido por carácter o el estancamiento
+de la pérdida, y deja registro de cada decisión.
+"""
+import collections
+import time
+
+
+def _mb(n_bytes):
+    return n_bytes / (1024 * 1024)
+
+
+class PoliticaCrecimiento:
+    """
+    Base (y política por defecto): crece siempre, como sin política.
+    Las subclases implementan _evaluar(ia) -> (crecer, motivo) y, si miden algo, observar().
+    """
+
+    def __init__(self, on_decision=None):
+        self.on_decision = on_decision
+        self.decisiones = collections.deque(maxlen=200)
+        self._cerebros = dict
+        self._creciendo = {}
+
+    def vincular(self, cerebros):
+        """cerebros: función que devuelve {nombre: red} (los cerebros actuales, aunque se recarguen)"""
+        self._cerebros = cerebros
+
+    @property
+    def cerebros(self):
+        return self._cerebros()
+
+    def nombre_de(self, ia):
+        for nombre, red in self.cerebros.items():
+            if red is ia:
+                return nombre
+        return "cerebro"
+
+    def observar(self, ia, caracteres, segundos, perdida):
+        """Medidas de un paso de entrenamiento: caracteres procesados (por época), duración y pérdida media"""
+
+    def al_crecer(self, ia):
+        """Se llama cuando la decisión final fue crecer"""
+
+    def _evaluar(self, ia):
+        return True, "sin límite"
+
+    def decidir(self, ia):
+        crecer, motivo = self._evaluar(ia)
+        if crecer:
+            self.al_crecer(ia)
+        self._registrar(ia, crecer, motivo)
+        return crecer
+
+    def _registrar(self, ia, crecer, motivo):
+        nombre = self.nombre_de(ia)
+        decision = {"cerebro": nombre, "crecer": crecer, "motivo": motivo,
+                    "neuronas": ia.n_oculta, "hora": time.time()}
+        self.decisiones.append(decision)
+        # Hacia fuera solo los cambios y los crecimientos: un "no" repetido en cada punto de
+        # crecimiento sería ruido (el historial completo queda en self.decisiones)
+        cambio = self._creciendo.get(id(ia), True) != crecer
+        if self.on_decision and (cambio or crecer):
+            self.on_decision(decision)
+        if cambio:
+            self._creciendo[id(ia)] = crecer
+            if crecer:
+                print(f"▶️ CRECIMIENTO {nombre.upper()} REANUDADO: {motivo}")
+            else:
+                print(f"⏸️ CRECIMIENTO {nombre.upper()} EN PAUSA ({ia.n_oculta} neuronas): {motivo}")
+
+    def resumen(self):
+        """Última decisión por cerebro"""
+        ultimas = {}
+        for decision in self.decisiones:
+            ultimas[decision["cerebro"]] = decision
+        return ultimas
+
+
+class PresupuestoMemoria(PoliticaCrecimiento):
+    """Crece mientras pesos + Adam + espacio de trabajo de todos los cerebros quepan en limite_mb"""
+
+    def __init__(self, limite_mb, on_decision=None):
+        super().__init__(on_decision)
+        self.limite_mb = limite_mb
+
+    def _evaluar(self, ia):
+        cerebros = list(self.cerebros.values())
+        if not any(red is ia for red in cerebros):
+            cerebros.append(ia)
+        total = sum(red.bytes_en_memoria() for red in cerebros)
+        # Casi toda la memoria de un cerebro es proporcional a n_oculta
+        extra = ia.bytes_en_memoria() * ia.incremento_crecimiento() / max(1, ia.n_oculta)
+        if _mb(total + extra) > self.limite_mb:
+            return False, f"memoria {_mb(total + extra):.0f} MB > presupuesto {self.limite_mb:.0f} MB"
+        return True, f"memoria {_mb(total + extra):.0f} de {self.limite_mb:.0f} MB"
+
+
+class CostePorCaracter(PoliticaCrecimiento):
+    """
+    Crece mientras el coste de entrenamiento medido (media móvil, µs por carácter y época)
+    siga por debajo de max_us una vez crecido. El coste escala ~linealmente con n_oculta.
+    """
+
+    def __init__(self, max_us, suavizado=0.2, on_decision=None):
+        super().__init__(on_decision)
+        self.max_us = max_us
+        self.suavizado = suavizado
+        self._coste = {}
+
+    def observar(self, ia, caracteres, segundos, perdida):
+        if caracteres <= 0:
+            return
+        # El coste por carácter depende del tamaño: se re-escala a la n_oculta actual al decidir
+        us = 1e6 * segundos / caracteres / ia.n_oculta
+        anterior = self._coste.get(id(ia))
+        self._coste[id(ia)] = us if anterior is None else anterior + self.suavizado * (us - anterior)
+
+    def _evaluar(self, ia):
+        por_neurona = self._coste.get(id(ia))
+        if por_neurona is None:
+            return True, "sin medidas de coste"
+        previsto = por_neurona * (ia.n_oculta + ia.incremento_crecimiento())
+        if previsto > self.max_us:
+            return False, f"coste previsto {previsto:.1f} µs/carácter > {self.max_us:.1f}"
+        return True, f"coste previsto {previsto:.1f} de {self.max_us:.1f} µs/carácter"
+
+
+class EstancamientoPerdida(PoliticaCrecimiento):
+    """
+    Crece solo cuando la pérdida se estanca: la media de las últimas `ventana` observaciones
+    mejora menos de `mejora_minima` (relativa) frente a las `ventana` anteriores.
+    Tras crecer vuelve a medir desde cero.
+    """
+
+    def __init__(self, ventana=20, mejora_minima=0.01, on_decision=None):
+        super().__init__(on_decision)
+        self.ventana = ventana
+        self.mejora_minima = mejora_minima
+        self._perdidas = {}
+
+    def observar(self, ia, caracteres, segundos, perdida):
+        if perdida is None:
+            return
+        historial = self._perdidas.setdefault(id(ia), collections.deque(maxlen=2 * self.ventana))
+        historial.append(perdida)
+
+    def _evaluar(self, ia):
+        historial = list(self._perdidas.get(id(ia), ()))
+        if len(historial) < 2 * self.ventana:
+            return False, f"midiendo la pérdida ({len(historial)}/{2 * self.ventana})"
+        antes = sum(historial[:self.ventana]) / self.ventana
+        ahora = sum(historial[self.ventana:]) / self.ventana
+        mejora = (antes - ahora) / antes if antes > 0 else 0.0
+        if mejora >= self.mejora_minima:
+            return False, f"la pérdida aún baja ({mejora:.1%})"
+        return True, f"pérdida estancada en {ahora:.3f} ({mejora:.1%})"
+
+    def al_crecer(self, ia):
+        self._perdidas.pop(id(ia), None)
+
+
+class TodasLasPoliticas(PoliticaCrecimiento):
+    """Combina políticas: crece solo si todas lo permiten (el motivo es el de la primera que lo impide)"""
+
+    def __init__(self, politicas, on_decision=None):
+        super().__init__(on_decision)
+        self.politicas = list(politicas)
+
+    def vincular(self, cerebros):
+        super().vincular(cerebros)
+        for politica in self.politicas:
+            politica.vincular(cerebros)
+
+    def observar(self, ia, caracteres, segundos, perdida):
+        for politica in self.politicas:
+            politica.observar(ia, caracteres, segundos, perdida)
+
+    def al_crecer(self, ia):
+        for politica in self.politicas:
+            politica.al_crecer(ia)
+
+    def _evaluar(self, ia):
+        motivos = []
+        for politica in self.politicas:
+            crecer, motivo = politica._evaluar(ia)
+            if not crecer:
+                return False, motivo
+            motivos.append(motivo)
+        return True, "; ".join(motivos) or "sin límite"
+
+
+def crear_politica(memoria_mb=None, coste_us=None, estancamiento=False, on_decision=None):
+    """Política a partir de los ajustes (None si no hay ninguno: crecimiento de siempre)"""
+    politicas = []
+    if memoria_mb:
+        politicas.append(PresupuestoMemoria(memoria_mb))
+    if coste_us:
+        politicas.append(CostePorCaracter(coste_us))
+    if estancamiento:
+        politicas.append(EstancamientoPerdida())
+    if not politicas:
+        return None
+    if len(politicas) == 1:
+        politicas[0].on_decision = on_decision
+        return politicas[0]
+    return TodasLasPoliticas(politicas, on_decision=on_decision)
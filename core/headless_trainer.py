@@ -1,81 +1,153 @@
+import inspect
 import sys
-import termios
-import tty
 import select
+import signal
 import threading
 import time
-import os
+
+from core.console import ConsoleSignals
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows: no raw terminal, ESC monitoring disabled
+    termios = None
+    tty = None
+
 
 class HeadlessTrainer:
     """
     Manages training sessions in the terminal without GUI.
-    Handles ESC key detection for interruption.
+    Stops gracefully on SIGINT/SIGTERM (final checkpoint is written by the job),
+    and also on ESC when stdin is an interactive terminal.
+    Works under systemd, cron, nohup or containers without a TTY.
     """
-    def __init__(self, brain_manager):
+    def __init__(self, brain_manager, json_lines=False, progress_interval=30.0, keyboard=True):
         self.brain_manager = brain_manager
         self.stop_event = threading.Event()
         self.training_thread = None
         self.input_thread = None
         self.is_running = False
+        self.json_lines = json_lines
+        # Seconds between throughput/ETA lines
+        self.progress_interval = progress_interval
+        # ESC monitoring (disable when stdin carries data)
+        self.keyboard = keyboard
+
+    def _print(self, msg):
+        # With JSON lines on stdout, human-readable status goes to stderr
+        print(msg, file=sys.stderr if self.json_lines else sys.stdout, flush=True)
 
-    def get_key(self):
-        """Reads a single keypress from stdin in raw mode (Unix/Mac)"""
+    @staticmethod
+    def stdin_is_tty():
+        try:
+            return termios is not None and sys.stdin is not None and sys.stdin.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def monitor_keyboard(self):
+        """Background thread to detect ESC key (only used when stdin is a TTY)"""
+        self._print("\n⌨️  Monitoring keyboard... Press [ESC] to stop.")
         fd = sys.stdin.fileno()
-        old_settings = termios.tcgetattr(fd)
         try:
-            tty.setraw(sys.stdin.fileno())
-            rlist, _, _ = select.select([sys.stdin], [], [], 0.1)
-            if rlist:
-                ch = sys.stdin.read(1)
-                return ch
-            return None
+            old_settings = termios.tcgetattr(fd)
+        except termios.error:
+            return
+        try:
+            # cbreak once for the whole session instead of toggling raw mode on every poll
+            tty.setcbreak(fd)
+            while self.is_running and not self.stop_event.is_set():
+                rlist, _, _ = select.select([sys.stdin], [], [], 0.1)
+                if rlist and sys.stdin.read(1) == '\x1b':  # ESC key code
+                    self._print("\n🛑 ESC DETECTED! Stopping training gracefully...")
+                    self.stop_event.set()
+                    break
         finally:
             termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
 
-    def monitor_keyboard(self):
-        """Background thread to detect ESC key"""
-        print("\n⌨️  Monitoring keyboard... Press [ESC] to stop.")
-        while self.is_running and not self.stop_event.is_set():
-            key = self.get_key()
-            if key == '\x1b': # ESC key code
-                print("\n🛑 ESC DETECTED! Stopping training gracefully...")
-                self.stop_event.set()
-                break
-            time.sleep(0.05)
+    def _install_signal_handlers(self):
+        """SIGINT/SIGTERM set the stop event; handlers can only be installed from the main thread"""
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+
+        def handler(signum, _frame):
+            if self.stop_event.is_set():
+                self._print(f"\n⏳ Already stopping ({signal.Signals(signum).name}), waiting for the checkpoint...")
+                return
+            self._print(f"\n🛑 {signal.Signals(signum).name} received. Stopping training gracefully...")
+            self.stop_event.set()
+
+        previous = {}
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                previous[signum] = signal.signal(signum, handler)
+            except (ValueError, OSError):
+                pass
+        return previous
+
+    @staticmethod
+    def _restore_signal_handlers(previous):
+        for signum, old_handler in previous.items():
+            signal.signal(signum, old_handler)
 
     def run_job(self, target_function, **kwargs):
         """
         Runs a training job in headless mode.
-        blocks main thread until finished or stopped.
+        Blocks the calling thread until finished or stopped.
         """
         self.stop_event.clear()
         self.is_running = True
-        
-        # UI Banner
-        os.system('cls' if os.name == 'nt' else 'clear')
-        print("="*60)
-        print("   🚀 MAGI HEADLESS TRAINING MODE (M4 OPTIMIZED)   ")
-        print("="*60)
-        print("Running job: " + target_function.__name__)
-        print("STATUS: INITIALIZING VRAM SESSION...")
-        print("-" * 60)
-        print("PRESS [ESC] TO STOP AND RETURN TO GUI")
-        print("-" * 60)
+        interactive = self.keyboard and self.stdin_is_tty()
+
+        # UI Banner (plain lines: logs stay readable when redirected)
+        self._print("=" * 60)
+        self._print("   🚀 MAGI HEADLESS TRAINING MODE (M4 OPTIMIZED)   ")
+        self._print("=" * 60)
+        self._print("Running job: " + getattr(target_function, '__name__', 'job'))
+        self._print("STATUS: INITIALIZING VRAM SESSION...")
+        self._print("-" * 60)
+        self._print("PRESS [ESC] TO STOP" if interactive else "SEND SIGINT/SIGTERM TO STOP")
+        self._print("-" * 60)
 
         # Start input monitor
-        self.input_thread = threading.Thread(target=self.monitor_keyboard, daemon=True)
-        self.input_thread.start()
-
-        # Run training function
-        # We inject 'console_mode=True' and 'stop_event=self.stop_event'
-        kwargs['console_mode'] = True
-        kwargs['stop_event'] = self.stop_event
-        
+        if interactive:
+            self.input_thread = threading.Thread(target=self.monitor_keyboard, daemon=True)
+            self.input_thread.start()
+        previous_handlers = self._install_signal_handlers()
+
+        # Messages and progress go through console signals (throughput/ETA lines, no \r rewrites)
+        console = kwargs.get('signals')
+        if console is None:
+            console = ConsoleSignals(self.brain_manager.get_active_brains(), json_lines=self.json_lines)
+            kwargs['signals'] = console
+        heartbeat = getattr(console, 'latido', None)
+        parameters = inspect.signature(target_function).parameters
+        if 'console_mode' in parameters:
+            kwargs['console_mode'] = False
+        if 'stop_event' in parameters:
+            kwargs['stop_event'] = self.stop_event
+
+        def job():
+            try:
+                target_function(**kwargs)
+            except Exception as e:
+                self._print(f"\n❌ ERROR IN HEADLESS JOB: {e}")
+
+        self.training_thread = threading.Thread(target=job, daemon=True)
+        self.training_thread.start()
+        last_report = time.time()
         try:
-            target_function(**kwargs)
-        except Exception as e:
-            print(f"\n❌ ERROR IN HEADLESS JOB: {e}")
+            while self.training_thread.is_alive():
+                self.training_thread.join(0.5)
+                if heartbeat and time.time() - last_report >= self.progress_interval:
+                    heartbeat()
+                    last_report = time.time()
         finally:
+            self._restore_signal_handlers(previous_handlers)
             self.is_running = False
-            print("\n✅ Job finished/stopped. Returning to GUI...")
-            time.sleep(2) # Give user a moment to see result
+            if self.stop_event.is_set():
+                self._print("\n🛑 Job stopped. Brains were checkpointed before exiting.")
+            else:
+                self._print("\n✅ Job finished.")
+            if interactive:
+                time.sleep(2)  # Give user a moment to see result
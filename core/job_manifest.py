@@ -0,0 +1,114 @@
+"""
+Manifiesto de trabajos de entrenamiento
+Persiste, junto a los cerebros, la lista de archivos de un trabajo por carpeta, el offset en bytes
+alcanzado en cada uno y las versiones de los cerebros en el último checkpoint, para reanudarlo.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+
+class JobManifest:
+    """Estado reanudable de un trabajo de entrenamiento sobre una carpeta"""
+
+    def __init__(self, path, carpeta):
+        self.path = path
+        self.carpeta = os.path.abspath(carpeta)
+        # ruta -> {"tamano", "mtime", "offset", "completo"} (en orden de procesamiento)
+        self.archivos = {}
+        self.versiones = {}
+
+    @staticmethod
+    def ruta_para(directorio, carpeta):
+        """Ruta del manifiesto de una carpeta (un manifiesto por carpeta de corpus)"""
+        clave = hashlib.sha1(os.path.abspath(carpeta).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(directorio or ".", f"magi_job_{clave}.json")
+
+    @classmethod
+    def cargar(cls, path, carpeta):
+        """Manifiesto existente para la carpeta, o None si no hay (o está dañado)"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return None
+        manifiesto = cls(path, carpeta)
+        if datos.get("carpeta") != manifiesto.carpeta:
+            return None
+        manifiesto.archivos = {a["ruta"]: a for a in datos.get("archivos", [])}
+        manifiesto.versiones = datos.get("versiones", {})
+        return manifiesto
+
+    def sincronizar(self, entradas):
+        """
+        Añade archivos nuevos al final y reinicia los que han cambiado en disco.
+        entradas son (ruta, tamano, mtime_ns), como las de core.discovery (sin volver a hacer stat).
+        Devuelve cuántos archivos se reiniciaron.
+        """
+        reiniciados = 0
+        for ruta, tamano, mtime in entradas:
+            entrada = self.archivos.get(ruta)
+            if entrada and (entrada["tamano"], entrada["mtime"]) == (tamano, mtime):
+                continue
+            if entrada and (entrada["offset"] or entrada["completo"]):
+                reiniciados += 1
+            self.archivos[ruta] = {"ruta": ruta, "tamano": tamano, "mtime": mtime,
+                                   "offset": 0, "completo": False}
+        return reiniciados
+
+    def compatible(self, cerebros):
+        """
+        True si los cerebros no son más antiguos que en el checkpoint.
+        Versiones mayores son normales si el proceso murió entre guardar cerebros y manifiesto.
+        """
+        for ia, _, nombre in cerebros:
+            if nombre in self.versiones and getattr(ia, 'version', 0) < self.versiones[nombre]:
+                return False
+        return True
+
+    def pendientes(self):
+        """Archivos sin completar, con el offset desde el que reanudar"""
+        return [(ruta, e["offset"]) for ruta, e in self.archivos.items()
+                if not e["completo"] and os.path.exists(ruta)]
+
+    def completados(self):
+        return sum(1 for e in self.archivos.values() if e["completo"])
+
+    def avanzar(self, ruta, offset):
+        if ruta in self.archivos:
+            self.archivos[ruta]["offset"] = offset
+
+    def completar(self, ruta):
+        if ruta in self.archivos:
+            self.archivos[ruta]["offset"] = self.archivos[ruta]["tamano"]
+            self.archivos[ruta]["completo"] = True
+
+    def guardar(self, cerebros):
+        """Escribe el manifiesto de forma atómica con las versiones actuales de los cerebros"""
+        self.versiones = {nombre: getattr(ia, 'version', 0) for ia, _, nombre in cerebros}
+        datos = {
+            "carpeta": self.carpeta,
+            "actualizado": time.time(),
+            "versiones": self.versiones,
+            "archivos": list(self.archivos.values()),
+        }
+        directorio = os.path.dirname(self.path) or "."
+        fd, tmp = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(datos, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def eliminar(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
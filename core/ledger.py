@@ -0,0 +1,162 @@
+"""
+Registro de ingesta (ledger)
+Recuerda, por cerebro, qué archivos y bloques ya se aprendieron (por hash de contenido)
+y en qué versión del modelo, para saltar o atenuar el reentrenamiento de lo ya visto.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+POLITICAS = ("skip", "downweight", "off")
+
+
+def hash_texto(texto):
+    """Hash corto y rápido de un bloque de texto"""
+    return hashlib.blake2b(texto.encode('utf-8', errors='ignore'), digest_size=16).hexdigest()
+
+
+class LedgerReport:
+    """Contadores de trabajo evitado en una sesión de ingesta"""
+
+    def __init__(self):
+        self.archivos_saltados = 0
+        self.bloques_saltados = 0
+        self.bloques_atenuados = 0
+        self.caracteres_saltados = 0
+
+    def hay_algo(self):
+        return bool(self.archivos_saltados or self.bloques_saltados or self.bloques_atenuados)
+
+    def resumen(self):
+        return (f"⏭️ Ya aprendido: {self.archivos_saltados} archivos y {self.bloques_saltados} bloques saltados "
+                f"({self.caracteres_saltados:,} caracteres), {self.bloques_atenuados} bloques atenuados")
+
+
+class TrainingLedger:
+    """
+    Base SQLite con dos tablas de contenido aprendido (archivos y bloques) por cerebro,
+    más un índice ruta/tamaño/mtime → hash para no releer archivos ya conocidos.
+
+    Una entrada solo cuenta si su versión es <= la versión actual del cerebro. Al cargar un
+    cerebro, descartar_posteriores() borra las entradas de versiones que no llegó a guardar
+    (un fallo entre un commit del ledger y guardar(), o un cerebro sustituido por uno más
+    antiguo): si no, volverían a contar en cuanto su versión las alcanzase.
+    """
+
+    def __init__(self, path="magi_ledger.sqlite", politica="skip"):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de ledger desconocida: {politica}")
+        self.path = path
+        self.politica = politica
+        self.lock = threading.Lock()
+        self._pendientes = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS archivos (
+                    cerebro TEXT, hash TEXT, version INTEGER, fecha REAL,
+                    PRIMARY KEY (cerebro, hash));
+                CREATE TABLE IF NOT EXISTS bloques (
+                    cerebro TEXT, hash TEXT, version INTEGER,
+                    PRIMARY KEY (cerebro, hash));
+                CREATE TABLE IF NOT EXISTS firmas (
+                    ruta TEXT PRIMARY KEY, tamano INTEGER, mtime INTEGER, hash TEXT);
+            """)
+            self.conn.commit()
+
+    # --- Hashes de archivos ---
+    def hash_conocido(self, path, firma=None):
+        """
+        Hash de un archivo si ya se calculó antes y no ha cambiado (sin leerlo).
+        firma=(tamano, mtime_ns) evita el stat si el descubrimiento ya lo hizo.
+        """
+        if firma is None:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return None
+            firma = (st.st_size, st.st_mtime_ns)
+        with self.lock:
+            fila = self.conn.execute(
+                "SELECT tamano, mtime, hash FROM firmas WHERE ruta = ?", (os.path.abspath(path),)).fetchone()
+        if fila and (fila[0], fila[1]) == tuple(firma):
+            return fila[2]
+        return None
+
+    def registrar_firma(self, path, hash_archivo):
+        st = os.stat(path)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO firmas VALUES (?, ?, ?, ?)",
+                (os.path.abspath(path), st.st_size, st.st_mtime_ns, hash_archivo))
+            self._tocar()
+
+    # --- Consultas ---
+    def _version(self, tabla, cerebro, clave):
+        with self.lock:
+            fila = self.conn.execute(
+                f"SELECT version FROM {tabla} WHERE cerebro = ? AND hash = ?", (cerebro, clave)).fetchone()
+        return fila[0] if fila else None
+
+    def _aprendido(self, tabla, cerebro, ia, clave):
+        version = self._version(tabla, cerebro, clave)
+        return version is not None and version <= getattr(ia, 'version', version)
+
+    def archivo_aprendido(self, cerebros, path, firma=None):
+        """True si todos los cerebros (ia, _, nombre) ya aprendieron este archivo"""
+        if self.politica == "off":
+            return False
+        clave = self.hash_conocido(path, firma)
+        if clave is None:
+            return False
+        return all(self._aprendido("archivos", nombre, ia, clave) for ia, _, nombre in cerebros)
+
+    def epocas(self, ia, nombre, clave, epocas):
+        """Épocas a aplicar a un bloque según la política (0 = saltar)"""
+        if self.politica == "off" or not self._aprendido("bloques", nombre, ia, clave):
+            return epocas
+        return 0 if self.politica == "skip" else 1
+
+    # --- Registro ---
+    def registrar_archivo(self, nombre, ia, clave):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO archivos VALUES (?, ?, ?, ?)",
+                (nombre, clave, getattr(ia, 'version', 0), time.time()))
+            self._tocar()
+
+    def registrar_bloque(self, nombre, ia, clave):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO bloques VALUES (?, ?, ?)",
+                (nombre, clave, getattr(ia, 'version', 0)))
+            self._tocar()
+
+    def _tocar(self):
+        # Agrupar escrituras: un commit cada 500 registros (o en commit() explícito)
+        self._pendientes += 1
+        if self._pendientes >= 500:
+            self.conn.commit()
+            self._pendientes = 0
+
+    def descartar_posteriores(self, cerebro, version):
+        """Borra lo registrado por `cerebro` en versiones posteriores a `version`; devuelve cuántas entradas"""
+        with self.lock:
+            borradas = 0
+            for tabla in ("archivos", "bloques"):
+                borradas += self.conn.execute(
+                    f"DELETE FROM {tabla} WHERE cerebro = ? AND version > ?", (cerebro, version)).rowcount
+            self.conn.commit()
+            self._pendientes = 0
+        return borradas
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+            self._pendientes = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
@@ -0,0 +1,121 @@
+"""
+Extracción paralela de texto de PDF
+Reparte rangos de páginas entre procesos (cada uno con su propio documento abierto)
+y entrega las páginas en orden a medida que llegan. El texto se cachea por hash del archivo.
+"""
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from core.content_cache import hash_archivo
+
+# Separador de páginas en la caché (los \f del texto extraído se sustituyen al escribir)
+SEPARADOR_PAGINA = "\f\n"
+CABECERA = "MAGI-PDF"
+
+
+def _abrir(path):
+    # Importación diferida: PyMuPDF solo se carga en los trabajos con PDF (y puede escribir
+    # avisos en stdout al importarse, que en la CLI con --json ya va redirigido)
+    import fitz
+    return fitz.open(path)
+
+
+def _extraer_rango(path, inicio, fin):
+    """Worker: abre su propio documento y extrae las páginas [inicio, fin)"""
+    doc = _abrir(path)
+    try:
+        return [doc.load_page(n).get_text() for n in range(inicio, fin)]
+    finally:
+        doc.close()
+
+
+def contar_paginas(path):
+    doc = _abrir(path)
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+def iter_pdf_pages(path, workers=None, paginas_por_tarea=8):
+    """
+    Genera (n_pagina, total_paginas, texto) en orden.
+    Mantiene como mucho 2 tareas por worker en vuelo para acotar la memoria.
+    """
+    total = contar_paginas(path)
+    if workers is None:
+        workers = max(1, min((os.cpu_count() or 2) - 1, total // paginas_por_tarea))
+
+    # Documentos pequeños: no compensa arrancar procesos
+    if workers <= 1 or total <= paginas_por_tarea:
+        for inicio in range(0, total, paginas_por_tarea):
+            fin = min(inicio + paginas_por_tarea, total)
+            for offset, texto in enumerate(_extraer_rango(path, inicio, fin)):
+                yield inicio + offset + 1, total, texto
+        return
+
+    rangos = deque((i, min(i + paginas_por_tarea, total)) for i in range(0, total, paginas_por_tarea))
+    # spawn y no fork: se arranca desde hilos del pipeline en un proceso con Qt/torch cargados,
+    # y un fork con otros hilos vivos puede heredar locks tomados y bloquearse
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto) as pool:
+        en_vuelo = deque()
+        try:
+            while rangos or en_vuelo:
+                while rangos and len(en_vuelo) < workers * 2:
+                    inicio, fin = rangos.popleft()
+                    en_vuelo.append((inicio, pool.submit(_extraer_rango, path, inicio, fin)))
+                inicio, futuro = en_vuelo.popleft()
+                for offset, texto in enumerate(futuro.result()):
+                    yield inicio + offset + 1, total, texto
+        finally:
+            for _, futuro in en_vuelo:
+                futuro.cancel()
+
+
+def _iter_cache(ruta):
+    """Lee páginas de la caché incrementalmente (una página en memoria a la vez)"""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        cabecera = f.readline().split()
+        total = int(cabecera[1]) if len(cabecera) > 1 else 0
+        n = 0
+        lineas = []
+        for linea in f:
+            if linea == SEPARADOR_PAGINA:
+                n += 1
+                yield n, total, "".join(lineas)
+                lineas = []
+            else:
+                lineas.append(linea)
+
+
+def iter_pdf_pages_cached(path, cache, workers=None, on_cache_hit=None):
+    """
+    Como iter_pdf_pages, pero consultando primero la caché de texto por hash de contenido.
+    Si no hay entrada, la extracción se escribe en la caché mientras se van entregando páginas.
+    """
+    clave = hash_archivo(path)
+    ruta = cache.get(clave)
+    if ruta:
+        if on_cache_hit:
+            on_cache_hit(ruta)
+        yield from _iter_cache(ruta)
+        return
+
+    with cache.writer(clave) as f:
+        cabecera_escrita = False
+        for n, total, texto in iter_pdf_pages(path, workers=workers):
+            if not cabecera_escrita:
+                f.write(f"{CABECERA} {total}\n")
+                cabecera_escrita = True
+            # Normalizar saltos para que el separador sea inequívoco
+            texto_cache = texto.replace("\f", " ")
+            if texto_cache and not texto_cache.endswith("\n"):
+                texto_cache += "\n"
+            f.write(texto_cache)
+            f.write(SEPARADOR_PAGINA)
+            yield n, total, texto
+        if not cabecera_escrita:
+            f.write(f"{CABECERA} 0\n")
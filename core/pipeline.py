@@ -0,0 +1,173 @@
+"""
+Pipeline de ingesta por etapas
+Cada etapa corre en su propio hilo y se comunica por colas acotadas (backpressure),
+de modo que lectura, decodificación y troceado se solapan con el entrenamiento.
+"""
+import queue
+import threading
+import time
+
+_FIN = object()
+
+
+class StageStats:
+    """Contadores de rendimiento de una etapa"""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.items = 0
+        self.caracteres = 0
+        self.ocupado = 0.0  # Segundos trabajando (sin contar esperas en colas)
+
+    def as_dict(self):
+        return {
+            'etapa': self.nombre,
+            'items': self.items,
+            'caracteres': self.caracteres,
+            'segundos': round(self.ocupado, 3),
+            'chars_s': int(self.caracteres / self.ocupado) if self.ocupado > 0 else 0
+        }
+
+
+def _medida_por_defecto(item):
+    """Caracteres de un item (solo si es str; pasar `medida` para items compuestos)"""
+    return len(item) if isinstance(item, str) else 0
+
+
+class IngestionPipeline:
+    """
+    Encadena una fuente y varias etapas en hilos conectados por colas acotadas.
+
+    - fuente: iterable consumido en el hilo lector
+    - etapas: lista de (nombre, funcion); funcion(item) devuelve un iterable de items.
+      Si la función tiene un método flush(), se llama al agotarse la entrada.
+    - El hilo que itera el pipeline es la etapa final (entrenamiento); el tiempo que
+      pasa fuera del iterador se contabiliza como trabajo de esa etapa.
+    """
+
+    def __init__(self, fuente, etapas=(), maxsize=8, stop_event=None,
+                 nombre_fuente="reader", nombre_consumidor="trainer", medida=None):
+        self.fuente = fuente
+        self.etapas = list(etapas)
+        self.maxsize = maxsize
+        self.stop_event = stop_event
+        self.medida = medida or _medida_por_defecto
+        self._parar = threading.Event()
+        self._error = None
+        self._hilos = []
+        self.stats = [StageStats(nombre_fuente)] + [StageStats(n) for n, _ in self.etapas] + [StageStats(nombre_consumidor)]
+
+    # --- Control de flujo ---
+    def _detenido(self):
+        return self._parar.is_set() or (self.stop_event is not None and self.stop_event.is_set())
+
+    def _put(self, cola, item):
+        """put bloqueante que respeta la parada (backpressure sin bloqueos eternos)"""
+        while True:
+            if self._detenido() and item is not _FIN:
+                return False
+            try:
+                cola.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if item is _FIN and self._detenido():
+                    return False
+
+    def _get(self, cola):
+        while True:
+            try:
+                return cola.get(timeout=0.1)
+            except queue.Empty:
+                if self._detenido():
+                    return _FIN
+
+    def _emitir(self, stats, iterable, salida):
+        """Vuelca un iterable en la cola midiendo solo el tiempo de producción"""
+        it = iter(iterable)
+        while not self._detenido():
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                stats.ocupado += time.perf_counter() - t0
+                return True
+            stats.ocupado += time.perf_counter() - t0
+            stats.items += 1
+            stats.caracteres += self.medida(item)
+            if not self._put(salida, item):
+                return False
+        return False
+
+    def _run_fuente(self, stats, salida):
+        try:
+            self._emitir(stats, self.fuente, salida)
+        except Exception as e:
+            self._error = self._error or e
+            self._parar.set()
+        finally:
+            # Al parar antes de tiempo, cerrar el generador fuente ejecuta sus finally
+            # (p. ej. cancelar transcripciones pendientes) en vez de dejarlo a medias
+            cerrar = getattr(self.fuente, 'close', None)
+            if cerrar is not None:
+                try:
+                    cerrar()
+                except Exception as e:
+                    self._error = self._error or e
+            self._put(salida, _FIN)
+
+    def _run_etapa(self, stats, funcion, entrada, salida):
+        try:
+            while True:
+                item = self._get(entrada)
+                if item is _FIN:
+                    break
+                if not self._emitir(stats, funcion(item), salida):
+                    break
+            if hasattr(funcion, 'flush') and not self._detenido():
+                self._emitir(stats, funcion.flush(), salida)
+        except Exception as e:
+            self._error = self._error or e
+            self._parar.set()
+        finally:
+            self._put(salida, _FIN)
+
+    # --- API pública ---
+    def __iter__(self):
+        colas = [queue.Queue(maxsize=self.maxsize) for _ in range(len(self.etapas) + 1)]
+        self._hilos = [threading.Thread(target=self._run_fuente, args=(self.stats[0], colas[0]), daemon=True)]
+        for i, (_, funcion) in enumerate(self.etapas):
+            self._hilos.append(threading.Thread(
+                target=self._run_etapa, args=(self.stats[i + 1], funcion, colas[i], colas[i + 1]), daemon=True))
+        for h in self._hilos:
+            h.start()
+
+        consumidor = self.stats[-1]
+        try:
+            while True:
+                item = self._get(colas[-1])
+                if item is _FIN:
+                    break
+                t0 = time.perf_counter()
+                yield item
+                consumidor.ocupado += time.perf_counter() - t0
+                consumidor.items += 1
+                consumidor.caracteres += self.medida(item)
+        finally:
+            self.close()
+
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """Detiene todas las etapas (p. ej. si el consumidor sale antes de tiempo)"""
+        self._parar.set()
+        for h in self._hilos:
+            h.join(timeout=1.0)
+
+    def stats_dict(self):
+        return [s.as_dict() for s in self.stats]
+
+    def resumen(self):
+        """Línea legible con el rendimiento de cada etapa"""
+        return " | ".join(
+            f"{s['etapa']}: {s['items']} items, {s['chars_s']:,} chars/s" for s in self.stats_dict())
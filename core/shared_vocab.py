@@ -0,0 +1,103 @@
+"""
+Vocabulario compartido entre MELCHOR, GASPAR y CASPER
+Alinea los vocabularios de los cerebros (mismo carácter → mismo índice en los tres) para que
+cada texto se tokenice una sola vez y los caracteres nuevos se añadan a la vez en todos
+"""
+import threading
+
+
+class BloqueTokenizado(str):
+    """Bloque de texto del pipeline que ya lleva sus índices en el vocabulario compartido"""
+
+    def __new__(cls, texto, indices, generacion):
+        bloque = super().__new__(cls, texto)
+        bloque.indices = indices
+        bloque.generacion = generacion
+        return bloque
+
+
+class VocabularioCompartido:
+    """
+    Registro de vocabulario para un conjunto de cerebros.
+    Los cerebros solo añaden caracteres al final, así que unos índices calculados antes de una
+    ampliación siguen siendo válidos; solo una re-alineación (permutación) los invalida, y eso
+    se detecta con `generacion`.
+    """
+
+    def __init__(self, cerebros):
+        self.cerebros = list(cerebros)
+        self.lock = threading.RLock()
+        self.generacion = 0
+        self._memo = (None, None)
+
+    def alinear(self):
+        """
+        Unifica los vocabularios: unión en orden de aparición (primero el del primer cerebro)
+        y permutación de los pesos de cada cerebro que no coincida. Devuelve cuántos se permutaron.
+        Invalida los índices calculados antes (nueva generación).
+        """
+        with self.lock:
+            orden = list(dict.fromkeys(c for ia in self.cerebros for c in ia.vocab))
+            permutados = 0
+            for ia in self.cerebros:
+                if ia.reordenar_vocabulario(orden):
+                    permutados += 1
+            self._memo = (None, None)
+            self.generacion += 1
+            return permutados
+
+    @property
+    def tokenizador(self):
+        # Con los vocabularios alineados, el tokenizador de cualquier cerebro vale para todos
+        return self.cerebros[0].tokenizador
+
+    def alineado(self):
+        # Las ampliaciones pasan por aquí; si alguien amplió un cerebro por su cuenta, el vocabulario difiere
+        vocab = self.cerebros[0].vocab
+        return all(ia.vocab == vocab for ia in self.cerebros[1:])
+
+    def ampliar(self, chars):
+        """Añade caracteres nuevos a todos los cerebros a la vez (mismo índice en todos)"""
+        with self.lock:
+            for ia in self.cerebros:
+                ia.expandir_vocabulario(chars)
+
+    def tokenizar(self, texto):
+        """
+        Índices del texto en el vocabulario compartido, ampliando todos los cerebros si trae
+        caracteres nuevos. El último resultado se memoriza (puntuación cruzada entre cerebros).
+        """
+        with self.lock:
+            if self._memo[0] is not None and self._memo[0] == texto:
+                return self._memo[1]
+            if not self.alineado():
+                self.alinear()
+            nuevos = self.tokenizador.desconocidos(texto)
+            if nuevos:
+                self.ampliar(nuevos)
+            indices = self.tokenizador.codificar(texto)
+            self._memo = (str(texto), indices)
+            return indices
+
+    def indices_de(self, texto):
+        """Índices de un texto, reutilizando los de un BloqueTokenizado si siguen siendo válidos"""
+        if isinstance(texto, BloqueTokenizado) and texto.generacion == self.generacion:
+            return texto.indices
+        return self.tokenizar(texto)
+
+    def bloque(self, texto):
+        with self.lock:
+            return BloqueTokenizado(texto, self.tokenizar(texto), self.generacion)
+
+
+class TokenizerStage:
+    """Etapa del pipeline: tokeniza los bloques en su propio hilo mientras los cerebros entrenan"""
+
+    def __init__(self, vocabulario):
+        self.vocabulario = vocabulario
+
+    def __call__(self, item):
+        if item[0] == 'bloque':
+            yield (item[0], item[1], self.vocabulario.bloque(item[2]), item[3])
+        else:
+            yield item
@@ -11,6 +11,7 @@ class IAWorkerSignals(QObject):
     voto_magi = Signal(str, bool)  # nombre_cerebro, voto
     error_ocurrido = Signal(str)
     entrenamiento_terminado = Signal()
+    entrenamiento_detenido = Signal()  # Trabajo interrumpido con stop_event (no llegó al final)
     cerebro_expandido = Signal(str, int)  # nombre, neuronas
     progreso_entrenamiento = Signal(int)  # porcentaje
     texto_transcrito = Signal(str)  # Para cargar en el massive_input
@@ -0,0 +1,334 @@
+"""
+Lectura en streaming de corpus de texto
+Genera bloques alineados a párrafos con memoria acotada y progreso en bytes
+"""
+import codecs
+import hashlib
+import os
+
+from core.archives import es_comprimido, iter_lineas_comprimidas
+from core.content_cache import hash_archivo
+
+# Tamaño del buffer de lectura y longitud máxima de una línea antes de partirla
+READ_SIZE = 1 << 20
+MAX_LINEA = 1 << 16
+
+
+def iter_lines(path, inicio=0, max_linea=MAX_LINEA, hasher=None):
+    """
+    Lee un archivo en binario línea a línea.
+    Genera (linea, offset) donde offset son los bytes consumidos desde el inicio del archivo.
+    Con hasher (p.ej. hashlib.sha256()), se actualiza con los bytes leídos sin una segunda pasada.
+    Los comprimidos (.gz, .zip, .tar...) se descomprimen al vuelo; su offset es la posición
+    en el archivo comprimido, así que no admiten `inicio` ni `hasher`.
+    """
+    lector = LectorLineas()
+    if es_comprimido(path):
+        for raw, offset in iter_lineas_comprimidas(path, max_linea):
+            for linea, _ in lector.feed(raw):
+                yield linea, offset
+        return
+    
+    with open(path, 'rb', buffering=READ_SIZE) as f:
+        if inicio:
+            f.seek(inicio)
+        offset = inicio
+        while True:
+            raw = f.readline(max_linea)
+            if not raw:
+                break
+            if hasher is not None:
+                hasher.update(raw)
+            for linea, fin in lector.feed(raw):
+                yield linea, offset + fin
+            offset += len(raw)
+
+
+class LectorLineas:
+    """
+    Decodifica UTF-8 por trozos de bytes y los parte en líneas.
+    Un carácter multibyte partido entre dos lecturas (corte de max_linea) se completa con la
+    siguiente en vez de perderse; los bytes inválidos se sustituyen por U+FFFD.
+    '\r\n', '\n' y '\r' terminan línea (saltos universales) y se entregan como '\n'.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._tras_cr = False
+
+    def feed(self, raw):
+        """Genera (linea, bytes de raw consumidos hasta el final de la línea)"""
+        inicio = 0
+        if self._tras_cr and raw[:1] == b'\n':
+            # '\r\n' partido entre dos lecturas: el '\r' ya cerró la línea
+            inicio = 1
+        self._tras_cr = False
+        while inicio < len(raw):
+            # '\r' nunca forma parte de un carácter multibyte, así que se puede buscar en bytes
+            fin = raw.find(b'\r', inicio)
+            if fin == -1:
+                fin = len(raw)
+            else:
+                fin += 1
+                if raw[fin:fin + 1] == b'\n':
+                    fin += 1
+                elif fin == len(raw):
+                    self._tras_cr = True
+            linea = self._decoder.decode(raw[inicio:fin])
+            if linea:
+                yield linea.replace('\r\n', '\n').replace('\r', '\n'), fin
+            inicio = fin
+
+
+class ParagraphChunker:
+    """
+    Agrupa líneas en párrafos (separados por líneas vacías) y párrafos en bloques de ~chunk_size.
+    Cada bloque va acompañado del offset en bytes donde termina su último párrafo.
+    """
+
+    def __init__(self, chunk_size=1000, separador=" "):
+        self.chunk_size = chunk_size
+        self.separador = separador
+        # Párrafo en construcción
+        self._lineas = []
+        self._len_parrafo = 0
+        self._offset_parrafo = 0
+        # Bloque en construcción
+        self._partes = []
+        self._len_bloque = 0
+        self._offset_bloque = 0
+
+    def feed(self, linea, offset):
+        """Añade una línea; genera los bloques que quedan completos"""
+        if linea == '\n':
+            yield from self._cerrar_parrafo()
+            return
+
+        self._lineas.append(linea)
+        self._len_parrafo += len(linea)
+        self._offset_parrafo = offset
+
+        # Párrafos gigantes (sin líneas vacías) se parten para acotar memoria
+        if self._len_parrafo >= self.chunk_size:
+            yield from self._cerrar_parrafo()
+
+    def flush(self):
+        """Cierra el párrafo y el bloque pendientes"""
+        yield from self._cerrar_parrafo()
+        if self._partes:
+            yield self._emitir()
+
+    def _cerrar_parrafo(self):
+        if not self._lineas:
+            return
+        parrafo = "".join(self._lineas).strip()
+        offset = self._offset_parrafo
+        self._lineas = []
+        self._len_parrafo = 0
+        if not parrafo:
+            return
+
+        if self._len_bloque + len(parrafo) < self.chunk_size:
+            if self._partes:
+                self._len_bloque += len(self.separador)
+            self._partes.append(parrafo)
+            self._len_bloque += len(parrafo)
+        else:
+            if self._partes:
+                yield self._emitir()
+            self._partes = [parrafo]
+            self._len_bloque = len(parrafo)
+        self._offset_bloque = offset
+
+    def _emitir(self):
+        bloque = self.separador.join(self._partes)
+        self._partes = []
+        self._len_bloque = 0
+        return bloque, self._offset_bloque
+
+
+def iter_paragraph_blocks(path, chunk_size=1000, separador=" ", inicio=0):
+    """
+    Genera (bloque, bytes_leidos) de un archivo de texto sin cargarlo entero en memoria.
+    bytes_leidos sirve para el progreso (contra os.path.getsize) y para reanudar con `inicio`.
+    """
+    chunker = ParagraphChunker(chunk_size=chunk_size, separador=separador)
+    for linea, offset in iter_lines(path, inicio=inicio):
+        yield from chunker.feed(linea, offset)
+    yield from chunker.flush()
+
+
+def file_size(path):
+    """Tamaño en bytes (mínimo 1 para usarlo como divisor de progreso)"""
+    try:
+        return max(1, os.path.getsize(path))
+    except OSError:
+        return 1
+
+
+# --- Etapas para el pipeline de ingesta (core.pipeline) ---
+# Items: ('archivo', path, None, inicio), ('lineas', path, [(linea, offset), ...], offset),
+#        ('bloque', path, bloque, offset), ('fin', path, sha256 | None, offset), ('error', path, mensaje, 0)
+
+def iter_line_batches(paths, batch_bytes=READ_SIZE, hashear=False, inicios=None):
+    """
+    Fuente del pipeline: lee cada archivo y emite lotes de líneas de ~batch_bytes.
+    Con hashear, el item 'fin' lleva el SHA-256 del contenido (mismo que content_cache.hash_archivo).
+    inicios ({path: offset}) permite reanudar archivos a mitad; esos no llevan hash.
+    Los comprimidos siempre se leen desde el principio.
+    """
+    inicios = inicios or {}
+    for path in paths:
+        comprimido = es_comprimido(path)
+        inicio = 0 if comprimido else inicios.get(path, 0)
+        yield ('archivo', path, None, inicio)
+        offset = inicio
+        hasher = hashlib.sha256() if hashear and not inicio and not comprimido else None
+        try:
+            lote = []
+            tam_lote = 0
+            for linea, offset in iter_lines(path, inicio=inicio, hasher=hasher):
+                lote.append((linea, offset))
+                tam_lote += len(linea)
+                if tam_lote >= batch_bytes:
+                    yield ('lineas', path, lote, offset)
+                    lote = []
+                    tam_lote = 0
+            if lote:
+                yield ('lineas', path, lote, offset)
+        except Exception as e:
+            yield ('error', path, str(e), offset)
+            continue
+        if hasher:
+            clave = hasher.hexdigest()
+        elif hashear and comprimido:
+            clave = hash_archivo(path)
+        else:
+            clave = None
+        yield ('fin', path, clave, offset)
+
+
+def iter_stream_batches(stream, nombre="<stdin>", batch_bytes=READ_SIZE):
+    """Fuente del pipeline para un flujo binario (p.ej. sys.stdin.buffer), con los mismos items"""
+    yield ('archivo', nombre, None, 0)
+    offset = 0
+    try:
+        lote = []
+        tam_lote = 0
+        lector = LectorLineas()
+        for raw in iter(lambda: stream.readline(MAX_LINEA), b''):
+            for linea, fin in lector.feed(raw):
+                lote.append((linea, offset + fin))
+                tam_lote += len(linea)
+            offset += len(raw)
+            if tam_lote >= batch_bytes:
+                yield ('lineas', nombre, lote, offset)
+                lote = []
+                tam_lote = 0
+        if lote:
+            yield ('lineas', nombre, lote, offset)
+    except Exception as e:
+        yield ('error', nombre, str(e), offset)
+        return
+    yield ('fin', nombre, None, offset)
+
+
+class ChunkerStage:
+    """Etapa de limpieza/troceado: convierte lotes de líneas en bloques por archivo"""
+
+    def __init__(self, chunk_size=1000, separador=" "):
+        self.chunk_size = chunk_size
+        self.separador = separador
+        self._chunker = None
+
+    def __call__(self, item):
+        tipo, path = item[0], item[1]
+        if tipo == 'archivo':
+            self._chunker = ParagraphChunker(self.chunk_size, self.separador)
+            yield item
+        elif tipo == 'lineas':
+            for linea, offset in item[2]:
+                for bloque, fin in self._chunker.feed(linea, offset):
+                    yield ('bloque', path, bloque, fin)
+        elif tipo == 'fin':
+            for bloque, fin in self._chunker.flush():
+                yield ('bloque', path, bloque, fin)
+            self._chunker = None
+            yield item
+        else:
+            yield item
+
+
+def medida_item(item):
+    """Caracteres que transporta un item del pipeline de texto"""
+    tipo, payload = item[0], item[2]
+    if tipo in ('bloque', 'pagina', 'segmento'):
+        return len(payload)
+    if tipo == 'lineas':
+        return sum(len(linea) for linea, _ in payload)
+    return 0
+
+
+class SentenceChunkerStage:
+    """
+    Etapa de limpieza para texto extraído (PDF): descarta líneas cortas (ruido)
+    y agrupa líneas hasta un final de frase. Items de entrada: ('pagina', path, texto, n).
+    """
+
+    def __init__(self, min_linea=10):
+        self.min_linea = min_linea
+        self._actual = []
+        self._path = None
+        self._pagina = 0
+
+    def __call__(self, item):
+        tipo, path, texto, pagina = item
+        if tipo != 'pagina':
+            yield item
+            return
+        self._path = path
+        self._pagina = pagina
+        for linea in texto.split('\n'):
+            linea = linea.strip()
+            if len(linea) <= self.min_linea:
+                continue
+            self._actual.append(linea)
+            # Si la línea termina con punto, crear un bloque
+            if linea.endswith('.') or linea.endswith('!') or linea.endswith('?'):
+                yield ('bloque', path, ' '.join(self._actual), pagina)
+                self._actual = []
+
+    def flush(self):
+        # Último bloque sin final de frase
+        if self._actual:
+            yield ('bloque', self._path, ' '.join(self._actual), self._pagina)
+            self._actual = []
+
+
+class SegmentChunkerStage:
+    """
+    Etapa de troceado para transcripciones en streaming.
+    Acumula ('segmento', path, texto, n) y emite bloques de chunk_size en cuanto se completan;
+    ('fin', path, None, n) vacía el resto del archivo.
+    """
+
+    def __init__(self, chunk_size=2000):
+        self.chunk_size = chunk_size
+        self._buffer = ""
+
+    def __call__(self, item):
+        tipo, path, texto, n = item
+        if tipo == 'segmento':
+            self._buffer += texto
+            while len(self._buffer) >= self.chunk_size:
+                yield ('bloque', path, self._buffer[:self.chunk_size], n)
+                self._buffer = self._buffer[self.chunk_size:]
+        elif tipo == 'fin':
+            resto = self._buffer.strip()
+            self._buffer = ""
+            if len(resto) >= 2:
+                yield ('bloque', path, resto, n)
+            yield item
+        else:
+            yield item
+
@@ -0,0 +1,176 @@
+"""
+Corpus pre-tokenizado en disco
+Un archivo .magitok guarda una cabecera JSON (vocabulario, dtype, nº de tokens, fuentes) seguida del
+array de tokens uint16/uint32. Se tokeniza una sola vez y en entrenamiento se abre con np.memmap:
+todas las épocas y los tres cerebros leen el mismo flujo de tokens sin copiarlo.
+"""
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from chat_interactivo import TokenizadorCaracteres
+from core.archives import es_comprimido
+from core.content_cache import hash_archivo
+from core.text_stream import iter_lines
+
+MAGIC = b"MAGITOK1"
+EXTENSION = ".magitok"
+# Los tokens empiezan alineados para que el memmap sea eficiente
+ALINEACION = 64
+# Caracteres acumulados antes de tokenizar y volcar a disco
+LOTE_CARACTERES = 1 << 20
+
+
+def _escribir_cabecera(f, cabecera):
+    datos = json.dumps(cabecera, ensure_ascii=False).encode('utf-8')
+    inicio = len(MAGIC) + 8 + len(datos)
+    relleno = (-inicio) % ALINEACION
+    f.write(MAGIC)
+    f.write(struct.pack('<Q', len(datos) + relleno))
+    f.write(datos + b" " * relleno)
+
+
+def construir_corpus(archivos, destino, separador="\n\n", stop_event=None, on_archivo=None):
+    """
+    Tokeniza los archivos (texto plano o comprimido) en un único corpus .magitok.
+    Los tokens se vuelcan primero como uint32 a un temporal y al final se compactan a uint16
+    si el vocabulario cabe. Devuelve la cabecera escrita o None si se detuvo.
+    """
+    # Vocabulario por orden de aparición en el corpus
+    tokenizador = TokenizadorCaracteres()
+    fuentes = []
+    n_tokens = 0
+    directorio = os.path.dirname(os.path.abspath(destino))
+    fd, tmp_tokens = tempfile.mkstemp(dir=directorio, suffix=".tok.tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f_tokens:
+            def volcar(partes):
+                nonlocal n_tokens
+                tokens = tokenizador.codificar("".join(partes), ampliar=True).astype(np.uint32)
+                tokens.tofile(f_tokens)
+                n_tokens += len(tokens)
+
+            for i, archivo in enumerate(archivos):
+                if stop_event and stop_event.is_set():
+                    return None
+                if on_archivo:
+                    on_archivo(i, archivo)
+                inicio = n_tokens
+                partes = [separador] if fuentes else []
+                pendientes = len(separador) if fuentes else 0
+                for linea, _ in iter_lines(archivo):
+                    partes.append(linea)
+                    pendientes += len(linea)
+                    if pendientes >= LOTE_CARACTERES:
+                        volcar(partes)
+                        partes, pendientes = [], 0
+                if partes:
+                    volcar(partes)
+                fuentes.append({
+                    "ruta": os.path.abspath(archivo),
+                    "sha256": None if es_comprimido(archivo) else hash_archivo(archivo),
+                    "inicio": inicio,
+                    "tokens": n_tokens - inicio
+                })
+
+        dtype = np.uint16 if len(tokenizador) <= np.iinfo(np.uint16).max else np.uint32
+        cabecera = {
+            "formato": 1,
+            "vocab": "".join(tokenizador.chars),
+            "dtype": np.dtype(dtype).name,
+            "n_tokens": n_tokens,
+            "fuentes": fuentes
+        }
+        fd, tmp_destino = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                _escribir_cabecera(f, cabecera)
+                if n_tokens:
+                    origen = np.memmap(tmp_tokens, dtype=np.uint32, mode='r', shape=(n_tokens,))
+                    for i in range(0, n_tokens, LOTE_CARACTERES):
+                        origen[i:i + LOTE_CARACTERES].astype(dtype).tofile(f)
+                    del origen
+            os.replace(tmp_destino, destino)
+        except BaseException:
+            try:
+                os.remove(tmp_destino)
+            except OSError:
+                pass
+            raise
+        return cabecera
+    finally:
+        try:
+            os.remove(tmp_tokens)
+        except OSError:
+            pass
+
+
+class TokenCorpus:
+    """Corpus .magitok abierto en modo memmap (solo lectura)"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{os.path.basename(path)} no es un corpus {EXTENSION}")
+            (longitud,) = struct.unpack('<Q', f.read(8))
+            self.cabecera = json.loads(f.read(longitud).decode('utf-8'))
+        self.vocab = list(self.cabecera["vocab"])
+        self.tokenizador = TokenizadorCaracteres(self.vocab)
+        self.fuentes = self.cabecera.get("fuentes", [])
+        offset = len(MAGIC) + 8 + longitud
+        n_tokens = self.cabecera["n_tokens"]
+        if n_tokens:
+            self.tokens = np.memmap(path, dtype=self.cabecera["dtype"], mode='r', offset=offset, shape=(n_tokens,))
+        else:
+            self.tokens = np.zeros(0, dtype=self.cabecera["dtype"])
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def lut_para(self, tokenizador, ampliar):
+        """
+        Tabla id del corpus → id del cerebro (o del vocabulario compartido).
+        Antes amplía el vocabulario con `ampliar` (p.ej. ia.expandir_vocabulario) con los caracteres
+        que no conozca. Cada carácter se normaliza por separado; si se descompone en varios, cuenta el primero.
+        """
+        chars = "".join((tokenizador.normalizar(c) or c)[0] for c in self.vocab)
+        desconocidos = tokenizador.desconocidos(chars, normalizar=False)
+        if desconocidos:
+            ampliar(desconocidos)
+        lut = tokenizador.codificar(chars, normalizar=False)
+        if len(lut) != len(self.vocab):
+            raise ValueError("el vocabulario del cerebro está lleno y no tiene cubo OOV")
+        return lut
+
+    def n_ventanas(self, longitud):
+        """Ventanas del recorrido secuencial (consecutivas comparten un token para no perder la transición)"""
+        paso = max(1, longitud - 1)
+        return max(0, -(-(len(self) - 1) // paso))
+
+    def ventanas(self, longitud, modo="secuencial", n=None, semilla=None, desde=0):
+        """
+        Genera (posicion, ventana) con vistas de hasta `longitud` tokens sobre el memmap.
+        modo "secuencial": recorre el corpus desde la ventana `desde`;
+        modo "aleatorio": `n` ventanas con inicio uniforme (por defecto tantas como el secuencial).
+        """
+        total = len(self)
+        if total < 2:
+            return
+        longitud = max(2, longitud)
+        if modo == "aleatorio":
+            rng = np.random.default_rng(semilla)
+            n = self.n_ventanas(longitud) if n is None else n
+            maximo = max(1, total - longitud + 1)
+            for posicion in rng.integers(0, maximo, size=n).tolist():
+                yield posicion, self.tokens[posicion:posicion + longitud]
+            return
+        paso = longitud - 1
+        for posicion in range(desde * paso, total - 1, paso):
+            yield posicion, self.tokens[posicion:posicion + longitud]
+
+    def decodificar(self, tokens):
+        return self.tokenizador.decodificar(tokens)
@@ -0,0 +1,434 @@
+"""
+Servicio de transcripción Whisper
+Mantiene el modelo cargado una sola vez por proceso y atiende trabajos desde una cola,
+para no pagar la carga y el calentamiento del modelo en cada archivo.
+Los segmentos pueden entregarse en streaming a medida que se decodifican.
+"""
+import json
+import multiprocessing
+import os
+import queue
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+SAMPLE_RATE = 16000
+# Audio decodificado por llamada a Whisper: acota la memoria y fija el tiempo hasta el primer segmento
+VENTANA_SEGUNDOS = 60.0
+
+_modelos = {}
+_lock_modelos = threading.Lock()
+
+
+def elegir_device(device=None):
+    """MPS si está disponible, si no CPU"""
+    if device:
+        return device
+    import torch
+    return "mps" if torch.backends.mps.is_available() else "cpu"
+
+
+def cargar_modelo(tamano="base", device=None, hilos_cpu=None):
+    """
+    Devuelve el modelo Whisper de este proceso, cargándolo solo la primera vez.
+    hilos_cpu (None = no tocar) fija torch.set_num_threads al cargarlo: es un ajuste de TODO el
+    proceso, así que también limita el entrenamiento y la inferencia que corran en él.
+    """
+    import whisper
+
+    device = elegir_device(device)
+    with _lock_modelos:
+        clave = (tamano, device)
+        if clave not in _modelos:
+            if hilos_cpu:
+                import torch
+                torch.set_num_threads(hilos_cpu)
+            _modelos[clave] = whisper.load_model(tamano, device=device).float()
+        return _modelos[clave]
+
+
+def iter_audio(path, ventana_s=VENTANA_SEGUNDOS):
+    """
+    Decodifica el audio con ffmpeg por ventanas (mono 16 kHz float32) sin cargar el archivo entero.
+    Genera (segundo_inicio, audio).
+    """
+    import numpy as np
+
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-threads", "0", "-i", path,
+           "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE), "-"]
+    # stderr a un archivo temporal: un pipe que nadie lee mientras se consume stdout se llena
+    # con medios corruptos o verbosos y bloquea a ffmpeg y a este proceso
+    with tempfile.TemporaryFile() as errores:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errores)
+        bytes_ventana = int(ventana_s * SAMPLE_RATE) * 2
+        inicio = 0.0
+        try:
+            while True:
+                datos = proc.stdout.read(bytes_ventana)
+                if not datos:
+                    break
+                datos = datos[:len(datos) // 2 * 2]
+                audio = np.frombuffer(datos, np.int16).astype(np.float32) / 32768.0
+                yield inicio, audio
+                inicio += len(audio) / SAMPLE_RATE
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+        errores.seek(0)
+        error = errores.read().decode('utf-8', errors='replace').strip()[-2000:]
+    # Un fallo a mitad de archivo también cuenta: si no, la transcripción quedaría cortada sin aviso
+    if proc.returncode != 0 or (inicio == 0.0 and error):
+        raise RuntimeError(f"ffmpeg (en {inicio:.0f}s): {error or f'código de salida {proc.returncode}'}")
+
+
+def duracion_audio(path):
+    """Duración en segundos vía ffprobe (None si no se puede determinar)"""
+    try:
+        salida = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            capture_output=True, text=True, timeout=30)
+        return float(salida.stdout.strip())
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+def iter_segmentos(modelo, path, idioma="es", ventana_s=VENTANA_SEGUNDOS):
+    """
+    Transcribe por ventanas y genera segmentos {'start', 'end', 'text'} con tiempos absolutos.
+    El final de cada ventana se pasa como prompt a la siguiente para mantener la continuidad.
+    """
+    prompt = None
+    for inicio, audio in iter_audio(path, ventana_s):
+        resultado = modelo.transcribe(audio, verbose=None, language=idioma, fp16=False, initial_prompt=prompt)
+        for seg in resultado.get('segments', []):
+            yield {'start': inicio + seg['start'], 'end': inicio + seg['end'], 'text': seg['text']}
+        if resultado['text'].strip():
+            prompt = resultado['text'][-200:]
+
+
+class SegmentStream:
+    """
+    Iterador de segmentos producido por otro hilo o proceso.
+    El productor pone dicts de segmento, {'error': msg} si falla y None al terminar,
+    y consulta `cancelado` entre segmentos para dejar de transcribir lo que nadie va a leer.
+    """
+
+    def __init__(self, cola=None, futuro=None, cancelado=None):
+        self.cola = cola if cola is not None else queue.Queue()
+        self.futuro = futuro  # Si el productor muere sin cerrar la cola, el futuro lo delata
+        self.cancelado = cancelado if cancelado is not None else threading.Event()
+
+    def cancelar(self):
+        """Pide al productor que pare en el siguiente segmento (o que no empiece)"""
+        if self.futuro is not None:
+            self.futuro.cancel()
+        try:
+            self.cancelado.set()
+        except (OSError, EOFError):  # Event de un Manager ya cerrado: el productor murió con él
+            pass
+
+    def __iter__(self):
+        try:
+            while True:
+                try:
+                    item = self.cola.get(timeout=0.5)
+                except queue.Empty:
+                    if self.futuro is not None and self.futuro.done():
+                        error = self.futuro.exception()
+                        if error is not None:
+                            raise error
+                        if self.cola.empty():
+                            return
+                    continue
+                if item is None:
+                    return
+                if 'error' in item:
+                    raise RuntimeError(item['error'])
+                yield item
+        finally:
+            # Terminado, fallido o abandonado por el consumidor: el productor ya no tiene a quién entregar
+            self.cancelar()
+
+
+def _producir_segmentos(modelo, path, idioma, cola, cancelado=None):
+    segmentos = iter_segmentos(modelo, path, idioma)
+    try:
+        for seg in segmentos:
+            if cancelado is not None and cancelado.is_set():
+                break
+            cola.put(seg)
+        cola.put(None)
+    except Exception as e:
+        cola.put({'error': str(e)})
+    finally:
+        # Cierra iter_audio (y mata ffmpeg) también cuando se cancela a mitad
+        segmentos.close()
+
+
+class TranscriptionWorker:
+    """
+    Hilo de larga duración con un modelo Whisper caliente.
+    submit() encola un archivo y devuelve un Future con el resultado de model.transcribe;
+    submit_stream() devuelve un SegmentStream que entrega segmentos según se decodifican.
+    El modelo se carga de forma perezosa con el primer trabajo.
+    Comparte los hilos de torch del proceso; hilos_cpu los fija al cargar el modelo (ver cargar_modelo:
+    afecta a todo el proceso, por eso por defecto no se tocan).
+    """
+
+    def __init__(self, tamano="base", device=None, hilos_cpu=None, idioma="es"):
+        self.tamano = tamano
+        self.device = device
+        self.hilos_cpu = hilos_cpu
+        self.idioma = idioma
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._run, daemon=True)
+        self._hilo.start()
+
+    def submit(self, path, idioma=None):
+        """Encola un archivo de audio/video para transcribir"""
+        futuro = Future()
+        self._cola.put(('completo', path, idioma or self.idioma, futuro))
+        return futuro
+
+    def submit_stream(self, path, idioma=None):
+        """Encola un archivo y devuelve sus segmentos en streaming"""
+        stream = SegmentStream()
+        self._cola.put(('stream', path, idioma or self.idioma, stream))
+        return stream
+
+    def transcribe(self, path, idioma=None):
+        """Versión bloqueante de submit()"""
+        return self.submit(path, idioma).result()
+
+    def modelo(self):
+        """Modelo cargado (lo carga si aún no existe)"""
+        return cargar_modelo(self.tamano, self.device, self.hilos_cpu)
+
+    def stop(self):
+        self._cola.put(None)
+
+    def _run(self):
+        while True:
+            trabajo = self._cola.get()
+            if trabajo is None:
+                break
+            tipo, path, idioma, destino = trabajo
+            if tipo == 'stream':
+                if destino.cancelado.is_set():
+                    continue
+                try:
+                    modelo = self.modelo()
+                except Exception as e:
+                    destino.cola.put({'error': str(e)})
+                    continue
+                _producir_segmentos(modelo, path, idioma, destino.cola, destino.cancelado)
+                continue
+            
+            futuro = destino
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                resultado = self.modelo().transcribe(path, verbose=False, language=idioma, fp16=False)
+                futuro.set_result(resultado)
+            except Exception as e:
+                futuro.set_exception(e)
+
+
+def iter_transcripciones(worker, paths, ventana=2, stream=False):
+    """
+    Envía archivos al worker con `ventana` trabajos por delante del consumidor
+    y genera (idx, path, resultado) en orden. Con stream=True el resultado es un
+    SegmentStream que se entrega sin esperar a que termine la transcripción.
+    paths puede ser un iterable perezoso (p.ej. el descubrimiento de la carpeta): solo se
+    consumen `ventana` rutas por delante.
+    Al cerrar el generador (consumidor que para o trabajo abortado) se cancelan los pendientes.
+    """
+    pendientes = deque()
+    rutas = enumerate(paths)
+    agotado = False
+    enviar = worker.submit_stream if stream else worker.submit
+    entregado = None
+    try:
+        while True:
+            while not agotado and len(pendientes) < ventana:
+                siguiente = next(rutas, None)
+                if siguiente is None:
+                    agotado = True
+                else:
+                    idx, path = siguiente
+                    pendientes.append((idx, path, enviar(path)))
+            if not pendientes:
+                break
+            idx, path, entregado = pendientes.popleft()
+            yield idx, path, (entregado if stream else entregado.result())
+    finally:
+        if stream:
+            # También el que se estaba leyendo; cancelar uno ya terminado no hace nada
+            for trabajo in [entregado] + [t for _, _, t in pendientes]:
+                if hasattr(trabajo, 'cancelar'):
+                    trabajo.cancelar()
+        else:
+            for _, _, futuro in pendientes:
+                futuro.cancel()
+
+
+# --- Pool de procesos CPU (transcripción concurrente con el entrenamiento) ---
+_config_proceso = None
+
+
+def _init_proceso(tamano, hilos):
+    """Inicializador de cada proceso del pool: fija sus hilos, carga el modelo una vez y lo deja caliente"""
+    global _config_proceso
+    _config_proceso = tamano
+    # El proceso es solo del transcriptor: aquí fijar los hilos de torch no afecta a nadie más
+    cargar_modelo(tamano, "cpu", hilos)
+
+
+def _transcribir_en_proceso(path, idioma):
+    resultado = cargar_modelo(_config_proceso, "cpu").transcribe(path, verbose=False, language=idioma, fp16=False)
+    # Solo el texto cruza la frontera entre procesos
+    return {'text': resultado['text']}
+
+
+def _stream_en_proceso(path, idioma, cola, cancelado):
+    if cancelado.is_set():
+        return
+    _producir_segmentos(cargar_modelo(_config_proceso, "cpu"), path, idioma, cola, cancelado)
+
+
+def repartir_hilos(procesos=None, nucleos=None):
+    """
+    Reparte los núcleos entre transcripción y entrenamiento (mitad y mitad).
+    Devuelve (procesos, hilos_por_proceso, hilos_entrenamiento).
+    """
+    nucleos = nucleos or os.cpu_count() or 2
+    if not procesos:
+        procesos = max(1, min(4, nucleos // 4))
+    hilos_por_proceso = max(1, (nucleos // 2) // procesos)
+    hilos_entrenamiento = max(1, nucleos - procesos * hilos_por_proceso)
+    return procesos, hilos_por_proceso, hilos_entrenamiento
+
+
+class TranscriptionPool:
+    """
+    Pool acotado de procesos CPU, cada uno con su modelo Whisper cargado.
+    Misma interfaz submit() que TranscriptionWorker, así que sirve para iter_transcripciones.
+    """
+
+    def __init__(self, tamano="base", idioma="es", procesos=None, hilos_por_proceso=None):
+        self.tamano = tamano
+        self.idioma = idioma
+        self.procesos, hilos_auto, self.hilos_entrenamiento = repartir_hilos(procesos)
+        self.hilos_por_proceso = hilos_por_proceso or hilos_auto
+        # spawn y no fork: el pool se crea desde hilos de un proceso con Qt/torch/OpenMP cargados,
+        # y un fork con otros hilos vivos puede heredar locks tomados y bloquearse
+        self._contexto = multiprocessing.get_context("spawn")
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.procesos,
+            mp_context=self._contexto,
+            initializer=_init_proceso,
+            initargs=(self.tamano, self.hilos_por_proceso)
+        )
+        self._manager = None
+
+    def submit(self, path, idioma=None):
+        return self._pool.submit(_transcribir_en_proceso, path, idioma or self.idioma)
+
+    def submit_stream(self, path, idioma=None):
+        """Los segmentos viajan desde el proceso por una cola gestionada (y la cancelación por un Event)"""
+        if self._manager is None:
+            self._manager = self._contexto.Manager()
+        cola = self._manager.Queue()
+        cancelado = self._manager.Event()
+        futuro = self._pool.submit(_stream_en_proceso, path, idioma or self.idioma, cola, cancelado)
+        return SegmentStream(cola=cola, futuro=futuro, cancelado=cancelado)
+
+    def close(self):
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+        try:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        except TypeError:  # Python < 3.9
+            self._pool.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# --- Caché de transcripciones (hash del contenido + modelo + idioma) ---
+def _iter_segmentos_cache(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            if linea.strip():
+                yield json.loads(linea)
+
+
+class _SegmentosGuardados:
+    """Entrega los segmentos de un SegmentStream y los va escribiendo en la caché (solo se publica si termina)"""
+
+    def __init__(self, stream, cache, clave):
+        self.stream = stream
+        self.cache = cache
+        self.clave = clave
+
+    def cancelar(self):
+        self.stream.cancelar()
+
+    def __iter__(self):
+        with self.cache.writer(self.clave) as f:
+            for seg in self.stream:
+                f.write(json.dumps(seg, ensure_ascii=False) + "\n")
+                yield seg
+
+
+class CachedTranscriber:
+    """
+    Envuelve un TranscriptionWorker/TranscriptionPool consultando antes la caché.
+    Las transcripciones se guardan como JSONL de segmentos bajo la clave
+    sha256(medio)-modelo-idioma, así que cambiar de modelo o idioma no reutiliza resultados.
+    """
+
+    def __init__(self, transcriptor, cache, tamano, idioma, on_cache_hit=None):
+        self.transcriptor = transcriptor
+        self.cache = cache
+        self.tamano = tamano
+        self.idioma = idioma
+        self.on_cache_hit = on_cache_hit
+
+    def clave(self, path, idioma=None):
+        from core.content_cache import hash_archivo
+        return f"{hash_archivo(path)}-{self.tamano}-{idioma or self.idioma}"
+
+    def submit_stream(self, path, idioma=None):
+        clave = self.clave(path, idioma)
+        ruta = self.cache.get(clave)
+        if ruta:
+            if self.on_cache_hit:
+                self.on_cache_hit(path)
+            return _iter_segmentos_cache(ruta)
+        return _SegmentosGuardados(self.transcriptor.submit_stream(path, idioma), self.cache, clave)
+
+
+_worker = None
+_lock_worker = threading.Lock()
+
+
+def get_transcription_worker(tamano="base", device=None, hilos_cpu=None, idioma="es"):
+    """Worker compartido del proceso; se recrea solo si cambia la configuración"""
+    global _worker
+    with _lock_worker:
+        config = (tamano, device, hilos_cpu, idioma)
+        if _worker is None or (_worker.tamano, _worker.device, _worker.hilos_cpu, _worker.idioma) != config:
+            if _worker is not None:
+                _worker.stop()
+            _worker = TranscriptionWorker(tamano=tamano, device=device, hilos_cpu=hilos_cpu, idioma=idioma)
+        return _worker
@@ -0,0 +1,74 @@
+"""
+Vigilancia de carpetas por sondeo
+Mantiene un índice ruta → (tamaño, mtime) para detectar archivos nuevos, modificados o ampliados
+sin depender de inotify/FSEvents
+"""
+import json
+import os
+import tempfile
+import time
+
+from core.archives import es_comprimido
+from core.discovery import iter_archivos
+
+
+class FolderWatcher:
+    """
+    Compara cada sondeo con el índice de lo ya entrenado.
+    Un archivo de texto plano que solo ha crecido se reanuda desde el tamaño anterior (solo bytes nuevos).
+    """
+
+    def __init__(self, carpetas, extensiones, indice_path, incluir=None, excluir=None, estabilidad=2.0):
+        self.carpetas = [os.path.abspath(c) for c in carpetas]
+        self.extensiones = extensiones
+        self.indice_path = indice_path
+        self.incluir = incluir
+        self.excluir = excluir
+        # Segundos sin cambios antes de considerar un archivo terminado de escribir
+        self.estabilidad = estabilidad
+        self.indice = self._cargar_indice()
+
+    def _cargar_indice(self):
+        try:
+            with open(self.indice_path, 'r', encoding='utf-8') as f:
+                return {ruta: tuple(v) for ruta, v in json.load(f).items()}
+        except (OSError, ValueError):
+            return {}
+
+    def escanear(self):
+        """Lista de (ruta, inicio, tamano, mtime) pendientes de entrenar, de menor a mayor"""
+        ahora = time.time()
+        cambios = []
+        for carpeta in self.carpetas:
+            for entrada in iter_archivos(carpeta, extensiones=self.extensiones,
+                                         incluir=self.incluir, excluir=self.excluir):
+                previo = self.indice.get(entrada.path)
+                if previo == (entrada.tamano, entrada.mtime):
+                    continue
+                # Aún se está escribiendo: esperar al siguiente sondeo
+                if ahora - entrada.mtime / 1e9 < self.estabilidad:
+                    continue
+                inicio = 0
+                if previo and entrada.tamano > previo[0] and not es_comprimido(entrada.path):
+                    inicio = previo[0]
+                cambios.append((entrada.path, inicio, entrada.tamano, entrada.mtime))
+        cambios.sort(key=lambda c: c[2] - c[1])
+        return cambios
+
+    def confirmar(self, ruta, tamano, mtime):
+        """Marca un archivo como entrenado (se persiste con guardar())"""
+        self.indice[ruta] = (tamano, mtime)
+
+    def guardar(self):
+        directorio = os.path.dirname(self.indice_path) or "."
+        fd, tmp = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.indice, f)
+            os.replace(tmp, self.indice_path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
@@ -105,6 +105,9 @@ class MAGISystem(QMainWindow):
         self.signals.entrenamiento_terminado.connect(
             lambda: self.agregar_mensaje("SISTEMA", "Sincronización finalizada.")
         )
+        self.signals.entrenamiento_detenido.connect(
+            lambda: self.agregar_mensaje("SISTEMA", "Sincronización detenida.")
+        )
         self.signals.pensando.connect(self.toggle_thinking_animation)
         self.signals.cerebro_expandido.connect(self.on_brain_expanded)
         self.signals.progreso_entrenamiento.connect(self.actualizar_progreso)
@@ -1373,7 +1376,7 @@ class MAGISystem(QMainWindow):
     
     def abrir_txt(self):
         """Abre un archivo de texto"""
-        filename, _ = QFileDialog.getOpenFileName(self, "Select text file", "/", "Text Files (*.txt)")
+        filename, _ = QFileDialog.getOpenFileName(self, "Select text file", "/", "Text Files (*.txt *.txt.gz *.txt.bz2 *.txt.xz *.zip *.tar *.tgz *.tar.gz *.tar.bz2 *.tar.xz)")
         if filename:
             self.barra_progreso.setValue(0)
             self.agregar_mensaje("SISTEMA", f"Analyzing '{os.path.basename(filename)}'...")
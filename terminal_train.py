@@ -1,3 +1,17 @@
+"""
+MAGI headless training CLI
+
+Examples:
+    python terminal_train.py folder ./corpus                 # GPU session, resumable
+    python terminal_train.py txt book.txt.gz --epochs 3 --json
+    python terminal_train.py jsonl chats.jsonl --brains melchor
+    cat dump.txt | python terminal_train.py stdin
+    python terminal_train.py tokenize ./corpus -o corpus.magitok   # tokenize once...
+    python terminal_train.py corpus corpus.magitok --passes 3      # ...train many times from the memmap
+    python terminal_train.py "<folder_path>"                 # legacy form, same as `folder`
+"""
+import argparse
+import contextlib
 import sys
 import os
 
@@ -10,40 +24,261 @@ if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
 from core.brain_manager import BrainManager
+from core.console import ConsoleSignals
 from core.headless_trainer import HeadlessTrainer
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python terminal_train.py \"<folder_path>\"")
-        print("Error: Missing folder path argument.")
-        return
+BRAINS = ("melchor", "gaspar", "casper")
+COMMANDS = ("txt", "pdf", "audio", "jsonl", "folder", "stdin", "watch", "tokenize", "corpus", "compact-vocab",
+            "compact-neurons")
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--brains", default=",".join(BRAINS),
+                        help="comma-separated brains to train (default: all)")
+    common.add_argument("--workers", type=int, help="PDF extraction / transcription processes")
+    common.add_argument("--epochs", type=int, help="epochs per block (default depends on the source)")
+    common.add_argument("--chunk-size", type=int, help="characters per training block")
+    common.add_argument("--json", action="store_true",
+                        help="emit JSON lines (messages, progress with chars/sec and ETA)")
+    common.add_argument("--progress-interval", type=float, default=2.0,
+                        help="seconds between progress lines")
+    common.add_argument("--shared-vocab", action="store_true",
+                        help="align the brains' vocabularies and tokenize each block once for all of them")
+    common.add_argument("--normalize", choices=("NFC", "NFKC", "none"),
+                        help="Unicode normalization before tokenizing (default: NFC)")
+    common.add_argument("--max-vocab", type=int,
+                        help="maximum vocabulary size; characters that do not fit share an unknown-character slot")
+    common.add_argument("--softmax", choices=("exact", "sampled"),
+                        help="training objective for the output layer (default: exact); "
+                             "sampled scores each position's target plus a shared set of frequency-drawn negatives")
+    common.add_argument("--negatives", type=int, help="negatives per step for --softmax sampled (default: 64)")
+    common.add_argument("--memory-budget", type=int, metavar="MB",
+                        help="activation memory per training step and brain (default: 256); "
+                             "longer blocks are trained in tiles with gradient accumulation, 0 = no limit")
+    common.add_argument("--grow-memory", type=float, metavar="MB",
+                        help="stop growing the brains once weights, optimizer state and buffers of all of them would exceed this")
+    common.add_argument("--grow-max-cost", type=float, metavar="US",
+                        help="stop growing a brain once training would cost more than this many microseconds per character and epoch")
+    common.add_argument("--grow-on-plateau", action="store_true",
+                        help="only grow a brain when its training loss stops improving")
+
+    whisper = argparse.ArgumentParser(add_help=False)
+    whisper.add_argument("--whisper-model", help="Whisper model size (default: base)")
+    whisper.add_argument("--language", help="transcription language (default: es)")
+    whisper.add_argument("--whisper-threads", type=int,
+                         help="torch CPU threads for single-file transcription; process-wide, so it also "
+                              "limits training (default: leave torch's setting)")
+
+    discovery = argparse.ArgumentParser(add_help=False)
+    discovery.add_argument("--include", action="append", help="glob pattern to include (repeatable)")
+    discovery.add_argument("--exclude", action="append", help="glob pattern to exclude (repeatable)")
+    discovery.add_argument("--order", choices=("pequenos", "grandes", "nombre"), help="file ordering")
+    discovery.add_argument("--no-recursive", action="store_true", help="do not descend into subfolders")
+
+    parser = argparse.ArgumentParser(description="MAGI headless training")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("txt", parents=[common], help="train from a text file (.txt, .gz, .bz2, .xz, .zip, .tar)")
+    p.add_argument("path")
+
+    p = sub.add_parser("pdf", parents=[common], help="train from a PDF")
+    p.add_argument("path")
+
+    p = sub.add_parser("audio", parents=[common, whisper], help="transcribe and train from an audio/video file")
+    p.add_argument("path")
+
+    p = sub.add_parser("jsonl", parents=[common], help="train from a JSONL/CSV dialogue log")
+    p.add_argument("path")
+    p.add_argument("--prompt-field", help="record field holding the prompt")
+    p.add_argument("--response-field", help="record field holding the response")
+    p.add_argument("--batch", type=int, default=64, help="pairs per batch")
+
+    p = sub.add_parser("folder", parents=[common, whisper, discovery], help="train from a folder")
+    p.add_argument("path")
+    p.add_argument("--kind", choices=("text", "video"), default="text")
+    p.add_argument("--cpu", action="store_true", help="text: use the CPU trainer instead of the GPU session")
+    p.add_argument("--no-resume", action="store_true", help="text: ignore the saved job manifest")
+
+    sub.add_parser("stdin", parents=[common], help="train from text piped on stdin")
+
+    p = sub.add_parser("watch", parents=[common, discovery], help="keep training new files in folders")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--interval", type=float, default=30, help="seconds between polls")
+
+    p = sub.add_parser("tokenize", parents=[common, discovery], help="pre-tokenize a text file or folder into a .magitok corpus")
+    p.add_argument("path")
+    p.add_argument("-o", "--output", help="corpus file (default: <path>.magitok)")
+
+    p = sub.add_parser("corpus", parents=[common], help="train from a pre-tokenized .magitok corpus")
+    p.add_argument("path")
+    p.add_argument("--window", type=int, default=1000, help="tokens per training window")
+    p.add_argument("--passes", type=int, default=1, help="passes over the corpus")
+    p.add_argument("--random", action="store_true", help="sample random windows instead of a sequential sweep")
+    p.add_argument("--windows", type=int, help="random windows per pass (default: as many as a sequential sweep)")
+    p.add_argument("--seed", type=int, help="random sampler seed")
+
+    p = sub.add_parser("compact-vocab", parents=[common],
+                       help="drop rarely seen characters from the brains (uses --max-vocab as the target size)")
+    p.add_argument("--min-count", type=int, default=2, help="keep characters seen at least this many times")
+
+    p = sub.add_parser("compact-neurons", parents=[common],
+                       help="remove hidden units whose incoming and outgoing weights are dead (deep sleep also does this)")
+    p.add_argument("--threshold", type=float, default=0.05,
+                   help="a unit is dead when both weight norms are below this fraction of the median (default: 0.05)")
+    p.add_argument("--max-fraction", type=float, default=0.1, help="remove at most this fraction of units per brain")
+    return parser
+
 
-    folder_path = sys.argv[1].strip('"').strip("'")
-    
-    if not os.path.isdir(folder_path):
-        print(f"Error: Directory not found: {folder_path}")
-        return
+def options(args, **names):
+    """Keyword arguments for the given CLI options that were actually set"""
+    return {kwarg: getattr(args, attr) for kwarg, attr in names.items() if getattr(args, attr, None) is not None}
 
-    print("Initializing BrainManager and loading brains...")
-    # Initialize Manager
+
+def configure(bm, args):
+    selected = [b.strip().lower() for b in args.brains.split(",") if b.strip()]
+    unknown = [b for b in selected if b not in BRAINS]
+    if unknown or not selected:
+        raise SystemExit(f"Error: unknown brains {unknown}; choose from {', '.join(BRAINS)}")
+    for name in BRAINS:
+        bm.toggle_brain(name, name in selected)
+
+    if args.workers:
+        bm.pdf_workers = args.workers
+        bm.transcripcion_procesos = args.workers
+    if getattr(args, "whisper_model", None):
+        bm.whisper_modelo = args.whisper_model
+    if getattr(args, "language", None):
+        bm.whisper_idioma = args.language
+    if getattr(args, "whisper_threads", None):
+        bm.whisper_hilos = args.whisper_threads
+    if args.normalize or args.max_vocab is not None:
+        if args.normalize:
+            bm.normalizacion_unicode = None if args.normalize == "none" else args.normalize
+        bm.max_vocabulario = args.max_vocab
+        bm.aplicar_politica_vocabulario()
+    if args.softmax or args.negatives is not None or args.memory_budget is not None:
+        if args.softmax:
+            bm.modo_softmax = "muestreada" if args.softmax == "sampled" else "exacta"
+        if args.negatives is not None:
+            bm.negativos_softmax = args.negatives
+        if args.memory_budget is not None:
+            bm.memoria_activaciones_mb = args.memory_budget or None
+        bm.aplicar_ajustes_entrenamiento()
+    if args.grow_memory or args.grow_max_cost or args.grow_on_plateau:
+        bm.configurar_crecimiento(memoria_mb=args.grow_memory, coste_us=args.grow_max_cost,
+                                  estancamiento=args.grow_on_plateau)
+    if args.shared_vocab:
+        permuted = bm.activar_vocabulario_compartido()
+        if permuted:
+            print(f"Shared vocabulary: reordered {permuted} brain(s) to a common character order", file=sys.stderr)
+    if hasattr(args, "include"):
+        bm.patrones_incluir = args.include
+        bm.patrones_excluir = args.exclude
+        bm.orden_archivos = args.order
+        bm.busqueda_recursiva = not args.no_recursive
+
+
+def make_job(bm, args):
+    """Training method and keyword arguments for the chosen subcommand"""
+    sized = options(args, epocas="epochs", chunk_size="chunk_size")
+
+    if args.command == "txt":
+        return bm.train_from_file, dict(path=args.path, **sized)
+    if args.command == "pdf":
+        return bm.train_from_pdf, dict(path=args.path, **options(args, epocas="epochs"))
+    if args.command == "audio":
+        return bm.train_from_video, dict(path=args.path, **sized)
+    if args.command == "jsonl":
+        return bm.train_from_dialogues, dict(
+            path=args.path, lote=args.batch, campo_prompt=args.prompt_field,
+            campo_respuesta=args.response_field, **options(args, epocas_prompt="epochs"))
+    if args.command == "stdin":
+        return bm.train_from_stream, dict(stream=sys.stdin.buffer, **sized)
+    if args.command == "tokenize":
+        return bm.build_token_corpus, dict(origen=args.path, destino=args.output)
+    if args.command == "corpus":
+        return bm.train_from_token_corpus, dict(
+            path=args.path, longitud=args.window, pasadas=args.passes, modo="aleatorio" if args.random else "secuencial",
+            ventanas=args.windows, semilla=args.seed, **options(args, epocas="epochs"))
+    if args.command == "compact-vocab":
+        return bm.compactar_vocabularios, dict(min_frecuencia=args.min_count, max_vocab=args.max_vocab)
+    if args.command == "compact-neurons":
+        return bm.compactar_neuronas, dict(umbral_relativo=args.threshold, max_fraccion=args.max_fraction)
+    if args.command == "watch":
+        return bm.watch_folders, dict(carpetas=args.paths, intervalo=args.interval, **sized)
+    # folder
+    if args.kind == "video":
+        return bm.train_from_video_folder, dict(folder_path=args.path, **sized)
+    if args.cpu:
+        return bm.train_from_text_folder, dict(folder_path=args.path, **sized)
+    return bm.train_from_text_folder_gpu, dict(folder_path=args.path, reanudar=not args.no_resume, **sized)
+
+
+def check_paths(args):
+    paths = args.paths if args.command == "watch" else [getattr(args, "path", None)]
+    for path in paths:
+        if path is None:
+            continue
+        want_dir = args.command in ("folder", "watch")
+        if args.command == "tokenize" and os.path.exists(path):
+            continue
+        if (want_dir and not os.path.isdir(path)) or (not want_dir and not os.path.isfile(path)):
+            raise SystemExit(f"Error: {'Directory' if want_dir else 'File'} not found: {path}")
+
+
+@contextlib.contextmanager
+def json_stdout():
+    """
+    Keep stdout for JSON lines only. Yields a handle on the real stdout for ConsoleSignals and
+    sends everything else to stderr while the job runs: print() from the brains and the growth
+    policy, and, through fd 1, whatever worker processes or native libraries write.
+    """
+    sys.stdout.flush()
+    out = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    os.dup2(2, 1)
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            yield out
+    finally:
+        sys.stderr.flush()
+        os.dup2(out.fileno(), 1)
+        out.close()
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    # Legacy form: terminal_train.py "<folder_path>"
+    if argv and argv[0] not in COMMANDS and not argv[0].startswith("-"):
+        argv.insert(0, "folder")
+        argv[1] = argv[1].strip('"').strip("'")
+
+    args = build_parser().parse_args(argv)
+    check_paths(args)
+
+    with (json_stdout() if args.json else contextlib.nullcontext(sys.stdout)) as out:
+        run(args, out)
+
+
+def run(args, out):
     bm = BrainManager()
-    
-    # Ensure brains are loaded. 
-    # BrainManager.__init__ usually initializes empty brains or loads from default paths.
-    # We should verify if we need to call specific load methods.
-    # Based on codebase knowledge, __init__ sets up the objects. 
-    # If they exist on disk, RedCrecimientoInfinito might need explicit loading 
-    # OR it loads in __init__. Let's assume standard behavior but force a check logic if needed.
-    # For now, we trust BrainManager handling.
-    
-    print(f"Target Folder: {folder_path}")
-    
-    # Create Headless Trainer wrapper
-    trainer = HeadlessTrainer(bm)
-    
-    # Run Job
-    # This will block until finished or ESC is pressed
-    trainer.run_job(bm.train_from_text_folder_gpu, folder_path=folder_path)
+    configure(bm, args)
+    signals = ConsoleSignals(bm.get_active_brains(), json_lines=args.json, intervalo=args.progress_interval,
+                             salida=out)
+
+    # Headless runner: SIGINT/SIGTERM (or ESC on a TTY) stop the job after a final checkpoint
+    trainer = HeadlessTrainer(bm, json_lines=args.json, progress_interval=max(args.progress_interval, 10),
+                              keyboard=args.command != "stdin")
+    target, kwargs = make_job(bm, args)
+    policy = bm.politica_crecimiento
+    if policy is not None:
+        policy.on_decision = signals.crecimiento
+    trainer.run_job(target, signals=signals, **kwargs)
+    if policy is not None:
+        for name, decision in policy.resumen().items():
+            print(f"Growth {name}: {'growing' if decision['crecer'] else 'paused'} at {decision['neuronas']} neurons "
+                  f"({decision['motivo']})", file=sys.stderr)
+
 
 if __name__ == "__main__":
     main()